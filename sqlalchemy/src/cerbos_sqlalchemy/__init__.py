@@ -1,8 +1,19 @@
 import importlib.metadata
 
-from cerbos_sqlalchemy.query import get_query
-from cerbos_sqlalchemy.relations import require_hops
+from cerbos_sqlalchemy.functions import cel_function_ddl, register_cel_functions
+from cerbos_sqlalchemy.indexes import expression_index_ddl
+from cerbos_sqlalchemy.query import ClosureTable, get_query
+from cerbos_sqlalchemy.relations import Collection, Relation, require_hops
 
 __version__ = importlib.metadata.version(__package__ or __name__)
 
-__all__ = ["get_query", "require_hops"]
+__all__ = [
+    "ClosureTable",
+    "Collection",
+    "Relation",
+    "cel_function_ddl",
+    "expression_index_ddl",
+    "get_query",
+    "register_cel_functions",
+    "require_hops",
+]
@@ -0,0 +1,307 @@
+"""SQL functions that reproduce CEL's ``int()``, ``double()`` and ``string(bool)``.
+
+``CAST`` does not: it reads a numeric prefix where CEL parses the whole string
+or raises, it rounds where CEL truncates toward zero, and SQLite and MySQL
+render a boolean as ``1``. So by default the translator refuses those
+conversions. This module is the opt-in alternative: four functions that
+implement CEL's own rules, returning NULL wherever CEL raises, so the row is
+excluded under both polarities exactly as the PDP's error denies it.
+
+- ``cerbos_cel_int_of_string`` -- a whole base-10 int64, optionally signed, as
+  Go's ``strconv.ParseInt`` reads it.
+- ``cerbos_cel_int_of_double`` -- truncation toward zero, NULL for NaN, an
+  infinity or a value outside int64.
+- ``cerbos_cel_double_of_string`` -- a whole decimal literal, as Go's
+  ``strconv.ParseFloat`` reads it: NULL where that overflows, zero where it
+  underflows.
+- ``cerbos_cel_string_of_bool`` -- ``'true'`` or ``'false'``.
+
+SQLite gets them as Python user functions on every new connection
+(``register_cel_functions``); PostgreSQL and MySQL get ``CREATE FUNCTION`` DDL
+to run once, like a migration (``cel_function_ddl``). ``get_query`` lowers to
+them only when told they are installed, with ``cel_functions=True``. See "CEL
+conversion functions" in the README.
+
+On SQLite ``register_cel_functions`` also installs a ``regexp`` that caches
+compiled patterns, for the ``REGEXP`` that ``matches()`` lowers to.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import re
+from typing import Any, Callable, Dict, List, Tuple, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Dialect, Engine
+
+__all__ = ["cel_function_ddl", "register_cel_functions"]
+
+INT_OF_STRING = "cerbos_cel_int_of_string"
+INT_OF_DOUBLE = "cerbos_cel_int_of_double"
+DOUBLE_OF_STRING = "cerbos_cel_double_of_string"
+STRING_OF_BOOL = "cerbos_cel_string_of_bool"
+
+# ParseInt's base-10 grammar, and ParseFloat's decimal one. ParseFloat also takes
+# hexadecimal mantissas, `inf` and `nan`; the first is refused here (a NULL, so a
+# denial the PDP might not make), the other two CEL yields as non-finite doubles,
+# which SQL cannot hold, so they are refused as well.
+_INT_PATTERN = re.compile(r"[+-]?[0-9]+")
+_DOUBLE_PATTERN = re.compile(r"[+-]?(?:[0-9]+[.]?[0-9]*|[.][0-9]+)(?:[eE][+-]?[0-9]+)?")
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+def _cel_int_of_string(value: Any) -> Union[int, None]:
+    if not isinstance(value, str) or not _INT_PATTERN.fullmatch(value):
+        return None
+    number = int(value)
+    return number if _INT64_MIN <= number <= _INT64_MAX else None
+
+
+def _cel_int_of_double(value: Any) -> Union[int, None]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    # cel-go refuses both bounds: 2**63 is not an int64, and -2**63 is refused
+    # along with it.
+    if not -(2.0**63) < value < 2.0**63:
+        return None
+    return math.trunc(value)
+
+
+def _cel_double_of_string(value: Any) -> Union[float, None]:
+    if not isinstance(value, str) or not _DOUBLE_PATTERN.fullmatch(value):
+        return None
+    number = float(value)
+    return number if math.isfinite(number) else None
+
+
+def _cel_string_of_bool(value: Any) -> Union[str, None]:
+    if value is None:
+        return None
+    return "true" if value else "false"
+
+
+# A filter evaluates one pattern against every row, so compile each pattern once
+# rather than leaning on `re`'s own cache, which every other caller in the process
+# shares.
+@functools.lru_cache(maxsize=256)
+def _compiled(pattern: str) -> "re.Pattern[str]":
+    return re.compile(pattern)
+
+
+def _regexp(pattern: Any, value: Any) -> Union[bool, None]:
+    """SQLite's ``value REGEXP pattern``, which calls ``regexp(pattern, value)``."""
+    if pattern is None or value is None:
+        return None
+    return _compiled(pattern).search(value) is not None
+
+
+_PYTHON_FUNCTIONS: Dict[str, Callable[[Any], Any]] = {
+    INT_OF_STRING: _cel_int_of_string,
+    INT_OF_DOUBLE: _cel_int_of_double,
+    DOUBLE_OF_STRING: _cel_double_of_string,
+    STRING_OF_BOOL: _cel_string_of_bool,
+}
+
+
+def register_cel_functions(engine: Engine) -> None:
+    """Register the functions on every connection ``engine`` opens.
+
+    SQLite only, and call it before the engine's first connection: the
+    functions live on each DBAPI connection, so one already pooled has none.
+
+    It also replaces the ``regexp`` function SQLAlchemy registers for
+    ``REGEXP``, which ``matches()`` compiles to, with one that compiles each
+    pattern once. Both search with ``re``, so the matches are the same.
+
+    :raises ValueError: for an engine of any other dialect, which takes
+        ``cel_function_ddl`` instead.
+    """
+    if engine.dialect.name != "sqlite":
+        raise ValueError(
+            f"register_cel_functions is for SQLite; install the functions on "
+            f"{engine.dialect.name!r} with the DDL from cel_function_ddl"
+        )
+
+    @event.listens_for(engine, "connect")
+    def _register(dbapi_connection: Any, _: Any) -> None:
+        for name, function in _PYTHON_FUNCTIONS.items():
+            dbapi_connection.create_function(name, 1, function, deterministic=True)
+        dbapi_connection.create_function("regexp", 2, _regexp, deterministic=True)
+
+
+def _normalized(digits: str, exponent: int) -> Tuple[str, int]:
+    """``0.digits * 10**exponent`` with neither leading nor trailing zeros."""
+    stripped = digits.lstrip("0")
+    return stripped.rstrip("0"), exponent - (len(digits) - len(stripped))
+
+
+# The decimal thresholds ParseFloat rounds past, as ``0.digits * 10**exponent``:
+# at or beyond 2**1024 - 2**970 a double rounds to infinity and Go reports a
+# range error; at or below 2**-1075 it rounds to zero, which Go returns. Both are
+# exact, so a string is classified by comparing digits, with no float involved.
+_OVERFLOW = _normalized(str(2**1024 - 2**970), len(str(2**1024 - 2**970)))
+_UNDERFLOW = _normalized(str(5**1075), len(str(5**1075)) - 1075)
+
+
+def _postgresql_ddl() -> List[str]:
+    overflow_digits, overflow_exponent = _OVERFLOW
+    underflow_digits, underflow_exponent = _UNDERFLOW
+    return [
+        f"""CREATE OR REPLACE FUNCTION {INT_OF_STRING}(value text) RETURNS bigint
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $cel$
+SELECT CASE
+    WHEN value !~ '^[+-]?[0-9]+$' THEN NULL
+    WHEN length(ltrim(ltrim(value, '+-'), '0')) > 19 THEN NULL
+    WHEN value::numeric BETWEEN -9223372036854775808 AND 9223372036854775807
+        THEN value::numeric::bigint
+END
+$cel$""",
+        f"""CREATE OR REPLACE FUNCTION {INT_OF_DOUBLE}(value double precision) RETURNS bigint
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $cel$
+SELECT CASE
+    WHEN value > -9223372036854775808::double precision
+        AND value < 9223372036854775808::double precision
+        THEN trunc(value)::bigint
+END
+$cel$""",
+        f"""CREATE OR REPLACE FUNCTION {DOUBLE_OF_STRING}(value text) RETURNS double precision
+LANGUAGE plpgsql IMMUTABLE STRICT PARALLEL SAFE AS $cel$
+DECLARE
+    parts text[] := regexp_match(
+        value, '^[+-]?([0-9]*)[.]?([0-9]*)(?:[eE]([+-]?[0-9]+))?$');
+    digits text;
+    significant text;
+    width integer;
+    magnitude numeric;
+BEGIN
+    IF parts IS NULL OR parts[1] || parts[2] = '' THEN
+        RETURN NULL;
+    END IF;
+    digits := parts[1] || parts[2];
+    significant := rtrim(ltrim(digits, '0'), '0');
+    IF significant = '' THEN
+        RETURN value::double precision;
+    END IF;
+    magnitude := length(parts[1]) - (length(digits) - length(ltrim(digits, '0')))
+        + coalesce(parts[3], '0')::numeric;
+    width := greatest(length(significant), {max(len(overflow_digits), len(underflow_digits))});
+    IF magnitude > {overflow_exponent} OR (magnitude = {overflow_exponent}
+        AND rpad(significant, width, '0') COLLATE "C"
+            >= rpad('{overflow_digits}', width, '0')) THEN
+        RETURN NULL;
+    END IF;
+    IF magnitude < {underflow_exponent} OR (magnitude = {underflow_exponent}
+        AND rpad(significant, width, '0') COLLATE "C"
+            <= rpad('{underflow_digits}', width, '0')) THEN
+        RETURN CASE WHEN value LIKE '-%' THEN '-0'::double precision ELSE 0 END;
+    END IF;
+    RETURN value::double precision;
+END
+$cel$""",
+        f"""CREATE OR REPLACE FUNCTION {STRING_OF_BOOL}(value boolean) RETURNS text
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE AS $cel$
+SELECT CASE WHEN value THEN 'true' ELSE 'false' END
+$cel$""",
+    ]
+
+
+def _mysql_ddl() -> List[str]:
+    overflow_digits, overflow_exponent = _OVERFLOW
+    underflow_digits, underflow_exponent = _UNDERFLOW
+    # MySQL's regular expressions are ICU's, where `$` also matches before a
+    # final newline; `\z` is the end of the input.
+    definitions = {
+        INT_OF_STRING: f"""CREATE FUNCTION {INT_OF_STRING}(value LONGTEXT) RETURNS BIGINT
+DETERMINISTIC NO SQL
+RETURN CASE
+    WHEN value IS NULL OR NOT REGEXP_LIKE(value, '^[+-]?[0-9]+\\\\z', 'c') THEN NULL
+    WHEN CHAR_LENGTH(TRIM(LEADING '0' FROM TRIM(LEADING '+' FROM
+        TRIM(LEADING '-' FROM value)))) > 19 THEN NULL
+    WHEN CAST(value AS DECIMAL(20, 0))
+        BETWEEN -9223372036854775808 AND 9223372036854775807
+        THEN CAST(value AS SIGNED)
+END""",
+        INT_OF_DOUBLE: f"""CREATE FUNCTION {INT_OF_DOUBLE}(value DOUBLE) RETURNS BIGINT
+DETERMINISTIC NO SQL
+RETURN CASE
+    WHEN value > -9223372036854775808e0 AND value < 9223372036854775808e0
+        THEN CAST(TRUNCATE(value, 0) AS SIGNED)
+END""",
+        DOUBLE_OF_STRING: f"""CREATE FUNCTION {DOUBLE_OF_STRING}(value LONGTEXT) RETURNS DOUBLE
+DETERMINISTIC NO SQL
+BEGIN
+    DECLARE pattern VARCHAR(64)
+        DEFAULT '^[+-]?([0-9]*)[.]?([0-9]*)(?:[eE]([+-]?[0-9]+))?\\\\z';
+    DECLARE integral, digits, significant, exponent, unsigned_exponent LONGTEXT;
+    DECLARE width, magnitude BIGINT;
+    IF value IS NULL OR NOT REGEXP_LIKE(value, pattern, 'c') THEN
+        RETURN NULL;
+    END IF;
+    SET integral = REGEXP_REPLACE(value, pattern, '$1', 1, 0, 'c');
+    SET digits = CONCAT(integral, REGEXP_REPLACE(value, pattern, '$2', 1, 0, 'c'));
+    IF digits = '' THEN
+        RETURN NULL;
+    END IF;
+    SET significant = TRIM(TRAILING '0' FROM TRIM(LEADING '0' FROM digits));
+    IF significant = '' THEN
+        RETURN IF(LEFT(value, 1) = '-', -0e0, 0e0);
+    END IF;
+    SET exponent = REGEXP_REPLACE(value, pattern, '$3', 1, 0, 'c');
+    SET unsigned_exponent = TRIM(LEADING '0' FROM
+        TRIM(LEADING '+' FROM TRIM(LEADING '-' FROM exponent)));
+    SET magnitude = CHAR_LENGTH(integral)
+        - (CHAR_LENGTH(digits) - CHAR_LENGTH(TRIM(LEADING '0' FROM digits)));
+    IF CHAR_LENGTH(unsigned_exponent) > 9 THEN
+        SET magnitude = IF(LEFT(exponent, 1) = '-', -2000000000, 2000000000);
+    ELSEIF unsigned_exponent <> '' THEN
+        SET magnitude = magnitude + CAST(exponent AS SIGNED);
+    END IF;
+    SET width = GREATEST(CHAR_LENGTH(significant), {max(len(overflow_digits), len(underflow_digits))});
+    IF magnitude > {overflow_exponent} OR (magnitude = {overflow_exponent}
+        AND CAST(RPAD(significant, width, '0') AS BINARY)
+            >= CAST(RPAD('{overflow_digits}', width, '0') AS BINARY)) THEN
+        RETURN NULL;
+    END IF;
+    IF magnitude < {underflow_exponent} OR (magnitude = {underflow_exponent}
+        AND CAST(RPAD(significant, width, '0') AS BINARY)
+            <= CAST(RPAD('{underflow_digits}', width, '0') AS BINARY)) THEN
+        RETURN IF(LEFT(value, 1) = '-', -0e0, 0e0);
+    END IF;
+    RETURN CAST(value AS DOUBLE);
+END""",
+        STRING_OF_BOOL: f"""CREATE FUNCTION {STRING_OF_BOOL}(value BOOLEAN) RETURNS VARCHAR(5)
+DETERMINISTIC NO SQL
+RETURN CASE WHEN value IS NULL THEN NULL WHEN value <> 0 THEN 'true' ELSE 'false' END""",
+    }
+    statements = []
+    for name, definition in definitions.items():
+        # MySQL has no CREATE OR REPLACE FUNCTION.
+        statements += [f"DROP FUNCTION IF EXISTS {name}", definition]
+    return statements
+
+
+def cel_function_ddl(dialect: Dialect) -> List[str]:
+    """The statements that install the functions on PostgreSQL or MySQL.
+
+    Each is one statement for ``connection.exec_driver_sql``, with no client
+    delimiter to change. Running them again replaces the functions. PostgreSQL
+    needs 12 or later, which reads a subnormal double rather than refusing it;
+    MySQL needs 8.0.17 or later, for ``REGEXP_LIKE`` and ``CAST(... AS
+    DOUBLE)``.
+
+    :raises ValueError: for any other dialect; SQLite takes
+        ``register_cel_functions`` instead.
+    """
+    if dialect.name == "postgresql":
+        return _postgresql_ddl()
+    if dialect.name == "mysql":
+        return _mysql_ddl()
+    raise ValueError(
+        f"cel_function_ddl has no DDL for {dialect.name!r}: it covers PostgreSQL "
+        "and MySQL, and SQLite registers the functions with register_cel_functions"
+    )
@@ -0,0 +1,327 @@
+"""DDL for the column expressions a translated plan cannot compare bare.
+
+Most lowerings leave the column bare, so an ordinary index answers them. A few
+cannot: ``length(col) > 4``, ``CAST(col AS VARCHAR) = '1.5'`` and the position
+test behind a column needle all wrap the column in a function, and no index on
+the column itself applies. An index on the EXPRESSION does, provided it is the
+expression the query actually compares -- and the quickest way to get that is to
+ask the translator.
+
+This module plans nothing of its own. It runs ``get_query`` over the plans a
+deployment cares about, walks the WHERE clauses it returns and renders the
+wrapping expressions it finds through the same dialect compiler, so the index
+text is the query text with the table qualifier dropped. See "Indexing wrapped
+columns" in the README.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import warnings
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+from cerbos.response.v1 import response_pb2
+from cerbos.sdk.model import PlanResourcesResponse
+
+from cerbos_sqlalchemy.query import GenericColumn, GenericTable, get_query
+from sqlalchemy import Table
+from sqlalchemy.engine import Dialect
+from sqlalchemy.exc import CompileError
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import AsBoolean
+from sqlalchemy.sql.expression import (
+    BinaryExpression,
+    BindParameter,
+    BooleanClauseList,
+    Cast,
+    ColumnClause,
+    ColumnElement,
+    FunctionElement,
+    Grouping,
+    Select,
+)
+from sqlalchemy.sql.selectable import ScalarSelect
+from sqlalchemy.types import NullType
+
+__all__ = ["expression_index_ddl"]
+
+# Aggregates wrap a column too, but only inside a relation subquery, where no
+# per-row index can stand in for them.
+_AGGREGATE_FUNCTIONS = frozenset({"count", "sum", "min", "max", "avg"})
+
+_PATTERN_OPERATORS = frozenset(
+    {
+        operators.like_op,
+        operators.not_like_op,
+        operators.ilike_op,
+        operators.not_ilike_op,
+    }
+)
+
+
+def _is_wrapping(element: Any) -> bool:
+    if isinstance(element, FunctionElement):
+        return getattr(element, "name", "").lower() not in _AGGREGATE_FUNCTIONS
+    if isinstance(element, Cast):
+        return True
+    return isinstance(element, BinaryExpression) and not operators.is_comparison(
+        element.operator
+    )
+
+
+def _indexed_table(element: ColumnElement) -> Union[Table, None]:
+    """The one table every column in ``element`` belongs to, else None.
+
+    An index lives on one table, so an expression over two tables -- or over a
+    subquery, or over no column at all -- has nowhere to go.
+    """
+    tables = set()
+    for node in visitors.iterate(element):
+        if isinstance(node, (Select, ScalarSelect)):
+            return None
+        if isinstance(node, ColumnClause) and not isinstance(node, BindParameter):
+            if not isinstance(node.table, Table):
+                return None
+            tables.add(node.table)
+    return tables.pop() if len(tables) == 1 else None
+
+
+def _reads_a_column(element: ColumnElement) -> bool:
+    """Whether ``element`` varies per row: it reads a column or a subquery."""
+    return any(
+        isinstance(node, (Select, ScalarSelect))
+        or (isinstance(node, ColumnClause) and not isinstance(node, BindParameter))
+        for node in visitors.iterate(element)
+    )
+
+
+def _binds_a_value(element: ColumnElement) -> bool:
+    """Whether a bound parameter sits under ``element``.
+
+    The query binds the value where an index would hold it inline, and neither
+    SQLite nor a PostgreSQL generic plan matches the two.
+    """
+    return any(isinstance(node, BindParameter) for node in visitors.iterate(element))
+
+
+def _is_transparent(element: Any, dialect: Dialect) -> bool:
+    """Whether ``element`` renders as its arguments alone on ``dialect``.
+
+    Some lowerings wrap the column only where a dialect needs it -- an emptiness
+    test reads ``DATALENGTH(col)`` on SQL Server and ``col`` elsewhere -- and the
+    bare column needs no index of its own.
+    """
+    return isinstance(element, FunctionElement) and _render(
+        element, dialect
+    ) == _render(element.clauses, dialect)
+
+
+def _spelled(element: Any, dialect: Dialect) -> Any:
+    """The part of ``element`` that ``dialect`` compiles.
+
+    A lowering carrying one spelling per dialect renders only one of them, and
+    only that one is in the query.
+    """
+    spelling = getattr(element, "_spelling", None)
+    return element if spelling is None else spelling(dialect)
+
+
+def _unwrapped(element: Any) -> Any:
+    while isinstance(element, Grouping):
+        element = element.element
+    return element
+
+
+def _indexable_sides(
+    comparison: BinaryExpression,
+) -> Iterator[Tuple[ColumnElement, ColumnElement]]:
+    """Each side of ``comparison`` an index could answer, with the other side.
+
+    A pattern is never the side being searched, so ``LIKE`` offers its receiver
+    alone.
+    """
+    yield _unwrapped(comparison.left), comparison.right
+    if comparison.operator not in _PATTERN_OPERATORS:
+        yield _unwrapped(comparison.right), comparison.left
+
+
+def _searchable_comparisons(
+    element: Any, dialect: Dialect
+) -> Iterator[BinaryExpression]:
+    """Yield the comparisons a planner can answer from an index.
+
+    Those are the WHERE clause's own conjuncts and disjuncts. A comparison
+    inside a ``CASE``, a function or a negation only decides a value the row
+    already had to be read for.
+    """
+    element = _unwrapped(_spelled(element, dialect))
+    if isinstance(element, AsBoolean) and element.operator is operators.is_true:
+        # A boolean function used as the condition itself.
+        yield from _searchable_comparisons(element.element, dialect)
+    elif isinstance(element, BooleanClauseList):
+        for clause in element.clauses:
+            yield from _searchable_comparisons(clause, dialect)
+    elif isinstance(element, BinaryExpression) and operators.is_comparison(
+        element.operator
+    ):
+        yield element
+
+
+def _is_candidate(element: Any, dialect: Dialect) -> bool:
+    """Whether ``element`` wraps the columns of one table in the query's text."""
+    return (
+        _is_wrapping(element)
+        and _indexed_table(element) is not None
+        and not _is_transparent(element, dialect)
+    )
+
+
+def _wrapped_columns(element: Any, dialect: Dialect) -> Iterator[ColumnElement]:
+    """Yield the outermost wrapping expressions under ``element``.
+
+    The outermost one is what a comparison reads, so that is the one an index
+    would have to hold; the expressions nested inside it are never compared on
+    their own. A ``LIKE`` pattern is never searched, so only its receiver is.
+    """
+    element = _spelled(element, dialect)
+    if _is_candidate(element, dialect):
+        yield element
+        return
+    if isinstance(element, BinaryExpression) and element.operator in _PATTERN_OPERATORS:
+        yield from _wrapped_columns(element.left, dialect)
+        return
+    for child in element.get_children():
+        yield from _wrapped_columns(child, dialect)
+
+
+def _unindexable_reasons(
+    whereclause: ColumnElement, dialect: Dialect
+) -> Dict[int, Union[str, None]]:
+    """Why no index serves each wrapping expression a comparison searches by.
+
+    Keyed by ``id()``; ``None`` where an index does. That takes a searchable
+    comparison reading the expression whole against a value: one compared with
+    another column, or binding a value of its own, is reported instead.
+    """
+    roots = [whereclause] + [
+        node.whereclause
+        for node in visitors.iterate(whereclause)
+        if isinstance(node, Select) and node.whereclause is not None
+    ]
+    reasons: Dict[int, Union[str, None]] = {}
+    for root in roots:
+        for comparison in _searchable_comparisons(root, dialect):
+            for side, other in _indexable_sides(comparison):
+                if id(side) in reasons or not _is_candidate(side, dialect):
+                    continue
+                if _reads_a_column(other):
+                    reasons[id(side)] = "the query compares it with another column"
+                elif _binds_a_value(side):
+                    reasons[id(side)] = (
+                        "it holds a value the query binds as a parameter"
+                    )
+                else:
+                    reasons[id(side)] = None
+    return reasons
+
+
+def _render(element: ColumnElement, dialect: Dialect) -> str:
+    compiler = dialect.statement_compiler(dialect, None)
+    return compiler.process(element, include_table=False)
+
+
+def _column_type(element: ColumnElement, expression: str, dialect: Dialect) -> str:
+    if not isinstance(element.type, NullType):
+        try:
+            return element.type.compile(dialect=dialect)
+        except CompileError as e:
+            # e.g. MySQL, which cannot declare a VARCHAR without a length.
+            reason = str(e)
+    else:
+        reason = "the expression has no SQL type to declare it with"
+    raise ValueError(f"cannot add a generated column for {expression!r}: {reason}")
+
+
+def _ddl(
+    table: Table, expression: str, type_: str, dialect: Dialect, generated: bool
+) -> List[str]:
+    preparer = dialect.identifier_preparer
+    digest = hashlib.sha1(f"{table.name}:{expression}".encode()).hexdigest()[:10]
+    index = preparer.quote(f"ix_{table.name}_cerbos_{digest}")
+    target = preparer.format_table(table)
+    if not generated:
+        return [f"CREATE INDEX {index} ON {target} (({expression}))"]
+    column = preparer.quote(f"cerbos_{digest}")
+    # PostgreSQL only has STORED generated columns, and SQLite can only ADD a
+    # VIRTUAL one; MySQL indexes either.
+    storage = "STORED" if dialect.name == "postgresql" else "VIRTUAL"
+    return [
+        f"ALTER TABLE {target} ADD COLUMN {column} {type_} "
+        f"GENERATED ALWAYS AS ({expression}) {storage}",
+        f"CREATE INDEX {index} ON {target} ({column})",
+    ]
+
+
+def expression_index_ddl(
+    query_plans: Iterable[
+        Union[PlanResourcesResponse, response_pb2.PlanResourcesResponse]  # type: ignore
+    ],
+    table: GenericTable,
+    attr_map: Dict[str, GenericColumn],
+    dialect: Dialect,
+    *,
+    generated_columns: bool = False,
+    **query_options: Any,
+) -> List[str]:
+    """Render DDL indexing every column-wrapping expression the plans lower to.
+
+    Each plan is translated with ``get_query(plan, table, attr_map,
+    **query_options)`` -- pass the same options the application does, since
+    they change what is emitted -- and every outermost function, ``CAST`` or
+    arithmetic over the columns of a single table that the resulting WHERE
+    clause compares whole against a value, in a conjunct or disjunct a planner
+    can search, gets one ``CREATE INDEX`` on that expression. Every other one
+    is reported with a ``UserWarning`` instead: an index on an expression that
+    binds a value, that is compared with another column or that is only read
+    inside a ``CASE`` would never be searched. Duplicates across plans are
+    emitted once, in first-seen order, and names are derived from the
+    expression, so the output is stable across runs.
+
+    :param generated_columns: add a generated column per expression and index
+        that instead, for stores with generated columns but no expression
+        indexes (MySQL before 8.0.13). MySQL's optimizer substitutes an indexed
+        generated column for the matching expression; other stores only use it
+        from a query that names the column.
+    :raises ValueError: from ``get_query`` for a plan it cannot translate, or
+        when a generated column is asked for an expression whose type the
+        dialect cannot declare.
+    """
+    statements: List[str] = []
+    seen = set()
+    for plan in query_plans:
+        whereclause = get_query(plan, table, attr_map, **query_options).whereclause
+        if whereclause is None:
+            continue
+        reasons = _unindexable_reasons(whereclause, dialect)
+        for element in _wrapped_columns(whereclause, dialect):
+            expression = _render(element, dialect)
+            indexed = _indexed_table(element)
+            if (indexed, expression) in seen:
+                continue
+            seen.add((indexed, expression))
+            reason = reasons.get(
+                id(element), "the query reads it only where no index can search"
+            )
+            if reason is not None:
+                warnings.warn(
+                    f"cannot index {expression!r} on {indexed.name!r}: {reason}",
+                    stacklevel=2,
+                )
+                continue
+            type_ = ""
+            if generated_columns:
+                type_ = _column_type(element, expression, dialect)
+            statements.extend(
+                _ddl(indexed, expression, type_, dialect, generated_columns)
+            )
+    return statements
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import math
 import re
-from dataclasses import dataclass
+import struct
+import sys
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from types import MappingProxyType
 from typing import (
@@ -12,6 +14,7 @@ from typing import (
     Dict,
     List,
     Literal,
+    Mapping,
     NoReturn,
     Protocol,
     Tuple,
@@ -26,16 +29,36 @@ from cerbos.response.v1 import response_pb2
 from cerbos.sdk.model import PlanResourcesFilterKind, PlanResourcesResponse
 from google.protobuf.json_format import MessageToDict
 
+from cerbos_sqlalchemy.functions import (
+    DOUBLE_OF_STRING,
+    INT_OF_DOUBLE,
+    INT_OF_STRING,
+    STRING_OF_BOOL,
+)
+from cerbos_sqlalchemy.relations import (
+    Collection,
+    Relation,
+    _compared_size,
+    _in,
+    _relation_intersection,
+    _relation_macro,
+    _relation_membership,
+    _relation_size,
+)
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
     DateTime,
     Float,
+    Integer,
+    Numeric,
     String,
     Table,
     and_,
     case,
     cast,
+    exists,
     false,
     func,
     literal,
@@ -44,15 +67,22 @@ from sqlalchemy import (
     or_,
     select,
     true,
+    tuple_,
 )
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeMeta, InstrumentedAttribute
-from sqlalchemy.sql import Select
+from sqlalchemy.sql import Select, operators, visitors
+from sqlalchemy.sql.compiler import StrSQLCompiler
 from sqlalchemy.sql.expression import (
     BinaryExpression,
+    BindParameter,
     ColumnElement,
     ColumnOperators,
     FromClause,
+    FunctionElement,
 )
+from sqlalchemy.types import UserDefinedType
 
 try:  # SQLAlchemy >= 2.0
     from sqlalchemy.orm import DeclarativeBase
@@ -88,6 +118,15 @@ OperatorFnMap = Dict[str, Callable[[GenericColumn, Any], GenericExpression]]
 # https://github.com/cerbos/query-plan-adapters/issues/302.
 NullAttributeRepresentation = Literal["explicit", "omitted"]
 
+# How `startsWith`/`contains`/`endsWith` are lowered. See get_query().
+StringMatchLowering = Literal["like", "range", "glob"]
+
+# How `exists`/`all` over a `Relation` find a witness. See get_query().
+CollectionMacroLowering = Literal["probe", "aggregate"]
+
+# How a column read through `hierarchy()` stores its path. See get_query().
+HierarchyRepresentation = Literal["path", "ltree"]
+
 
 _LIKE_ESCAPE_CHAR = "\\"
 _RFC3339_TIMESTAMP = re.compile(
@@ -116,6 +155,15 @@ class _ConditionalValue:
     else_value: Any
 
 
+@dataclass(frozen=True)
+class _Quotient(_ConditionalValue):
+    """A division's ternary, with the operands its arms were built from."""
+
+    numerator: Any
+    denominator: Any
+    denominator_sign: float
+
+
 def _escape_like_literal(needle: str) -> str:
     """Escape LIKE metacharacters in a literal needle.
 
@@ -130,6 +178,158 @@ def _escape_like_literal(needle: str) -> str:
     )
 
 
+class _Position(FunctionElement):
+    """1-based index of the first ``needle`` in ``haystack``; 1 for an empty one.
+
+    NULL when either side is, and compiled per dialect, since no spelling of it
+    is portable. A dialect with no known spelling refuses to compile it, which
+    ``_ColumnNeedleMatch`` never asks of one.
+    """
+
+    type = Integer()
+    inherit_cache = True
+
+
+def _unknown_string_function(name: str, compiler: Any) -> CompileError:
+    return CompileError(
+        f"{name} has no lowering for the {compiler.dialect.name} dialect: only "
+        "SQLite, PostgreSQL, MySQL, SQL Server and Oracle are known to spell it"
+    )
+
+
+@compiles(_Position)
+def _compile_position(element: _Position, compiler: Any, **kw: Any) -> str:
+    if not isinstance(compiler, StrSQLCompiler):
+        raise _unknown_string_function("A column needle's position", compiler)
+    haystack, needle = (compiler.process(c, **kw) for c in element.clauses)
+    return f"POSITION({needle} IN {haystack})"
+
+
+@compiles(_Position, "sqlite")
+def _compile_position_sqlite(element: _Position, compiler: Any, **kw: Any) -> str:
+    haystack, needle = (compiler.process(c, **kw) for c in element.clauses)
+    return f"instr({haystack}, {needle})"
+
+
+@compiles(_Position, "postgresql")
+def _compile_position_postgresql(element: _Position, compiler: Any, **kw: Any) -> str:
+    haystack, needle = (compiler.process(c, **kw) for c in element.clauses)
+    return f"strpos({haystack}, {needle})"
+
+
+@compiles(_Position, "mysql")
+def _compile_position_mysql(element: _Position, compiler: Any, **kw: Any) -> str:
+    haystack, needle = (compiler.process(c, **kw) for c in element.clauses)
+    return f"LOCATE({needle}, {haystack})"
+
+
+@compiles(_Position, "oracle")
+def _compile_position_oracle(element: _Position, compiler: Any, **kw: Any) -> str:
+    # Oracle stores '' as NULL, so an empty needle is already UNKNOWN.
+    haystack, needle = (compiler.process(c, **kw) for c in element.clauses)
+    return f"INSTR({haystack}, {needle})"
+
+
+@compiles(_Position, "mssql")
+def _compile_position_mssql(element: _Position, compiler: Any, **kw: Any) -> str:
+    # CHARINDEX finds an empty needle nowhere. DATALENGTH, unlike `= ''`, does not
+    # pad, so it recognises exactly the empty needle, which is at 1.
+    haystack, needle = (compiler.process(c, **kw) for c in element.clauses)
+    return (
+        f"CASE WHEN DATALENGTH({needle}) = 0 THEN CASE WHEN {haystack} IS NOT NULL "
+        f"THEN 1 END ELSE CHARINDEX({needle}, {haystack}) END"
+    )
+
+
+class _CharLength(FunctionElement):
+    """Length in characters -- MySQL's ``length()`` counts bytes."""
+
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(_CharLength)
+def _compile_char_length(element: _CharLength, compiler: Any, **kw: Any) -> str:
+    if not isinstance(compiler, StrSQLCompiler):
+        raise _unknown_string_function("A column needle's length", compiler)
+    return f"char_length({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_CharLength, "postgresql")
+@compiles(_CharLength, "mysql")
+def _compile_char_length_ansi(element: _CharLength, compiler: Any, **kw: Any) -> str:
+    return f"char_length({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_CharLength, "sqlite")
+@compiles(_CharLength, "oracle")
+def _compile_char_length_sqlite(element: _CharLength, compiler: Any, **kw: Any) -> str:
+    return f"length({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_CharLength, "mssql")
+def _compile_char_length_mssql(element: _CharLength, compiler: Any, **kw: Any) -> str:
+    # LEN ignores trailing spaces; a sentinel character keeps them counted.
+    return f"(LEN({compiler.process(element.clauses, **kw)} + 'x') - 1)"
+
+
+class _Substring(FunctionElement):
+    """``length`` characters of ``string`` from the 1-based ``start``."""
+
+    type = String()
+    inherit_cache = True
+
+
+@compiles(_Substring)
+def _compile_substring(element: _Substring, compiler: Any, **kw: Any) -> str:
+    if not isinstance(compiler, StrSQLCompiler):
+        raise _unknown_string_function("A column needle's tail", compiler)
+    return f"substr({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_Substring, "sqlite")
+@compiles(_Substring, "postgresql")
+@compiles(_Substring, "mysql")
+@compiles(_Substring, "oracle")
+def _compile_substring_substr(element: _Substring, compiler: Any, **kw: Any) -> str:
+    return f"substr({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_Substring, "mssql")
+def _compile_substring_mssql(element: _Substring, compiler: Any, **kw: Any) -> str:
+    return f"SUBSTRING({compiler.process(element.clauses, **kw)})"
+
+
+class _ColumnNeedleMatch(FunctionElement):
+    """A string match against a column needle, carried in both spellings.
+
+    The position test where the dialect is known to spell it, and elsewhere the
+    portable ``LIKE`` over the needle escaped with ``REPLACE`` at query time.
+    Both are UNKNOWN wherever either side is NULL.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+    # A predicate, like the comparison it renders: without this a dialect with no
+    # boolean type appends `= 1`, which SQL Server refuses after a condition.
+    _is_implicitly_boolean = True
+
+    def _spelling(self, dialect: Any) -> Any:
+        """The spelling ``dialect`` compiles."""
+        escaped_like, position = self.clauses
+        return position if dialect.name in _POSITION_DIALECTS else escaped_like
+
+
+_POSITION_DIALECTS = frozenset({"sqlite", "postgresql", "mysql", "mssql", "oracle"})
+
+
+@compiles(_ColumnNeedleMatch)
+def _compile_column_needle_match(
+    element: _ColumnNeedleMatch, compiler: Any, **kw: Any
+) -> str:
+    return f"({compiler.process(element._spelling(compiler.dialect), **kw)})"
+
+
 def _escape_like_column(needle: Any) -> Any:
     """Escape LIKE metacharacters in a column-valued needle at query time.
 
@@ -143,13 +343,57 @@ def _escape_like_column(needle: Any) -> Any:
     return func.replace(escaped, "[", _LIKE_ESCAPE_CHAR + "[", type_=String)
 
 
+def _column_needle_position(
+    receiver: Any, needle: Any, *, prefix: bool, suffix: bool
+) -> Any:
+    """The position spelling of a column-needle match.
+
+    Positions need no escaping, so the needle is compared as written rather
+    than rewritten into a pattern on every row: ``contains`` is a positive
+    position, ``startsWith`` a first occurrence at 1, and ``endsWith`` an
+    equality with the receiver's tail of the needle's length.
+    """
+    if prefix and suffix:
+        return _Position(receiver, needle) > 0
+    if suffix:
+        return _Position(receiver, needle) == 1
+    receiver_length = _CharLength(receiver)
+    needle_length = _CharLength(needle)
+    # Exactly the needle's length, so SQL Server's padded `=` compares two strings
+    # of one length and cannot pair a trailing space with nothing.
+    tail = _Substring(receiver, receiver_length - needle_length + 1, needle_length)
+    return and_(receiver_length >= needle_length, tail == needle)
+
+
+def _column_needle_match(
+    receiver: Any, needle: Any, *, prefix: bool, suffix: bool
+) -> Any:
+    """Translate a string match whose needle is only known at query time.
+
+    SQLite, PostgreSQL, MySQL, SQL Server and Oracle match by position; any other
+    dialect keeps the escaped ``LIKE``, which every SQL database reads. A NULL on
+    either side is NULL throughout, so the match stays UNKNOWN and the row is
+    excluded — matching CEL's missing-attribute error (deny) for the same row.
+    """
+    pattern = _escape_like_column(needle)
+    if prefix:
+        pattern = literal("%", String) + pattern
+    if suffix:
+        pattern = pattern + literal("%", String)
+    return _ColumnNeedleMatch(
+        receiver.like(pattern, escape=_LIKE_ESCAPE_CHAR),
+        _column_needle_position(receiver, needle, prefix=prefix, suffix=suffix),
+    )
+
+
 def _string_match(receiver: Any, needle: Any, *, prefix: bool, suffix: bool) -> Any:
     """Translate CEL contains/startsWith/endsWith to an escaped LIKE.
 
     The receiver (haystack) is the first operand and the needle the second, in
     CEL source order — the receiver may be a constant (`"const".contains(col)`)
     and the needle may be a column (field-to-field), so both sides accept
-    either shape. `prefix`/`suffix` add `%` before/after the escaped needle.
+    either shape. `prefix`/`suffix` add `%` before/after the escaped needle; a
+    column needle is matched by position instead (`_column_needle_match`).
 
     NOTE: `LIKE` collation is dialect-controlled; CEL string matching is
     case-sensitive, so case-insensitive dialects (e.g. SQLite without
@@ -163,13 +407,378 @@ def _string_match(receiver: Any, needle: Any, *, prefix: bool, suffix: bool) ->
             + _escape_like_literal(needle)
             + ("%" if suffix else "")
         )
-    else:
-        pattern = _escape_like_column(needle)
-        if prefix:
-            pattern = literal("%", String) + pattern
-        if suffix:
-            pattern = pattern + literal("%", String)
-    return receiver.like(pattern, escape=_LIKE_ESCAPE_CHAR)
+        return receiver.like(pattern, escape=_LIKE_ESCAPE_CHAR)
+    return _column_needle_match(receiver, needle, prefix=prefix, suffix=suffix)
+
+
+def _escape_glob_literal(needle: str) -> str:
+    """Escape GLOB metacharacters in a literal needle.
+
+    GLOB has no ESCAPE clause: a metacharacter is matched literally as the only
+    member of a bracket class. ``]`` outside a class is already literal.
+    """
+    return re.sub(r"([*?\[])", r"[\1]", needle)
+
+
+def _glob_match(receiver: Any, needle: Any, *, prefix: bool, suffix: bool) -> Any:
+    """Translate CEL contains/startsWith/endsWith to a SQLite ``GLOB``.
+
+    Same operand contract as ``_string_match``. ``GLOB`` compares by code point
+    whatever ``PRAGMA case_sensitive_like`` says, and SQLite answers a pattern
+    with a literal prefix from an index on a ``BINARY`` column. A column needle
+    is matched by position, which ``instr`` already does by code point.
+    """
+    if isinstance(receiver, str):
+        receiver = literal(receiver, String)
+    if not isinstance(needle, str):
+        return _column_needle_match(receiver, needle, prefix=prefix, suffix=suffix)
+    pattern = (
+        ("*" if prefix else "") + _escape_glob_literal(needle) + ("*" if suffix else "")
+    )
+    return receiver.op("GLOB", is_comparison=True)(pattern)
+
+
+def _prefix_successor(prefix: str) -> Union[str, None]:
+    """The least string that sorts above every string starting with ``prefix``.
+
+    Increments the last code point that has a successor, skipping the surrogate
+    block no stored string can hold; ``None`` when every code point is the
+    maximum, where no upper bound exists.
+    """
+    while prefix:
+        last = ord(prefix[-1])
+        if last < sys.maxunicode:
+            successor = 0xE000 if 0xD7FF <= last < 0xE000 else last + 1
+            return prefix[:-1] + chr(successor)
+        prefix = prefix[:-1]
+    return None
+
+
+def _prefix_range(receiver: Any, needle: Any) -> Any:
+    """Translate CEL startsWith over a literal prefix to a half-open range.
+
+    Under a binary collation the strings starting with ``p`` are exactly those in
+    ``[p, successor(p))``, which a B-tree index answers with a range scan where
+    ``LIKE ... ESCAPE`` often forces a full one. A NULL receiver is UNKNOWN in
+    both bounds, as it is in the LIKE. A constant receiver or a column needle
+    has no range form and keeps its ``_string_match`` lowering.
+    """
+    if isinstance(receiver, str) or not isinstance(needle, str):
+        return _string_match(receiver, needle, prefix=False, suffix=True)
+    lower = receiver >= needle
+    upper = _prefix_successor(needle)
+    return lower if upper is None else and_(lower, receiver < upper)
+
+
+# How each dialect spells CEL's ``matches``: PostgreSQL's own regex engine, MySQL's
+# ICU, and on SQLite Python's ``re`` behind a REGEXP user function.
+_RegexFlavour = Literal["postgresql", "icu", "python"]
+
+# RE2 anchors at the ends of the TEXT. So does `^` everywhere, but `$` also matches
+# before a final newline in ICU and Python, which spell the end of the text apart.
+_REGEX_START = MappingProxyType({"postgresql": "^", "icu": "^", "python": "^"})
+_REGEX_END = MappingProxyType({"postgresql": "$", "icu": r"\z", "python": r"\Z"})
+
+_REGEX_METACHARACTERS = frozenset(".^$|?*+()[]{}\\")
+# Escaped inside a bracket: its own syntax, and the set operations ICU reads in
+# `&&`/`--` and Python warns about in `~~`/`||`.
+_REGEX_CLASS_METACHARACTERS = frozenset("\\]-[^&~|")
+_REGEX_CONTROL_ESCAPES = MappingProxyType(
+    {"a": "\a", "f": "\f", "t": "\t", "n": "\n", "r": "\r", "v": "\v"}
+)
+# RE2's Perl classes are ASCII; each engine's `\d`/`\w`/`\s` is Unicode-aware or
+# locale-dependent, so they are spelled out.
+_REGEX_PERL_CLASSES = MappingProxyType(
+    {"d": "0-9", "w": "0-9A-Za-z_", "s": "\t\n\f\r "}
+)
+# PostgreSQL refuses a bound above 255, well under RE2's 1000.
+_REGEX_MAX_REPEAT = 255
+_REGEX_RANGE_BLOCKS = (
+    "0123456789",
+    "abcdefghijklmnopqrstuvwxyz",
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+)
+
+
+class _PortableRegex:
+    """Parse an RE2 pattern in the subset every supported engine reads alike.
+
+    The subset is literals, ``.``, bracket classes, the Perl classes, groups,
+    alternation, anchors and greedy or lazy repetition. It is re-rendered per
+    engine rather than passed through, which is what makes it portable: ``.`` is
+    spelled ``[^\\n]`` because PostgreSQL's matches a newline, the Perl classes
+    become the ASCII sets RE2 means, and the end anchor takes each engine's
+    end-of-text spelling. Everything else -- flags, backreferences, Unicode
+    classes, word boundaries, POSIX classes -- is refused, as is anything RE2
+    itself rejects.
+    """
+
+    def __init__(self, pattern: str) -> None:
+        self._pattern = pattern
+        self._at = 0
+        self.pieces: List[Union[str, Mapping[str, str]]] = []
+        self._alternation()
+        if self._at < len(pattern):
+            self._refuse(f"an unbalanced {pattern[self._at]!r}")
+
+    def render(self, flavour: _RegexFlavour) -> str:
+        return "".join(
+            piece if isinstance(piece, str) else piece[flavour] for piece in self.pieces
+        )
+
+    def _refuse(self, construct: str) -> NoReturn:
+        raise ValueError(
+            f"matches() pattern {self._pattern!r} uses {construct}, which is outside "
+            "the RE2 subset SQLite, PostgreSQL and MySQL all read as CEL does"
+        )
+
+    def _peek(self) -> str:
+        return self._pattern[self._at] if self._at < len(self._pattern) else ""
+
+    def _alternation(self) -> None:
+        self._concatenation()
+        while self._peek() == "|":
+            self._at += 1
+            self.pieces.append("|")
+            self._concatenation()
+
+    def _concatenation(self) -> None:
+        empty = True
+        while self._peek() not in ("", "|", ")"):
+            quantifiable = self._atom()
+            self._quantifier(quantifiable)
+            empty = False
+        if empty:
+            self._refuse("an empty alternative")
+
+    def _atom(self) -> bool:
+        """Append one atom; whether a quantifier may follow it."""
+        char = self._peek()
+        self._at += 1
+        if char == "(":
+            if self._peek() == "?":
+                if self._pattern.startswith("?:", self._at):
+                    self._at += 2
+                else:
+                    self._refuse("a group flag or named group")
+            self.pieces.append("(?:")
+            self._alternation()
+            if self._peek() != ")":
+                self._refuse("an unclosed group")
+            self._at += 1
+            self.pieces.append(")")
+        elif char == "[":
+            self.pieces.append(self._bracket())
+        elif char == ".":
+            self.pieces.append("[^\n]")
+        elif char == "^":
+            self.pieces.append(_REGEX_START)
+            return False
+        elif char == "$":
+            self.pieces.append(_REGEX_END)
+            return False
+        elif char == "\\":
+            return self._escape()
+        elif char in _REGEX_METACHARACTERS:
+            self._refuse(f"{char!r} where an atom is expected")
+        else:
+            self.pieces.append(char)
+        return True
+
+    def _escape(self) -> bool:
+        char = self._peek()
+        self._at += 1
+        if char in ("A", "z"):
+            self.pieces.append(_REGEX_START if char == "A" else _REGEX_END)
+            return False
+        if char.lower() in _REGEX_PERL_CLASSES:
+            negated = "^" if char.isupper() else ""
+            self.pieces.append(f"[{negated}{_REGEX_PERL_CLASSES[char.lower()]}]")
+        elif char in _REGEX_CONTROL_ESCAPES:
+            self.pieces.append(_REGEX_CONTROL_ESCAPES[char])
+        elif char and char.isascii() and not char.isalnum():
+            self.pieces.append(f"\\{char}" if char in _REGEX_METACHARACTERS else char)
+        else:
+            self._refuse(f"the escape \\{char}")
+        return True
+
+    def _class_char(self) -> str:
+        """One bracket member's character, unescaped."""
+        char = self._peek()
+        self._at += 1
+        if char == "\\":
+            char = self._peek()
+            self._at += 1
+            if char in _REGEX_CONTROL_ESCAPES:
+                return _REGEX_CONTROL_ESCAPES[char]
+            if not char or not char.isascii() or char.isalnum():
+                self._refuse(f"the escape \\{char} in a bracket")
+        elif char in ("", "["):
+            self._refuse("a POSIX class or an unclosed bracket")
+        return char
+
+    def _bracket(self) -> str:
+        negated = self._peek() == "^"
+        self._at += negated
+        members = []
+        while self._peek() != "]" or not members:
+            escaped = self._pattern[self._at + 1 : self._at + 2]
+            if self._peek() == "\\" and escaped and escaped in _REGEX_PERL_CLASSES:
+                members.append(_REGEX_PERL_CLASSES[escaped])
+                self._at += 2
+                continue
+            low = self._class_char()
+            if self._peek() == "-" and self._pattern[
+                self._at + 1 : self._at + 2
+            ] not in (
+                "]",
+                "",
+            ):
+                self._at += 1
+                high = self._class_char()
+                if not any(
+                    low in block and high in block and low <= high
+                    for block in _REGEX_RANGE_BLOCKS
+                ):
+                    self._refuse(f"the range {low}-{high}")
+                members.append(f"{low}-{high}")
+            else:
+                members.append(
+                    f"\\{low}" if low in _REGEX_CLASS_METACHARACTERS else low
+                )
+        self._at += 1
+        return f"[{'^' if negated else ''}{''.join(members)}]"
+
+    def _quantifier(self, quantifiable: bool) -> None:
+        char = self._peek()
+        if char in ("*", "+", "?"):
+            self._at += 1
+            quantifier = char
+        elif char == "{":
+            bounds = re.match(r"\{([0-9]+)(,([0-9]*))?\}", self._pattern[self._at :])
+            if bounds is None:
+                self._refuse("a '{' that is not a repetition")
+            low = int(bounds[1])
+            high = low if bounds[2] is None else int(bounds[3]) if bounds[3] else None
+            if max(low, high or 0) > _REGEX_MAX_REPEAT or (
+                high is not None and high < low
+            ):
+                self._refuse(f"the repetition {bounds[0]}")
+            self._at += len(bounds[0])
+            quantifier = bounds[0]
+        else:
+            return
+        if not quantifiable:
+            self._refuse("a repeated anchor")
+        # Laziness changes which match is found, never whether one is.
+        if self._peek() == "?":
+            self._at += 1
+        if self._peek() in ("*", "+", "?", "{"):
+            self._refuse("a repeated repetition")
+        self.pieces.append(quantifier)
+
+
+class _RegexMatch(FunctionElement):
+    """CEL's ``matches``: whether a portable RE2 pattern occurs in ``receiver``.
+
+    Carries the pattern once per engine spelling, and binds only the one its
+    dialect reads. NULL when the receiver is, so the match stays UNKNOWN.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+
+
+@compiles(_RegexMatch)
+def _compile_regex_match(element: _RegexMatch, compiler: Any, **kw: Any) -> str:
+    if not isinstance(compiler, StrSQLCompiler):
+        raise CompileError(
+            f"matches() has no lowering for the {compiler.dialect.name} dialect: "
+            "only SQLite, PostgreSQL and MySQL are known to read its patterns as RE2 does"
+        )
+    receiver, pattern, _, _ = element.clauses
+    return f"({compiler.process(receiver, **kw)} <regexp> {compiler.process(pattern, **kw)})"
+
+
+@compiles(_RegexMatch, "postgresql")
+def _compile_regex_match_postgresql(
+    element: _RegexMatch, compiler: Any, **kw: Any
+) -> str:
+    receiver, pattern, _, _ = element.clauses
+    return f"({compiler.process(receiver, **kw)} ~ {compiler.process(pattern, **kw)})"
+
+
+@compiles(_RegexMatch, "mysql")
+def _compile_regex_match_mysql(element: _RegexMatch, compiler: Any, **kw: Any) -> str:
+    # 'c' compares case-sensitively whatever the column's collation says.
+    receiver, _, pattern, _ = element.clauses
+    receiver_sql = compiler.process(receiver, **kw)
+    return f"REGEXP_LIKE({receiver_sql}, {compiler.process(pattern, **kw)}, 'c')"
+
+
+@compiles(_RegexMatch, "sqlite")
+def _compile_regex_match_sqlite(element: _RegexMatch, compiler: Any, **kw: Any) -> str:
+    receiver, _, _, pattern = element.clauses
+    return (
+        f"({compiler.process(receiver, **kw)} REGEXP {compiler.process(pattern, **kw)})"
+    )
+
+
+class _RowMembership(FunctionElement):
+    """Whether a row of columns is one of a list of value rows.
+
+    Carries both spellings, the row-value ``IN`` and the OR-of-ANDs chain it
+    abbreviates, and renders only the one its dialect reads: SQL Server has no
+    row values. Both are UNKNOWN or FALSE in exactly the same rows.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+    # A predicate, like the comparison it renders: without this a dialect with no
+    # boolean type appends `= 1`, which SQL Server refuses after a condition.
+    _is_implicitly_boolean = True
+
+    def _spelling(self, dialect: Any) -> Any:
+        """The spelling ``dialect`` compiles."""
+        row_values, chain = self.clauses
+        return chain if dialect.name == "mssql" else row_values
+
+
+@compiles(_RowMembership)
+def _compile_row_membership(element: _RowMembership, compiler: Any, **kw: Any) -> str:
+    return f"({compiler.process(element._spelling(compiler.dialect), **kw)})"
+
+
+def _row_membership(columns: List[Any], rows: List[tuple], negated: bool) -> Any:
+    row_values = tuple_(*columns).in_(rows)
+    chain = or_(*(and_(*(c == v for c, v in zip(columns, row))) for row in rows))
+    if negated:
+        return _RowMembership(not_(row_values), not_(chain))
+    return _RowMembership(row_values, chain)
+
+
+def _matches(receiver: Any, pattern: Any) -> Any:
+    """Translate CEL ``receiver.matches(pattern)`` over a literal RE2 pattern.
+
+    RE2 searches, so the pattern may match anywhere in the receiver, as it does
+    under ``~``, ``REGEXP_LIKE`` and ``re.search``. A pattern known only per row
+    cannot be checked for portability and is refused.
+    """
+    if not isinstance(pattern, str):
+        raise ValueError(
+            "matches() requires a literal pattern: a pattern read from a column "
+            "cannot be checked against the RE2 subset every engine reads alike"
+        )
+    if isinstance(receiver, str):
+        receiver = literal(receiver, String)
+    regex = _PortableRegex(pattern)
+    return _RegexMatch(
+        receiver,
+        *(
+            literal(regex.render(flavour), String)
+            for flavour in ("postgresql", "icu", "python")
+        ),
+    )
 
 
 def _require_signed_zero(denominator: Any) -> None:
@@ -257,7 +866,14 @@ def _float_div(c: Any, v: Any) -> Any:
         _require_signed_zero(v)
         denominator_sign = math.copysign(1.0, float(v))
 
-    return _ConditionalValue(
+    # A non-zero constant denominator needs no guard: its finite arm is the only
+    # one `_simplify` keeps.
+    divisor = (
+        denominator
+        if isinstance(denominator, float) and denominator != 0.0
+        else func.nullif(denominator, 0.0)
+    )
+    return _Quotient(
         condition=denominator == 0.0,
         then_value=_ConditionalValue(
             condition=numerator == 0.0,
@@ -268,11 +884,89 @@ def _float_div(c: Any, v: Any) -> Any:
                 else_value=_IEEEConstant(math.copysign(math.inf, -denominator_sign)),
             ),
         ),
-        else_value=numerator / func.nullif(denominator, 0.0),
+        else_value=numerator / divisor,
+        numerator=numerator,
+        denominator=denominator,
+        denominator_sign=denominator_sign,
+    )
+
+
+_CONDITION_OPERATORS = {
+    operators.eq: "eq",
+    operators.ne: "ne",
+    operators.lt: "lt",
+    operators.gt: "gt",
+    operators.le: "le",
+    operators.ge: "ge",
+}
+
+# A ternary condition already decided by an enclosing arm: (condition, outcome).
+_Facts = Tuple[Tuple[Any, bool], ...]
+
+
+def _clause(condition: Any) -> Any:
+    if hasattr(condition, "__clause_element__"):
+        return condition.__clause_element__()
+    return condition
+
+
+def _against_constant(condition: Any) -> Union[Tuple[str, Any, Any], None]:
+    """``(operator, expression, constant)`` for ``expression <op> constant``."""
+    operator = _CONDITION_OPERATORS.get(getattr(condition, "operator", None))
+    if operator is None or not isinstance(condition.right, BindParameter):
+        return None
+    return operator, condition.left, condition.right.value
+
+
+def _decided(condition: Any, facts: _Facts) -> Union[bool, None]:
+    """The outcome ``facts`` imply for ``condition``, or None when they do not.
+
+    A constant condition decides itself. Otherwise an enclosing arm decides the
+    same condition, and an enclosing ``x == k`` decides every comparison of ``x``
+    with another constant.
+    """
+    if isinstance(condition, bool):
+        return condition
+    condition = _clause(condition)
+    if not isinstance(condition, ColumnElement):
+        return None
+    compared = _against_constant(condition)
+    for fact, outcome in facts:
+        fact = _clause(fact)
+        if fact is condition or fact.compare(condition):
+            return outcome
+        known = _against_constant(fact)
+        if outcome and compared and known and known[0] == "eq":
+            operator, expression, constant = compared
+            if expression.compare(known[1]) and _is_finite_number(constant):
+                return _apply_comparison(operator, known[2], constant)
+    return None
+
+
+def _simplify(value: Any, facts: _Facts = ()) -> Any:
+    """Fold a ternary tree before it is lowered to ``case()``.
+
+    A constant condition -- ``2.0 == 0.0`` from a constant denominator -- keeps
+    only the arm it selects, and an arm whose condition an enclosing arm already
+    decided is replaced by the arm it decides. Distributing arithmetic over two
+    divisions by the same denominator would otherwise render branches the
+    enclosing ``CASE`` can never reach.
+    """
+    if not isinstance(value, _ConditionalValue):
+        return value
+    outcome = _decided(value.condition, facts)
+    if outcome is not None:
+        return _simplify(value.then_value if outcome else value.else_value, facts)
+    return replace(
+        value,
+        then_value=_simplify(value.then_value, facts + ((value.condition, True),)),
+        else_value=_simplify(value.else_value, facts + ((value.condition, False),)),
     )
 
 
-def _arith_over_conditional(op_fn: Any, left: Any, right: Any) -> Any:
+def _arith_over_conditional(
+    op_fn: Any, left: Any, right: Any, facts: _Facts = ()
+) -> Any:
     """Distribute a binary arithmetic operator across a retained ternary.
 
     ``R.attr.aNumber / R.attr.aNumber + 1.0`` composes addition on top of a division
@@ -280,19 +974,23 @@ def _arith_over_conditional(op_fn: Any, left: Any, right: Any) -> Any:
     ``NULL != 2.0`` is UNKNOWN where CEL's ``NaN != 2.0`` is TRUE — the row the PDP
     allows would be dropped (cerbos/query-plan-adapters#312). Keeping the arms
     symbolic lets the enclosing comparison fold each one exactly.
+
+    Both operands are simplified under the conditions the enclosing arms decided
+    (see ``_simplify``), so two divisions by the same denominator pair their zero
+    arms together instead of combining an infinity with the other's finite arm.
     """
-    if isinstance(left, _ConditionalValue):
-        return _ConditionalValue(
-            condition=left.condition,
-            then_value=_arith_over_conditional(op_fn, left.then_value, right),
-            else_value=_arith_over_conditional(op_fn, left.else_value, right),
-        )
-    if isinstance(right, _ConditionalValue):
-        return _ConditionalValue(
-            condition=right.condition,
-            then_value=_arith_over_conditional(op_fn, left, right.then_value),
-            else_value=_arith_over_conditional(op_fn, left, right.else_value),
-        )
+    left = _simplify(_expanded(left), facts)
+    right = _simplify(_expanded(right), facts)
+    for symbolic, flip in ((left, False), (right, True)):
+        if not isinstance(symbolic, _ConditionalValue):
+            continue
+        other = left if flip else right
+        arms = []
+        for outcome, arm in ((True, symbolic.then_value), (False, symbolic.else_value)):
+            pair = (other, arm) if flip else (arm, other)
+            arm_facts = facts + ((symbolic.condition, outcome),)
+            arms.append(_arith_over_conditional(op_fn, *pair, arm_facts))
+        return _ConditionalValue(symbolic.condition, *arms)
     if isinstance(left, _IEEEConstant) or isinstance(right, _IEEEConstant):
         left_value = left.value if isinstance(left, _IEEEConstant) else left
         right_value = right.value if isinstance(right, _IEEEConstant) else right
@@ -315,6 +1013,125 @@ def _arith_over_conditional(op_fn: Any, left: Any, right: Any) -> Any:
     return op_fn(left, right)
 
 
+@dataclass(frozen=True, eq=False)
+class _QuotientSum:
+    """Arithmetic over several quotients, kept apart from their non-finite arms.
+
+    Distributing each operator across every division's ternary copies the rest of
+    the expression into each arm, so ``a/b + c/d > k`` renders every arm pairing and
+    the SQL grows exponentially with the number of divisions. Whether the result is
+    finite only depends on which quotients are, though: a NaN quotient, or a
+    positive and a negative infinity together, make it NaN, and otherwise any
+    infinity decides its sign. So ``finite`` is the arithmetic with every quotient
+    read as its finite arm, each term pairs a quotient with the sign of the constant
+    factor applied to it (0.0 once multiplied by zero, which turns an infinity into
+    NaN), and the comparison tests each quotient once (see ``_compare``).
+
+    ``expand`` rebuilds the nested ternary the arithmetic would otherwise produce,
+    for the shapes the linear form does not cover.
+    """
+
+    finite: Any
+    terms: Tuple[Tuple[float, _Quotient], ...]
+    expand: Callable[[], Any]
+
+
+def _expanded(value: Any) -> Any:
+    return value.expand() if isinstance(value, _QuotientSum) else value
+
+
+def _as_quotient_sum(value: Any) -> Union[_QuotientSum, None]:
+    if isinstance(value, _QuotientSum):
+        return value
+    if isinstance(value, _Quotient):
+        return _QuotientSum(value.else_value, ((1.0, value),), lambda: value)
+    if _is_finite_number(value):
+        return _QuotientSum(value, (), lambda: value)
+    return None
+
+
+def _combine_quotients(
+    operator: str, op_fn: Any, left: Any, right: Any
+) -> Union[_QuotientSum, None]:
+    """Keep ``left <operator> right`` linear in its quotients, else None.
+
+    Sums and differences of quotients and constants combine, as does scaling by a
+    constant; anything else -- a column operand, a product of two quotients, a
+    division by a quotient or by zero -- is left to the nested ternary.
+    """
+    left_sum, right_sum = _as_quotient_sum(left), _as_quotient_sum(right)
+    if left_sum is None or right_sum is None:
+        return None
+    if operator == "add":
+        terms = left_sum.terms + right_sum.terms
+    elif operator == "sub":
+        terms = left_sum.terms + tuple((-s, q) for s, q in right_sum.terms)
+    elif operator in ("mult", "div") and (not right_sum.terms or not left_sum.terms):
+        scaled, factor = (
+            (left_sum, right_sum.finite)
+            if not right_sum.terms
+            else (right_sum, left_sum.finite)
+        )
+        if operator == "div" and (scaled is right_sum or factor == 0):
+            return None
+        sign = math.copysign(1.0, factor) if factor != 0 else 0.0
+        terms = tuple((s * sign, q) for s, q in scaled.terms)
+    else:
+        return None
+    if not terms:
+        return None
+    finite = op_fn(left_sum.finite, right_sum.finite)
+    if isinstance(finite, _Quotient):
+        # Division by a non-zero constant: only the finite arm can be selected.
+        finite = finite.else_value
+    return _QuotientSum(
+        finite,
+        terms,
+        lambda: _arith_over_conditional(op_fn, _expanded(left), _expanded(right)),
+    )
+
+
+def _compare_quotient_sum(operator: str, left: Any, right: Any) -> Any:
+    """Compare a ``_QuotientSum`` with one test per quotient rather than per arm."""
+    if not isinstance(left, _QuotientSum):
+        return _compare_quotient_sum(
+            _MIRRORED_OPERATORS.get(operator, operator), right, left
+        )
+    if len(left.terms) < 2 or not _is_finite_number(right):
+        # One quotient has four arms, which is no larger than the tests; and a
+        # bound that is a column or non-finite has only the ternary's folding.
+        return _compare(operator, _expanded(left), _expanded(right))
+
+    missing, nan, positive, negative = [], [], [], []
+    for sign, quotient in left.terms:
+        for operand in (quotient.numerator, quotient.denominator):
+            if hasattr(operand, "is_"):
+                missing.append(operand.is_(None))
+        zero, numerator = quotient.condition, quotient.numerator
+        if zero is False:
+            continue
+        if sign == 0:
+            nan.append(zero)
+            continue
+        upward = sign * quotient.denominator_sign > 0
+        nan.append(and_(zero, numerator == 0.0))
+        positive.append(and_(zero, numerator > 0.0 if upward else numerator < 0.0))
+        negative.append(and_(zero, numerator < 0.0 if upward else numerator > 0.0))
+
+    # A NULL operand is a missing attribute: CEL errors and the row is excluded
+    # under both polarities, so it is tested before any arm can answer.
+    whens = [(or_(*missing), null())] if missing else []
+    if positive:
+        nan.append(and_(or_(*positive), or_(*negative)))
+    if nan:
+        whens.append((or_(*nan), operator == "ne"))
+    if positive:
+        whens.append((or_(*positive), _apply_comparison(operator, math.inf, right)))
+        whens.append((or_(*negative), _apply_comparison(operator, -math.inf, right)))
+    finite = _apply_comparison(operator, left.finite, right)
+    return case(*whens, else_=finite) if whens else finite
+
+
 def _reject_numeric_cast(operator: str) -> NoReturn:
     """Fail closed on CEL's int()/double().
 
@@ -355,6 +1172,410 @@ def _string_cast(c: Any) -> Any:
     return cast(c, String)
 
 
+def _conversion_operand(operator: str, c: Any) -> Tuple[str, Any]:
+    """Classify an ``int()``/``double()``/``string()`` operand for the function pack.
+
+    Returns ``"string"``, ``"integer"``, ``"double"`` or ``"boolean"`` with the
+    operand as SQL: the pack's functions are typed, so a column whose type says
+    none of these cannot be routed to one.
+    """
+    if isinstance(c, bool) or isinstance(getattr(c, "type", None), Boolean):
+        return "boolean", literal(c, Boolean) if isinstance(c, bool) else c
+    if isinstance(c, str) or isinstance(getattr(c, "type", None), String):
+        return "string", literal(c, String) if isinstance(c, str) else c
+    if isinstance(c, int) or isinstance(getattr(c, "type", None), Integer):
+        return "integer", literal(c, BigInteger) if isinstance(c, int) else c
+    if isinstance(c, float) or isinstance(getattr(c, "type", None), (Float, Numeric)):
+        return "double", literal(c, Float) if isinstance(c, float) else c
+    raise ValueError(
+        f"'{operator}()' over {c!r} cannot use the CEL function pack: its operand "
+        "must be a string, integer, floating-point or boolean column or value"
+    )
+
+
+def _cel_int(c: Any) -> Any:
+    """CEL's ``int()`` through the function pack (``cel_functions=True``)."""
+    kind, operand = _conversion_operand("int", c)
+    if kind == "string":
+        return getattr(func, INT_OF_STRING)(operand, type_=BigInteger)
+    if kind == "double":
+        return getattr(func, INT_OF_DOUBLE)(operand, type_=BigInteger)
+    if kind == "integer":
+        return operand
+    raise ValueError("'int()' over a boolean is a CEL error, so it cannot be lowered")
+
+
+def _cel_double(c: Any) -> Any:
+    """CEL's ``double()`` through the function pack (``cel_functions=True``)."""
+    kind, operand = _conversion_operand("double", c)
+    if kind == "string":
+        return getattr(func, DOUBLE_OF_STRING)(operand, type_=Float)
+    if kind == "double":
+        return operand
+    if kind == "integer":
+        # Every int64 has a nearest double, and CAST rounds to it as CEL does.
+        return cast(operand, Float)
+    raise ValueError(
+        "'double()' over a boolean is a CEL error, so it cannot be lowered"
+    )
+
+
+def _cel_string(c: Any) -> Any:
+    """CEL's ``string()`` through the function pack (``cel_functions=True``).
+
+    Only a boolean needs the pack; every other operand keeps ``_string_cast``.
+    """
+    if isinstance(c, bool) or isinstance(getattr(c, "type", None), Boolean):
+        _, operand = _conversion_operand("string", c)
+        return getattr(func, STRING_OF_BOOL)(operand, type_=String)
+    return _string_cast(c)
+
+
+# The conversions under cel_functions=True.
+_CEL_FUNCTION_FNS = MappingProxyType(
+    {
+        "int": lambda c, _: _cel_int(c),
+        "double": lambda c, _: _cel_double(c),
+        "string": lambda c, _: _cel_string(c),
+    }
+)
+
+
+class _EmptyString(FunctionElement):
+    """The empty string, compared so that trailing spaces stay significant.
+
+    A MySQL collation with PAD SPACE treats ``'  ' = ''`` as true, where CEL's
+    ``size('  ')`` is 2. A binary operand makes the comparison byte-wise there.
+    SQL Server pads the same way and Oracle stores ``''`` as NULL, so neither
+    compares the string at all: :class:`_Emptiness` reads its length there, and
+    this is the length of the empty string.
+    """
+
+    type = String()
+    inherit_cache = True
+
+
+class _Emptiness(FunctionElement):
+    """The side of an emptiness test :class:`_EmptyString` is compared with.
+
+    The string itself, except where the string comparison cannot answer: SQL
+    Server's ``DATALENGTH`` counts trailing spaces that ``LEN`` and ``=`` ignore,
+    and Oracle's ``LENGTH`` of a non-NULL string is never 0.
+    """
+
+    type = String()
+    inherit_cache = True
+
+
+@compiles(_EmptyString)
+def _compile_empty_string(element: _EmptyString, compiler: Any, **kw: Any) -> str:
+    return "''"
+
+
+@compiles(_EmptyString, "mysql")
+def _compile_empty_string_mysql(element: _EmptyString, compiler: Any, **kw: Any) -> str:
+    return "CAST('' AS BINARY)"
+
+
+@compiles(_EmptyString, "mssql")
+@compiles(_EmptyString, "oracle")
+def _compile_empty_string_length(
+    element: _EmptyString, compiler: Any, **kw: Any
+) -> str:
+    return "0"
+
+
+@compiles(_Emptiness)
+def _compile_emptiness(element: _Emptiness, compiler: Any, **kw: Any) -> str:
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(_Emptiness, "mssql")
+def _compile_emptiness_mssql(element: _Emptiness, compiler: Any, **kw: Any) -> str:
+    return f"DATALENGTH({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(_Emptiness, "oracle")
+def _compile_emptiness_oracle(element: _Emptiness, compiler: Any, **kw: Any) -> str:
+    return f"LENGTH({compiler.process(element.clauses, **kw)})"
+
+
+# The magnitude band in which CEL's string() of a double was measured to render the
+# shortest round-trip decimal without an exponent (see convex's `convertToString`).
+_STRING_CAST_MIN_MAGNITUDE = 1e-4
+_STRING_CAST_MAX_MAGNITUDE = 1e15
+
+
+def _size_emptiness(operator: str, value: Any) -> Union[bool, None]:
+    """Whether ``size(s) <operator> value`` reduces to an emptiness test.
+
+    Returns True when only the empty string satisfies it, False when exactly the
+    non-empty strings do, and None otherwise. A size is a non-negative integer, so
+    the comparison is decided by whether it holds at 0 and at 1: equality pins one
+    size, and an ordering holds on a contiguous run of them.
+    """
+    if not _is_finite_number(value):
+        return None
+    if operator == "eq":
+        return True if value == 0 else None
+    if operator == "ne":
+        return False if value == 0 else None
+    at_zero = _apply_comparison(operator, 0, value)
+    at_one = _apply_comparison(operator, 1, value)
+    if operator in ("lt", "le") and at_zero and not at_one:
+        return True
+    if operator in ("gt", "ge") and not at_zero and at_one:
+        return False
+    return None
+
+
+def _canonical_number(text: Any) -> Union[float, None]:
+    """The double ``text`` is CEL's ``string()`` of, if it is one, else None.
+
+    Within the measured band CEL renders a double as its shortest round-trip
+    decimal with no exponent and no trailing ``.0`` -- what ``repr`` produces
+    once that suffix is dropped. Zero is excluded: CEL renders -0.0 as ``"-0"``,
+    while SQL's ``= 0`` matches both zeros.
+    """
+    if not isinstance(text, str):
+        return None
+    try:
+        number = float(text)
+    except ValueError:
+        return None
+    if not _STRING_CAST_MIN_MAGNITUDE <= abs(number) < _STRING_CAST_MAX_MAGNITUDE:
+        return None
+    rendered = repr(number)
+    if rendered.endswith(".0"):
+        rendered = rendered[:-2]
+    return number if rendered == text else None
+
+
+def _sargable_unary_comparison(
+    operator: str, conversion: str, column: Any, value: Any
+) -> Any:
+    """``conversion(column) <operator> value`` with the column left bare, else None.
+
+    Only the cases that are exact under CEL are rewritten. ``size()`` of a text
+    column is a test against ``''`` when the comparison holds for just the empty
+    or just the non-empty strings; ``string()`` of a numeric column equals a
+    literal exactly when the column equals the number the literal is the
+    rendering of. A NULL column is UNKNOWN either way, as the wrapped form was.
+    """
+    column_type = getattr(column, "type", None)
+    if conversion == "size":
+        if not isinstance(column_type, String):
+            return None
+        empty = _size_emptiness(operator, value)
+        if empty is None:
+            return None
+        string = _Emptiness(column)
+        return string == _EmptyString() if empty else string != _EmptyString()
+    if operator not in ("eq", "ne") or isinstance(column_type, Boolean):
+        return None
+    number = _canonical_number(value)
+    if number is None:
+        return None
+    if isinstance(column_type, Integer):
+        if not number.is_integer():
+            return None
+        # An integral literal binds as an integer, so PostgreSQL compares
+        # int = int rather than casting the column to double precision.
+        number = int(number)
+    elif not isinstance(column_type, Float):
+        return None
+    return _apply_comparison(operator, column, number)
+
+
+_DOUBLE_SIGN_BIT = 1 << 63
+# Beyond 2**53 not every integer is a double, so an integer column compared
+# against a rounded bound could disagree with CEL about the value it rounds to.
+_MAX_EXACT_INTEGER = 2**53
+
+
+def _double_ordinal(x: float) -> int:
+    """``x``'s position among the non-NaN doubles in ascending order.
+
+    Both zeros sit at 0, as they compare equal; adjacent doubles are adjacent
+    integers, so the doubles can be bisected like a range.
+    """
+    bits = struct.unpack("<Q", struct.pack("<d", x))[0]
+    return -(bits ^ _DOUBLE_SIGN_BIT) if bits & _DOUBLE_SIGN_BIT else bits
+
+
+def _double_at(ordinal: int) -> float:
+    bits = -ordinal | _DOUBLE_SIGN_BIT if ordinal < 0 else ordinal
+    return struct.unpack("<d", struct.pack("<Q", bits))[0]
+
+
+_LOWEST_ORDINAL = _double_ordinal(-math.inf)
+_HIGHEST_ORDINAL = _double_ordinal(math.inf)
+
+
+def _first_holding(holds: Callable[[int], bool], low: int, high: int) -> int:
+    """The least ordinal in ``[low, high]`` where ``holds`` turns true, assuming it
+    stays true from there on; ``high + 1`` when it never does."""
+    high += 1
+    while low < high:
+        middle = (low + high) // 2
+        if holds(middle):
+            high = middle
+        else:
+            low = middle + 1
+    return low
+
+
+@dataclass(frozen=True)
+class _Monotone:
+    """An attribute under arithmetic by constants, evaluated as CEL would.
+
+    ``apply`` repeats the arithmetic on a Python float, which rounds exactly as
+    a CEL double does, and never decreases (``increasing``) or never increases
+    as its argument grows.
+    """
+
+    variable: str
+    apply: Callable[[float], float]
+    increasing: bool
+
+
+_MONOTONE_ARITHMETIC = frozenset({"add", "sub", "mult", "div"})
+
+
+def _monotone_arithmetic(
+    operand: dict, bind: Callable[[dict], dict]
+) -> Union[_Monotone, None]:
+    """``operand`` as a monotone function of a single attribute, else None.
+
+    A bare attribute qualifies, and so does a qualifying operand plus or minus a
+    finite constant (on either side), times a non-zero one, or divided by a
+    non-zero one. Rounding never reverses the order of two results, so each
+    step is monotone even where it is not invertible. A constant a double cannot
+    hold exactly is refused, as is a constant divided by the operand.
+    """
+    operand = bind(operand)
+    if "variable" in operand:
+        return _Monotone(operand["variable"], float, True)
+    expression = operand.get("expression") or {}
+    operator = expression.get("operator")
+    if operator not in _MONOTONE_ARITHMETIC or len(expression["operands"]) != 2:
+        return None
+    left, right = (bind(o) for o in expression["operands"])
+    constant_first = "value" in left
+    variable, constant = (right, left) if constant_first else (left, right)
+    value = constant.get("value")
+    if not _is_finite_number(value) or float(value) != value:
+        return None
+    constant = float(value)
+    if operator in ("mult", "div") and constant == 0:
+        return None
+    if operator == "div" and constant_first:
+        return None
+    inner = _monotone_arithmetic(variable, bind)
+    if inner is None:
+        return None
+    steps = {
+        "add": lambda x: inner.apply(x) + constant,
+        "sub": (
+            (lambda x: constant - inner.apply(x))
+            if constant_first
+            else (lambda x: inner.apply(x) - constant)
+        ),
+        "mult": lambda x: inner.apply(x) * constant,
+        "div": lambda x: inner.apply(x) / constant,
+    }
+    reverses = (operator == "sub" and constant_first) or (
+        operator in ("mult", "div") and constant < 0
+    )
+    return _Monotone(inner.variable, steps[operator], inner.increasing != reverses)
+
+
+def _satisfying_ordinals(
+    operator: str, monotone: _Monotone, value: Any
+) -> Tuple[int, int]:
+    """The ordinals of the doubles ``x`` with ``apply(x) <operator> value``.
+
+    The set is a run of consecutive doubles -- it is for any monotone function --
+    returned as its first and last ordinal, first > last when it is empty.
+    """
+    if operator == "eq":
+        at_least = _satisfying_ordinals("ge", monotone, value)
+        at_most = _satisfying_ordinals("le", monotone, value)
+        return max(at_least[0], at_most[0]), min(at_least[1], at_most[1])
+
+    def holds(ordinal: int) -> bool:
+        return _apply_comparison(operator, monotone.apply(_double_at(ordinal)), value)
+
+    if (operator in ("gt", "ge")) == monotone.increasing:
+        first = _first_holding(holds, _LOWEST_ORDINAL, _HIGHEST_ORDINAL)
+        return first, _HIGHEST_ORDINAL
+    last = _first_holding(lambda o: not holds(o), _LOWEST_ORDINAL, _HIGHEST_ORDINAL)
+    return _LOWEST_ORDINAL, last - 1
+
+
+def _integer_bound(bound: float, lowest: bool) -> Union[int, None]:
+    if not math.isfinite(bound):
+        return None
+    rounded = math.ceil(bound) if lowest else math.floor(bound)
+    return rounded if abs(rounded) <= _MAX_EXACT_INTEGER else None
+
+
+def _monotone_comparison(
+    operator: str, monotone: _Monotone, column: Any, value: Any
+) -> Any:
+    """``apply(column) <operator> value`` as bounds on the bare column, else None.
+
+    The bounds are found by bisecting the doubles rather than by solving for
+    the column, so whatever the arithmetic rounds, a column value passes
+    exactly when CEL's result would. An integer column is bounded by the
+    integers inside the run, which compare exactly against it without a cast.
+    Strict comparisons keep a strict bound (``n + 1 > 5`` becomes ``n > 4``).
+    Runs that are empty, unbounded on both sides or bounded only by an
+    infinity are left to the arithmetic lowering, which already answers them
+    and keeps a NULL column UNKNOWN.
+    """
+    column_type = getattr(column, "type", None)
+    if isinstance(column_type, Boolean) or not isinstance(
+        column_type, (Integer, Float)
+    ):
+        return None
+    if not _is_finite_number(value) or float(value) != value:
+        return None
+    first, last = _satisfying_ordinals(
+        "eq" if operator == "ne" else operator, monotone, value
+    )
+    if first > last or (first, last) == (_LOWEST_ORDINAL, _HIGHEST_ORDINAL):
+        return None
+    strict = operator in ("gt", "lt")
+    low = _double_at(first) if first != _LOWEST_ORDINAL else None
+    high = _double_at(last) if last != _HIGHEST_ORDINAL else None
+    if isinstance(column_type, Integer):
+        if low is not None and (low := _integer_bound(low, lowest=True)) is None:
+            return None
+        if high is not None and (high := _integer_bound(high, lowest=False)) is None:
+            return None
+        if low is not None and high is not None and low > high:
+            return None
+        below = None if low is None else low - 1
+        above = None if high is None else high + 1
+    else:
+        below = None if low is None else _double_at(first - 1)
+        above = None if high is None else _double_at(last + 1)
+        bounds = (low, high, below, above) if strict else (low, high)
+        if not all(math.isfinite(b) for b in bounds if b is not None):
+            return None
+    if operator in ("eq", "ne") and low == high:
+        return _apply_comparison(operator, column, low)
+    conditions = []
+    if low is not None:
+        conditions.append(column > below if strict else column >= low)
+    if high is not None:
+        conditions.append(column < above if strict else column <= high)
+    if operator == "ne":
+        return or_(*(not_(condition) for condition in conditions))
+    return and_(*conditions) if len(conditions) > 1 else conditions[0]
+
+
 def _apply_comparison(operator: str, left: Any, right: Any) -> Any:
     comparisons = {
         "eq": lambda: left == right,
@@ -405,31 +1626,29 @@ def _compare_leaf(operator: str, left: Any, right: Any) -> Any:
 
 def _compare(operator: str, left: Any, right: Any) -> Any:
     """Compare values without leaking PostgreSQL's non-IEEE NaN ordering."""
-    if isinstance(left, _ConditionalValue):
-        return case(
-            (left.condition, _compare(operator, left.then_value, right)),
-            (not_(left.condition), _compare(operator, left.else_value, right)),
-        )
-    if isinstance(right, _ConditionalValue):
-        return case(
-            (right.condition, _compare(operator, left, right.then_value)),
-            (not_(right.condition), _compare(operator, left, right.else_value)),
-        )
-    return _compare_leaf(operator, left, right)
+    return _compare_arms(operator, _simplify(left), _simplify(right), ())
 
 
-def _in(c: Any, values: Any) -> Any:
-    """CEL membership, including explicit-null list elements."""
-    members = values if isinstance(values, list) else [values]
-    non_nulls = [member for member in members if member is not None]
-    predicates = []
-    if non_nulls:
-        predicates.append(c.in_(non_nulls))
-    if len(non_nulls) != len(members):
-        predicates.append(c.is_(None))
-    if not predicates:
-        return false()
-    return or_(*predicates)
+def _compare_arms(operator: str, left: Any, right: Any, facts: _Facts) -> Any:
+    """Lower a simplified comparison, one ``CASE`` per undecided condition.
+
+    The other operand is simplified again under each arm, so a condition both
+    operands share is tested once, by the outer ``CASE``.
+    """
+    for symbolic, other, flip in ((left, right, False), (right, left, True)):
+        if not isinstance(symbolic, _ConditionalValue):
+            continue
+        arms = []
+        for outcome, arm in ((True, symbolic.then_value), (False, symbolic.else_value)):
+            arm_facts = facts + ((symbolic.condition, outcome),)
+            pair = (arm, _simplify(other, arm_facts))
+            if flip:
+                pair = pair[::-1]
+            arms.append(_compare_arms(operator, *pair, arm_facts))
+        return case((symbolic.condition, arms[0]), (not_(symbolic.condition), arms[1]))
+    if isinstance(left, _QuotientSum) or isinstance(right, _QuotientSum):
+        return _compare_quotient_sum(operator, left, right)
+    return _compare_leaf(operator, left, right)
 
 
 def _timestamp(value: Any, _: Any) -> Any:
@@ -475,17 +1694,162 @@ def _timestamp(value: Any, _: Any) -> Any:
     return normalized
 
 
+def _stored_instant(column: Any, value: Any) -> Any:
+    """A ``timestamp()`` instant in the representation ``column`` stores.
+
+    ``_timestamp`` yields an aware UTC ``datetime``. A ``DateTime`` column without
+    ``timezone=True`` holds naive instants, taken to be UTC: PostgreSQL's
+    ``timestamp without time zone`` compared with an aware bind casts every row to
+    ``timestamptz`` in the session time zone, which shifts the comparison and keeps
+    the column's index out of it, and MySQL reads an offset in a ``DATETIME``
+    literal into the session time zone. The naive UTC instant binds as the column's
+    own type instead, so SQLite formats it with the column's storage format too and
+    every engine compares like with like. Lists are converted element-wise.
+    """
+    if isinstance(value, list):
+        return [_stored_instant(column, element) for element in value]
+    column_type = getattr(column, "type", None)
+    if (
+        isinstance(value, datetime)
+        and value.tzinfo is not None
+        and isinstance(column_type, DateTime)
+        and not column_type.timezone
+    ):
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Identity, not field, equality: the fields are SQL columns, whose `==` builds SQL.
+@dataclass(frozen=True, eq=False)
+class ClosureTable:
+    """A closure table that answers hierarchy predicates for an attribute.
+
+    Declared through ``get_query``'s ``attribute_hierarchy_representation``. The
+    table holds one ``(ancestor, descendant)`` row for every pair of paths where
+    the first is an ancestor of the second, keyed by the same path values the
+    attribute's column holds. A self row per node is optional: ``ancestorOf`` is
+    proper, so rows pairing a node with itself are never read.
+    """
+
+    ancestor: Any
+    descendant: Any
+
+
 @dataclass(frozen=True)
 class _Hierarchy:
     value: Any
     delimiter: str
+    representation: Union[HierarchyRepresentation, ClosureTable] = "path"
+
+
+class _Ltree(UserDefinedType):
+    """PostgreSQL's ``ltree``, for casting literal paths; no driver support needed."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw: Any) -> str:
+        return "ltree"
+
+
+# An ltree label (PostgreSQL < 16 admits no hyphen). A literal path with any other
+# label cannot be stored in an ltree column, so it keeps the text lowering.
+_LTREE_LABEL = re.compile(r"[A-Za-z0-9_]+")
+
+
+def _is_ltree(value: Any) -> bool:
+    """Whether a column's type is ``ltree``, whichever library declared it."""
+    get_col_spec = getattr(getattr(value, "type", None), "get_col_spec", None)
+    if not callable(get_col_spec):
+        return False
+    try:
+        return str(get_col_spec()).lower() == "ltree"
+    except TypeError:
+        return False
 
 
 def _hierarchy(value: Any, delimiter: Any) -> _Hierarchy:
     delimiter = "." if delimiter is None else delimiter
     if not isinstance(delimiter, str) or not delimiter:
         raise ValueError("hierarchy() delimiter must be a non-empty string")
-    return _Hierarchy(value, delimiter)
+    return _Hierarchy(value, delimiter, "ltree" if _is_ltree(value) else "path")
+
+
+def _closure_table(*hierarchies: _Hierarchy) -> Union[ClosureTable, None]:
+    """The closure table a column operand declares, if any."""
+    tables = {
+        h.representation
+        for h in hierarchies
+        if isinstance(h.representation, ClosureTable) and not isinstance(h.value, str)
+    }
+    if len(tables) > 1:
+        raise ValueError(
+            "Hierarchy operands declare different closure tables; a pair of paths "
+            "can only be looked up in one"
+        )
+    return tables.pop() if tables else None
+
+
+def _closure_ancestor_of(closure: ClosureTable, ancestor: Any, descendent: Any) -> Any:
+    """``ancestor`` is a proper ancestor of ``descendent`` per ``closure``."""
+    return exists(
+        select(literal(1)).where(
+            closure.ancestor == ancestor,
+            closure.descendant == descendent,
+            closure.ancestor != closure.descendant,
+        )
+    )
+
+
+def _closure_guard(predicate: Any, *values: Any) -> Any:
+    """Keep a closure lookup UNKNOWN for a NULL path.
+
+    ``EXISTS`` is two-valued, so a NULL column would read FALSE and its negation
+    TRUE, admitting rows CEL denies with a missing-attribute error. The ``CASE``
+    has no ``ELSE``, as in ``require_hops``.
+    """
+    columns = [value for value in values if not isinstance(value, str)]
+    return case((and_(*(column.isnot(None) for column in columns)), predicate))
+
+
+def _ltree_values(*hierarchies: _Hierarchy) -> Union[List[Any], None]:
+    """The operands as ltree expressions, or ``None`` where ltree cannot answer.
+
+    Every column side must be an ltree, the delimiter ltree's own ``.``, and
+    every literal a path an ltree can hold; a literal is then cast to ``ltree``.
+    So is a column declared ``"ltree"`` whose type is text, which PostgreSQL
+    would otherwise refuse to compare with one (``text @> ltree``). Only an
+    expression index over that cast serves it.
+    """
+    if all(isinstance(h.value, str) for h in hierarchies):
+        return None
+    for h in hierarchies:
+        if h.delimiter != ".":
+            return None
+        if isinstance(h.value, str):
+            if not all(_LTREE_LABEL.fullmatch(label) for label in h.value.split(".")):
+                return None
+        elif h.representation != "ltree":
+            return None
+    return [
+        (
+            cast(literal(h.value, String), _Ltree())
+            if isinstance(h.value, str)
+            else h.value if _is_ltree(h.value) else cast(h.value, _Ltree())
+        )
+        for h in hierarchies
+    ]
+
+
+def _as_paths(*hierarchies: _Hierarchy) -> List[_Hierarchy]:
+    """The operands with any ltree column read as its text path."""
+    return [
+        (
+            replace(h, value=cast(h.value, String), representation="path")
+            if h.representation == "ltree" and not isinstance(h.value, str)
+            else h
+        )
+        for h in hierarchies
+    ]
 
 
 def _assert_matching_hierarchies(
@@ -498,8 +1862,54 @@ def _assert_matching_hierarchies(
     return left, right
 
 
-def _ancestor_of(left: Any, right: Any) -> Any:
+def _starts_with(receiver: Any, needle: Any) -> Any:
+    return _string_match(receiver, needle, prefix=False, suffix=True)
+
+
+def _proper_ancestors(path: str, delimiter: str) -> List[str]:
+    """Every proper ancestor of a literal path, root first."""
+    parts = path.split(delimiter)
+    return [delimiter.join(parts[:i]) for i in range(1, len(parts))]
+
+
+def _delimited(column: Any, delimiter: str) -> Any:
+    """``column`` followed by ``delimiter``, and NULL where ``column`` is NULL.
+
+    Oracle's ``||`` skips a NULL operand, so ``NULL || '.'`` is ``'.'``: the
+    prefix match would then answer for a missing path, and its negation admit
+    the row. The ``CASE`` has no ``ELSE``, as in ``_closure_guard``.
+    """
+    return case((column.isnot(None), column.concat(delimiter)))
+
+
+def _ancestor_of(
+    left: Any, right: Any, starts_with: Callable[[Any, Any], Any] = _starts_with
+) -> Any:
+    """Translate ``ancestorOf``.
+
+    An ancestor ``a.b`` selects descendants with a prefix match on ``a.b.``,
+    lowered by ``starts_with`` — the active ``startsWith`` handler, so the range
+    and GLOB strategies reach hierarchy predicates too. Between two columns the
+    ancestor's prefix is concatenated per row. A literal descendent selects its
+    ancestors from the finite list of its prefixes instead.
+    """
     ancestor, descendent = _assert_matching_hierarchies(left, right)
+    closure = _closure_table(ancestor, descendent)
+    if closure is not None:
+        return _closure_guard(
+            _closure_ancestor_of(closure, ancestor.value, descendent.value),
+            ancestor.value,
+            descendent.value,
+        )
+    ltree = _ltree_values(ancestor, descendent)
+    if ltree is not None:
+        ancestor_tree, descendent_tree = ltree
+        # `@>` includes the path itself; CEL's ancestorOf is proper.
+        return and_(
+            ancestor_tree.op("@>", precedence=5, is_comparison=True)(descendent_tree),
+            ancestor_tree != descendent_tree,
+        )
+    ancestor, descendent = _as_paths(ancestor, descendent)
     ancestor_value = ancestor.value
     descendent_value = descendent.value
     delimiter = ancestor.delimiter
@@ -507,25 +1917,54 @@ def _ancestor_of(left: Any, right: Any) -> Any:
     if isinstance(ancestor_value, str) and isinstance(descendent_value, str):
         return descendent_value.startswith(ancestor_value + delimiter)
     if isinstance(descendent_value, str):
-        parts = descendent_value.split(delimiter)
-        prefixes = [delimiter.join(parts[:i]) for i in range(1, len(parts))]
-        return ancestor_value.in_(prefixes)
+        return ancestor_value.in_(_proper_ancestors(descendent_value, delimiter))
     if isinstance(ancestor_value, str):
-        return _string_match(
-            descendent_value,
-            ancestor_value + delimiter,
-            prefix=False,
-            suffix=True,
-        )
-    raise ValueError("Hierarchy comparison between two columns is not supported")
+        return starts_with(descendent_value, ancestor_value + delimiter)
+    # Two columns: the needle is only known per row, so `starts_with` matches it
+    # by position. A NULL on either side keeps the whole predicate UNKNOWN.
+    return starts_with(descendent_value, _delimited(ancestor_value, delimiter))
+
 
+def _descendent_of(
+    left: Any, right: Any, starts_with: Callable[[Any, Any], Any] = _starts_with
+) -> Any:
+    return _ancestor_of(right, left, starts_with)
 
-def _descendent_of(left: Any, right: Any) -> Any:
-    return _ancestor_of(right, left)
 
+def _hierarchy_overlaps(
+    left: Any, right: Any, starts_with: Callable[[Any, Any], Any] = _starts_with
+) -> Any:
+    """Translate ``overlaps``: equal, or either side an ancestor of the other.
 
-def _hierarchy_overlaps(left: Any, right: Any) -> Any:
+    Against a literal path the equality and the ancestor direction are one set,
+    the path and its proper ancestors, so the predicate is a single ``IN`` plus
+    the descendant prefix match rather than three disjuncts.
+    """
     left_hierarchy, right_hierarchy = _assert_matching_hierarchies(left, right)
+    closure = _closure_table(left_hierarchy, right_hierarchy)
+    if closure is not None:
+        left_value, right_value = left_hierarchy.value, right_hierarchy.value
+        return _closure_guard(
+            or_(
+                (
+                    literal(left_value) == right_value
+                    if isinstance(left_value, str)
+                    else left_value == right_value
+                ),
+                _closure_ancestor_of(closure, left_value, right_value),
+                _closure_ancestor_of(closure, right_value, left_value),
+            ),
+            left_value,
+            right_value,
+        )
+    ltree = _ltree_values(left_hierarchy, right_hierarchy)
+    if ltree is not None:
+        left_tree, right_tree = ltree
+        return or_(
+            left_tree.op("@>", precedence=5, is_comparison=True)(right_tree),
+            left_tree.op("<@", precedence=5, is_comparison=True)(right_tree),
+        )
+    left_hierarchy, right_hierarchy = _as_paths(left_hierarchy, right_hierarchy)
     left_value = left_hierarchy.value
     right_value = right_hierarchy.value
     if isinstance(left_value, str) and isinstance(right_value, str):
@@ -534,11 +1973,34 @@ def _hierarchy_overlaps(left: Any, right: Any) -> Any:
             or _ancestor_of(left_hierarchy, right_hierarchy)
             or _ancestor_of(right_hierarchy, left_hierarchy)
         )
-    return or_(
-        left_value == right_value,
-        _ancestor_of(left_hierarchy, right_hierarchy),
-        _ancestor_of(right_hierarchy, left_hierarchy),
-    )
+    if isinstance(left_value, str) or isinstance(right_value, str):
+        path, column = (
+            (left_value, right_value)
+            if isinstance(left_value, str)
+            else (right_value, left_value)
+        )
+        delimiter = left_hierarchy.delimiter
+        return or_(
+            column.in_([*_proper_ancestors(path, delimiter), path]),
+            starts_with(column, path + delimiter),
+        )
+    # Two columns overlap exactly when one path plus a delimiter prefixes the
+    # other plus a delimiter; equal paths are the case where each does.
+    delimiter = left_hierarchy.delimiter
+    left_path = _delimited(left_value, delimiter)
+    right_path = _delimited(right_value, delimiter)
+    return or_(starts_with(right_path, left_path), starts_with(left_path, right_path))
+
+
+def _hierarchy_fns(
+    starts_with: Callable[[Any, Any], Any],
+) -> Dict[str, Callable[[Any, Any], Any]]:
+    """The hierarchy handlers with their prefix match lowered by ``starts_with``."""
+    return {
+        "ancestorOf": lambda c, v: _ancestor_of(c, v, starts_with),
+        "descendentOf": lambda c, v: _descendent_of(c, v, starts_with),
+        "overlaps": lambda c, v: _hierarchy_overlaps(c, v, starts_with),
+    }
 
 
 # We want to make the base dict "immutable", and enforce explicit (optional) overrides on
@@ -564,8 +2026,9 @@ __operator_fns: OperatorFnMap = {
     # (receiver first): the receiver may be a constant and the needle a
     # column, and LIKE metacharacters in the needle are always escaped.
     "contains": lambda c, v: _string_match(c, v, prefix=True, suffix=True),
-    "startsWith": lambda c, v: _string_match(c, v, prefix=False, suffix=True),
+    "startsWith": _starts_with,
     "endsWith": lambda c, v: _string_match(c, v, prefix=True, suffix=False),
+    "matches": _matches,
     # Type conversions — value-returning expressions. Only string() survives: SQL CAST
     # does not reproduce CEL's int()/double(), which read a WHOLE string or raise where
     # CAST reads a numeric prefix, and truncate toward zero where PostgreSQL and MySQL
@@ -573,8 +2036,8 @@ __operator_fns: OperatorFnMap = {
     "string": lambda c, _: _string_cast(c),
     "double": lambda *_: _reject_numeric_cast("double"),
     "int": lambda *_: _reject_numeric_cast("int"),
-    # size() over a string column — collection-typed columns require an override.
-    "size": lambda c, _: func.length(c),
+    # size() over a string column — a collection-typed attribute maps to a Relation.
+    "size": lambda c, _: func.length(c, type_=Integer),
     "timestamp": _timestamp,
     "hierarchy": _hierarchy,
     "ancestorOf": _ancestor_of,
@@ -583,22 +2046,47 @@ __operator_fns: OperatorFnMap = {
 }
 OPERATOR_FNS = MappingProxyType(__operator_fns)
 
+# The operators a `Relation` in the attribute map, or a `Collection` derived from
+# one, reaches as an operand. The macros binding a lambda over one are lowered in
+# `get_query` itself, which owns the lambda body's translation.
+_RELATION_FNS = MappingProxyType(
+    {
+        "size": _relation_size,
+        "in": _relation_membership,
+        "hasIntersection": _relation_intersection,
+    }
+)
+_RELATION_MACROS = frozenset({"exists", "all", "exists_one", "filter", "map"})
+
+# The string matches under string_match_lowering="glob".
+_GLOB_MATCH_FNS = MappingProxyType(
+    {
+        "contains": lambda c, v: _glob_match(c, v, prefix=True, suffix=True),
+        "startsWith": lambda c, v: _glob_match(c, v, prefix=False, suffix=True),
+        "endsWith": lambda c, v: _glob_match(c, v, prefix=True, suffix=False),
+    }
+)
+
+# The values arithmetic keeps symbolic until a comparison folds them.
+_SYMBOLIC_VALUE_TYPES = (_IEEEConstant, _ConditionalValue, _QuotientSum)
+
 # What a DEFAULT operator handler can lower: a SQL construct the mapper produced, a literal
 # decoded from the plan (JSON carries no other kind of value), or one of THIS module's own
 # symbolic values, which the handlers below know how to fold.
 #
-# Everything else is foreign. An operator override may return whatever it likes -- the
-# corpus's `map` and `filter` overrides return deferred tuples -- but such a value only means
-# something to the ENCLOSING override that consumes it, and once a default handler is running
-# there is no enclosing override left to do so. Python then compares the intermediate with
-# `==`, yields a bare `False`, and that reaches `where()` as a perfectly valid boolean which
-# excludes every row: an emitted filter for a shape the adapter cannot express, and silent
-# because it never threw (`map-eq-list`, cerbos/query-plan-adapters#387).
+# Everything else is foreign. An operator override may return whatever it likes, and
+# `filter()`/`map()` over a `Relation` return a deferred `Collection`, but such a value only
+# means something to the ENCLOSING operator that consumes it, and once a default handler is
+# running there is no enclosing operator left to do so. Python then compares the intermediate
+# with `==`, yields a bare `False`, and that reaches `where()` as a perfectly valid boolean
+# which excludes every row: an emitted filter for a shape the adapter cannot express, and
+# silent because it never threw (`map-eq-list`, cerbos/query-plan-adapters#387).
 _LOWERABLE_OPERAND_TYPES = (
     ColumnElement,
     InstrumentedAttribute,
     _IEEEConstant,
     _ConditionalValue,
+    _QuotientSum,
     _Hierarchy,
     str,
     bool,
@@ -616,8 +2104,9 @@ def _require_lowerable(operator: str, operand: Any) -> None:
         raise ValueError(
             f"`{operator}` received an operand of type "
             f"{type(operand).__name__!r}, which is not a SQL expression or a plan "
-            "literal: an operator override returning an intermediate value must be "
-            "consumed by an enclosing override, and no default handler can lower one"
+            "literal: map() and filter() over a Relation return a deferred Collection "
+            "that only an enclosing size, in or hasIntersection consumes, and no other "
+            "handler can lower one"
         )
 
 
@@ -633,6 +2122,8 @@ _MIRRORED_OPERATORS = MappingProxyType(
     }
 )
 
+_COMPARISON_OPERATORS = frozenset({"eq", "ne", "lt", "gt", "le", "ge"})
+
 # Operators whose semantics don't depend on which operand holds the column:
 # `eq`/`ne` are symmetric, value-first `in` (`value in R.attr.list`) still
 # means membership against the column, and set intersection is commutative, so
@@ -640,6 +2131,8 @@ _MIRRORED_OPERATORS = MappingProxyType(
 # (source) order when the value comes first — receiver-style string matches
 # (`"const".contains(R.attr.x)`) would otherwise silently swap haystack and
 # needle.
+_STRING_MATCH_OPERATORS = frozenset({"contains", "startsWith", "endsWith"})
+
 _ORDER_INSENSITIVE_OPERATORS = frozenset({"eq", "ne", "in", "hasIntersection"})
 
 # Unary value-returning operators take a single non-value input.
@@ -760,73 +2253,286 @@ def _null_operand_error(operator) -> ValueError:
     )
 
 
-def _substitute_lambda_variable(
-    operand: dict, variable_name: str, element: Any
-) -> dict:
-    """Substitute a lambda iteration variable with a concrete collection element.
+def _lambda_reference(operand: dict, variable_name: str) -> Union[str, None]:
+    """The ``variable`` or ``variable.path`` an operand reads off a lambda element."""
+    name = operand.get("variable")
+    if name is not None and (
+        name == variable_name or name.startswith(f"{variable_name}.")
+    ):
+        return name
+    return None
 
-    A bare reference to the variable becomes the element itself; a
-    ``variable.path.to.field`` reference drills into the element and fails
-    closed when the path is missing. A nested collection macro whose lambda
-    rebinds the same variable name shadows the outer variable, so substitution
-    only descends into its collection operand.
+
+def _element_value(element: Any, variable_name: str, name: str) -> Any:
+    """Read a lambda reference off a concrete collection element.
+
+    A bare reference to the variable is the element itself; a
+    ``variable.path.to.field`` reference drills into the element and fails closed
+    when the path is missing.
     """
-    if (expression := operand.get("expression")) is not None:
-        return {
-            "expression": _substitute_lambda_variable(
-                expression, variable_name, element
+    current = element
+    if name == variable_name:
+        return current
+    for segment in name[len(variable_name) + 1 :].split("."):
+        if not isinstance(current, dict) or segment not in current:
+            raise ValueError(
+                f'Cannot resolve "{name}": collection element has no field '
+                f'"{segment}"'
             )
-        }
+        current = current[segment]
+    return current
 
-    if (name := operand.get("variable")) is not None:
-        if name == variable_name:
-            return {"value": element}
-        if name.startswith(f"{variable_name}."):
-            current = element
-            for segment in name[len(variable_name) + 1 :].split("."):
-                if not isinstance(current, dict) or segment not in current:
-                    raise ValueError(
-                        f'Cannot resolve "{name}": collection element has no field '
-                        f'"{segment}"'
-                    )
-                current = current[segment]
-            return {"value": current}
-        return operand
 
-    if "operator" not in operand:
+def _unwrap_timestamp(operand: dict) -> Tuple[dict, bool]:
+    """Strip a ``timestamp(...)`` conversion, reporting whether there was one."""
+    expression = operand.get("expression")
+    if expression is not None and expression.get("operator") == "timestamp":
+        operands = expression.get("operands", [])
+        if len(operands) == 1:
+            return operands[0], True
+    return operand, False
+
+
+def _element_templated_comparison(
+    body: dict, variable_name: str
+) -> Union[Tuple[str, str, str, bool], None]:
+    """Destructure a lambda body comparing one attribute with the element.
+
+    Returns ``(operator, attribute, reference, temporal)`` for ``R.attr.a <op> x``
+    or ``R.attr.a <op> x.field``, with a value-first body mirrored so the attribute
+    always reads as the left operand, or ``None`` for any other body. ``temporal``
+    is set when BOTH operands are wrapped in ``timestamp()``; a body converting
+    only one side is not a template.
+    """
+    expression = _unwrap_expression(body)
+    operator = expression.get("operator")
+    operands = expression.get("operands", [])
+    if operator not in _COMPARISON_OPERATORS or len(operands) != 2:
+        return None
+    (left, left_temporal), (right, right_temporal) = map(_unwrap_timestamp, operands)
+    if left_temporal != right_temporal:
+        return None
+    left_reference = _lambda_reference(left, variable_name)
+    right_reference = _lambda_reference(right, variable_name)
+    if right_reference is not None and left_reference is None and "variable" in left:
+        return operator, left["variable"], right_reference, left_temporal
+    if left_reference is not None and right_reference is None and "variable" in right:
+        return (
+            _MIRRORED_OPERATORS.get(operator, operator),
+            right["variable"],
+            left_reference,
+            left_temporal,
+        )
+    return None
+
+
+def _element_templated_junction(
+    body: dict, variable_name: str, junction: str
+) -> Union[List[Tuple[str, str, str, bool]], None]:
+    """Destructure an ``and``/``or`` whose every operand is an element template.
+
+    Returns the per-operand ``_element_templated_comparison`` tuples, or ``None``
+    when the body is another operator or any operand is not a template.
+    """
+    expression = _unwrap_expression(body)
+    operands = expression.get("operands", [])
+    if expression.get("operator") != junction or len(operands) < 2:
+        return None
+    templates = []
+    for operand in operands:
+        template = _element_templated_comparison(operand, variable_name)
+        if template is None:
+            return None
+        templates.append(template)
+    return templates
+
+
+def _element_templated_match(
+    body: dict, variable_name: str
+) -> Union[Tuple[str, str, str], None]:
+    """Destructure ``R.attr.a.<match>(x)`` or ``R.attr.a.<match>(x.field)``.
+
+    Returns ``(operator, attribute, reference)`` when the attribute is the
+    receiver and the element the needle, else ``None``. String matches are not
+    symmetric, so an element receiver is not a template.
+    """
+    expression = _unwrap_expression(body)
+    operator = expression.get("operator")
+    operands = expression.get("operands", [])
+    if operator not in _STRING_MATCH_OPERATORS or len(operands) != 2:
+        return None
+    receiver, needle = operands
+    reference = _lambda_reference(needle, variable_name)
+    if (
+        reference is None
+        or "variable" not in receiver
+        or _lambda_reference(receiver, variable_name) is not None
+    ):
+        return None
+    return operator, receiver["variable"], reference
+
+
+def _minimal_needles(operator: str, needles: List[str], disjunctive: bool) -> list:
+    """Drop the needles another needle in the list makes redundant.
+
+    Under ``exists`` (``disjunctive``) a needle is redundant when a weaker one
+    is present: a receiver starting with ``/a/b`` also starts with ``/a``, so
+    ``/a`` answers for both. Under ``all`` it is the stronger one that answers,
+    and the weaker needles go. ``contains`` weighs by substring, ``startsWith``
+    by prefix and ``endsWith`` by suffix. Survivors keep their list order.
+    """
+    distinct = list(dict.fromkeys(needles))
+    if operator == "contains":
+        # The weaker needle is the shorter one, so visit in the order that meets
+        # the needles able to answer for others first.
+        ordered = sorted(distinct, key=len, reverse=not disjunctive)
+        kept: List[str] = []
+        for needle in ordered:
+            if disjunctive and any(other in needle for other in kept):
+                continue
+            if not disjunctive and any(needle in other for other in kept):
+                continue
+            kept.append(needle)
+    else:
+        # A prefix sorts immediately before the strings extending it, so only a
+        # needle's sorted neighbour needs checking. Suffixes are prefixes of the
+        # reversed strings.
+        flip = (lambda needle: needle[::-1]) if operator == "endsWith" else str
+        ordered = sorted(flip(needle) for needle in distinct)
+        kept = []
+        for index, needle in enumerate(ordered):
+            if disjunctive:
+                if kept and needle.startswith(kept[-1]):
+                    continue
+            elif index + 1 < len(ordered) and ordered[index + 1].startswith(needle):
+                continue
+            kept.append(needle)
+        kept = [flip(needle) for needle in kept]
+    survivors = set(kept)
+    return [needle for needle in distinct if needle in survivors]
+
+
+def _is_finite_number(value: Any) -> bool:
+    return (
+        not isinstance(value, bool)
+        and isinstance(value, (int, float))
+        and math.isfinite(value)
+    )
+
+
+def _is_set_member(value: Any) -> bool:
+    """A literal an ``IN`` list binds exactly as the unrolled equality would."""
+    return value is None or isinstance(value, str) or _is_finite_number(value)
+
+
+def _ordered_bound(values: list, lowest: bool) -> Any:
+    """The least or greatest of a homogeneous literal list, else ``None``.
+
+    Only numbers, strings and instants qualify, each compared among its own kind:
+    CEL orders strings by code point, which is Python's order too -- and the
+    column's only under a binary collation, which the README requires of ordered
+    string attributes. A NaN element is unordered, so a list holding one has no
+    bound that answers for it.
+    """
+    homogeneous = (
+        all(_is_finite_number(value) for value in values)
+        or all(isinstance(value, str) for value in values)
+        or all(isinstance(value, datetime) for value in values)
+    )
+    if not homogeneous:
+        return None
+    return min(values) if lowest else max(values)
+
+
+# The lambda variables in scope while a fold translates its body: variable name ->
+# the element bound to it. Immutable, so each element's scope is one small mapping
+# layered over its parent's instead of a rewritten copy of the body.
+_Bindings = Mapping[str, Any]
+_NO_BINDINGS: _Bindings = MappingProxyType({})
+
+
+def _bind(bindings: _Bindings, variable_name: str, element: Any) -> _Bindings:
+    """``bindings`` with ``variable_name`` bound to ``element``, shadowing any
+    outer binding of the same name."""
+    return MappingProxyType({**bindings, variable_name: element})
+
+
+def _bound_operand(operand: dict, bindings: _Bindings) -> dict:
+    """Read a bound lambda reference off its element, as a ``value`` operand.
+
+    A bare reference to a bound variable is the element itself; a
+    ``variable.path.to.field`` reference drills into the element and fails
+    closed when the path is missing. Any other operand is returned as is.
+    """
+    if not bindings or (name := operand.get("variable")) is None:
         return operand
+    variable_name = name.split(".", 1)[0]
+    if variable_name not in bindings:
+        return operand
+    return {"value": _element_value(bindings[variable_name], variable_name, name)}
+
+
+def _lambda_scope(expression: dict, bindings: _Bindings) -> _Bindings:
+    """The bindings visible inside ``expression``.
+
+    A lambda that rebinds a bound name shadows the outer binding: its body and
+    its own variable operand see the name unbound, exactly as a nested
+    collection macro would in CEL.
+    """
+    if not bindings or expression.get("operator") != "lambda":
+        return bindings
+    operands = expression.get("operands", [])
+    if len(operands) != 2 or operands[1].get("variable") not in bindings:
+        return bindings
+    shadowed = operands[1]["variable"]
+    return MappingProxyType(
+        {name: element for name, element in bindings.items() if name != shadowed}
+    )
+
+
+def _intern_literals(condition: Any) -> Any:
+    """Share one bind parameter between every occurrence of the same literal.
+
+    The value-list fold, the arms ``_compare`` copies across a retained ternary and
+    the ``definite_equality`` expansion all repeat a literal, and SQLAlchemy gives
+    each occurrence its own anonymous parameter. Reusing one ``BindParameter``
+    object renders one name wherever it appears, so the statement binds each
+    distinct literal once.
 
-    operator = operand["operator"]
-    child_operands = operand.get("operands", [])
+    Only anonymous literals are shared. A named ``bindparam("tenant")`` is a
+    placeholder the caller fills at execution, and two of them with no value yet
+    are still different parameters; sharing one would read the tenant's value
+    wherever the other is compared. A ``required`` bind or one with a ``callable``
+    has no value until execution either, so none of those is ever shared.
 
-    if operator in _LAMBDA_BINDING_OPERATORS and len(child_operands) == 2:
-        nested_collection, nested_lambda = child_operands
-        nested_expression = _unwrap_expression(nested_lambda)
-        nested_lambda_operands = nested_expression.get("operands", [])
+    The key is the value's Python type, its ``repr`` and the SQL type it binds as,
+    so ``True`` stays apart from ``1``, ``1`` from ``1.0`` and an ``Integer`` bind
+    from a ``Numeric`` one. ``repr`` is what keeps ``-0.0`` apart from ``0.0``.
+    """
+    if not isinstance(condition, ColumnElement):
+        return condition
+    interned: Dict[Tuple[Any, ...], BindParameter] = {}
+
+    def intern(element: Any) -> Any:
         if (
-            nested_expression.get("operator") == "lambda"
-            and len(nested_lambda_operands) == 2
-            and nested_lambda_operands[1].get("variable") == variable_name
+            not isinstance(element, BindParameter)
+            or not element.unique
+            or element.required
+            or element.callable is not None
+            or element.value is None
         ):
-            # The nested lambda rebinds our variable: it shadows the outer
-            # binding, so only its collection operand may be substituted.
-            return {
-                "operator": operator,
-                "operands": [
-                    _substitute_lambda_variable(
-                        nested_collection, variable_name, element
-                    ),
-                    nested_lambda,
-                ],
-            }
+            return None
+        key = (
+            type(element.value),
+            repr(element.value),
+            type(element.type),
+            repr(element.type),
+            element.expanding,
+            element.literal_execute,
+        )
+        return interned.setdefault(key, element)
 
-    return {
-        "operator": operator,
-        "operands": [
-            _substitute_lambda_variable(child, variable_name, element)
-            for child in child_operands
-        ],
-    }
+    return visitors.replacement_traverse(condition, {}, intern)
 
 
 # We support both the legacy HTTP and gRPC clients, so therefore we need to accept both input types
@@ -853,32 +2559,56 @@ def _get_table_name(t: GenericTable) -> str:
         return t.name
 
 
+def _reads_relation(operand: dict, relations: frozenset) -> bool:
+    """Whether ``operand`` is a relation operator over a ``Relation`` attribute.
+
+    Directly -- ``size(R.attr.tags)`` -- or through the collection a nested one
+    yields, as in ``size(R.attr.tags.filter(...))``.
+    """
+    expression = _unwrap_expression(operand)
+    if expression.get("operator") not in {*_RELATION_FNS, *_RELATION_MACROS}:
+        return False
+    return any(
+        child.get("variable") in relations or _reads_relation(child, relations)
+        for child in expression.get("operands", [])
+    )
+
+
 def _variables_outside_overrides(
-    operand: dict, override_operators: frozenset, override_owned: bool = False
+    operand: dict,
+    override_operators: frozenset,
+    relations: frozenset = frozenset(),
+    override_owned: bool = False,
 ) -> frozenset:
     """Find variables that still require an ordinary table mapping.
 
     An override owns its complete operand subtree: it may turn foreign columns
-    or relation markers into a correlated subquery instead of a flat JOIN.
-    Variables outside such a subtree retain the normal fail-closed
+    or relation markers into a correlated subquery instead of a flat JOIN, and
+    a relation operator over a ``Relation`` owns its subtree for the same
+    reason. Variables outside such a subtree retain the normal fail-closed
     ``table_mapping`` requirement. Boolean/ternary traversal is built in and
     cannot itself be overridden, so merely declaring those keys owns nothing.
     """
     if (expression := operand.get("expression")) is not None:
         return _variables_outside_overrides(
-            expression, override_operators, override_owned
+            expression, override_operators, relations, override_owned
         )
     if "variable" in operand:
         return frozenset() if override_owned else frozenset({operand["variable"]})
 
     operator = operand.get("operator")
-    operator_owns_children = override_owned or (
-        operator in override_operators and operator not in {"and", "or", "not", "if"}
+    operator_owns_children = (
+        override_owned
+        or (
+            operator in override_operators
+            and operator not in {"and", "or", "not", "if"}
+        )
+        or _reads_relation(operand, relations)
     )
     variables = frozenset()
     for child in operand.get("operands", []):
         variables |= _variables_outside_overrides(
-            child, override_operators, operator_owns_children
+            child, override_operators, relations, operator_owns_children
         )
     return variables
 
@@ -896,6 +2626,12 @@ def get_query(
     attribute_null_representation: Union[
         Dict[str, NullAttributeRepresentation], None
     ] = ...,
+    string_match_lowering: StringMatchLowering = ...,
+    attribute_hierarchy_representation: Union[
+        Dict[str, Union[HierarchyRepresentation, ClosureTable]], None
+    ] = ...,
+    cel_functions: bool = ...,
+    collection_macro_lowering: CollectionMacroLowering = ...,
 ) -> Select[Tuple[_ORMModel]]:
     ...
 
@@ -915,6 +2651,12 @@ def get_query(
     attribute_null_representation: Union[
         Dict[str, NullAttributeRepresentation], None
     ] = ...,
+    string_match_lowering: StringMatchLowering = ...,
+    attribute_hierarchy_representation: Union[
+        Dict[str, Union[HierarchyRepresentation, ClosureTable]], None
+    ] = ...,
+    cel_functions: bool = ...,
+    collection_macro_lowering: CollectionMacroLowering = ...,
 ) -> Select[Any]:
     ...
 
@@ -929,6 +2671,12 @@ def get_query(
     attribute_null_representation: Union[
         Dict[str, NullAttributeRepresentation], None
     ] = None,
+    string_match_lowering: StringMatchLowering = "like",
+    attribute_hierarchy_representation: Union[
+        Dict[str, Union[HierarchyRepresentation, ClosureTable]], None
+    ] = None,
+    cel_functions: bool = False,
+    collection_macro_lowering: CollectionMacroLowering = "probe",
 ) -> Select[Any]:
     """Translate a Cerbos query plan into a SQLAlchemy ``Select``.
 
@@ -964,12 +2712,100 @@ def get_query(
 
     See https://github.com/cerbos/query-plan-adapters/issues/302 and
     https://github.com/cerbos/query-plan-adapters/issues/308.
+
+    ``string_match_lowering`` picks the SQL for CEL's string matching.
+
+    - ``"like"`` (default) -- an escaped ``LIKE`` for every operator and operand
+      shape, which any collation the adapter supports evaluates correctly.
+    - ``"range"`` -- ``startsWith`` over a literal prefix becomes
+      ``col >= prefix AND col < successor(prefix)``, which an ordinary B-tree
+      index can range-scan. It is only correct when the column compares by code
+      point with no padding (SQLite ``BINARY``, PostgreSQL ``"C"``, MySQL
+      ``utf8mb4_0900_bin``), so it is never the default. Every other shape
+      keeps its default lowering.
+    - ``"glob"`` -- SQLite only: all three operators over a literal needle
+      become ``GLOB`` with its metacharacters escaped, which is case-sensitive
+      without the connection-global ``PRAGMA case_sensitive_like`` and
+      index-assisted for a literal prefix.
+
+    A column needle is matched by position under every setting.
+
+    ``attribute_hierarchy_representation`` declares, per attribute, how a column
+    read through ``hierarchy()`` stores its path: ``"path"`` (a delimited
+    string, the default) or ``"ltree"`` (PostgreSQL's ``ltree``, whose
+    ``@>``/``<@`` a GiST index answers). A column whose type compiles to
+    ``ltree`` is detected without a declaration. Ltree operators are used when
+    every column operand is an ltree, the delimiter is ``.`` and every literal
+    path is one an ltree can hold; otherwise the ltree column is read as text
+    and the portable lowering applies. A ``ClosureTable`` instead looks each
+    pair of paths up in the caller's closure table with a correlated
+    ``EXISTS``, guarded so a NULL path stays UNKNOWN.
+
+    ``cel_functions`` declares that the database has the CEL conversion functions
+    installed (``register_cel_functions`` on SQLite, ``cel_function_ddl`` on
+    PostgreSQL and MySQL). ``int()``, ``double()`` and ``string()`` over a boolean,
+    which SQL CAST cannot reproduce and are otherwise refused, then lower to those
+    functions, which return NULL wherever CEL raises. The operand's column type picks
+    the function, so a column of any other type is still refused.
+
+    ``collection_macro_lowering`` picks how ``exists`` and ``all`` over a
+    ``Relation`` decide a lambda body that can be NULL.
+
+    - ``"probe"`` (default) -- one ``EXISTS`` for a witness and, only without one,
+      another for an erroring element. Each stops at the first row it finds.
+    - ``"aggregate"`` -- one correlated ``MAX(CASE ...)`` that scans the element
+      rows once and grades them: a witness, an error, or neither. Cheaper when most
+      parents have no witness, since the probes would then read their rows twice.
+
+    A body that cannot be NULL is a single ``EXISTS`` under both settings.
     """
     if null_attribute_representation not in ("explicit", "omitted"):
         raise ValueError(
             "null_attribute_representation must be 'explicit' or 'omitted', got "
             f"{null_attribute_representation!r}"
         )
+    if string_match_lowering not in ("like", "range", "glob"):
+        raise ValueError(
+            "string_match_lowering must be 'like', 'range' or 'glob', got "
+            f"{string_match_lowering!r}"
+        )
+    if collection_macro_lowering not in ("probe", "aggregate"):
+        raise ValueError(
+            "collection_macro_lowering must be 'probe' or 'aggregate', got "
+            f"{collection_macro_lowering!r}"
+        )
+    hierarchy_representations: Dict[
+        str, Union[HierarchyRepresentation, ClosureTable]
+    ] = (attribute_hierarchy_representation or {})
+    for attribute, representation in hierarchy_representations.items():
+        if not isinstance(representation, ClosureTable) and representation not in (
+            "path",
+            "ltree",
+        ):
+            raise ValueError(
+                "attribute_hierarchy_representation values must be 'path', 'ltree' "
+                f"or a ClosureTable, got {representation!r} for {attribute!r}"
+            )
+        if attribute not in attr_map:
+            raise ValueError(
+                f"attribute_hierarchy_representation names {attribute!r}, which is "
+                "not in the attribute column map"
+            )
+    default_fns: Mapping[str, Callable[[Any, Any], Any]] = OPERATOR_FNS
+    if string_match_lowering == "range":
+        default_fns = {
+            **OPERATOR_FNS,
+            "startsWith": _prefix_range,
+            **_hierarchy_fns(_prefix_range),
+        }
+    elif string_match_lowering == "glob":
+        default_fns = {
+            **OPERATOR_FNS,
+            **_GLOB_MATCH_FNS,
+            **_hierarchy_fns(_GLOB_MATCH_FNS["startsWith"]),
+        }
+    if cel_functions:
+        default_fns = {**default_fns, **_CEL_FUNCTION_FNS}
     null_conventions: Dict[str, NullAttributeRepresentation] = (
         attribute_null_representation or {}
     )
@@ -1003,19 +2839,27 @@ def get_query(
         cond, null_conventions, null_attribute_representation
     )
 
-    # Inspect columns that the normal translator owns. Override-owned operands
-    # may legitimately be relation markers or columns translated into
-    # correlated subqueries, but an unrelated override must never disable the
-    # ordinary cross-table mapping requirement.
-    if operator_override_fns is None:
+    # Inspect columns that the normal translator owns. The operands of an
+    # override, or of a relation operator over a `Relation`, may legitimately be
+    # relation markers or columns translated into correlated subqueries, but an
+    # unrelated override must never disable the ordinary cross-table mapping
+    # requirement.
+    relations = frozenset(
+        variable
+        for variable, column in attr_map.items()
+        if isinstance(column, Relation)
+    )
+    if operator_override_fns is None and not relations:
         attributes_to_validate = attr_map.items()
     else:
         active_override_operators = frozenset(
             operator
-            for operator, override in operator_override_fns.items()
+            for operator, override in (operator_override_fns or {}).items()
             if override is not None
         )
-        variables = _variables_outside_overrides(cond, active_override_operators)
+        variables = _variables_outside_overrides(
+            cond, active_override_operators, relations
+        )
         attributes_to_validate = (
             (variable, attr_map[variable])
             for variable in variables
@@ -1065,11 +2909,17 @@ def get_query(
         ):
             return override_fn(c, v)
 
+        if isinstance(c, (Relation, Collection)) or isinstance(
+            v, (Relation, Collection)
+        ):
+            if (relation_fn := _RELATION_FNS.get(op)) is not None:
+                return relation_fn(c, v)
+
         # Otherwise, fall back to default handlers
-        if (default_fn := OPERATOR_FNS.get(op)) is not None:
+        if (default_fn := default_fns.get(op)) is not None:
             _require_lowerable(op, c)
             _require_lowerable(op, v)
-            return default_fn(c, v)
+            return default_fn(_stored_instant(v, c), _stored_instant(c, v))
 
         raise ValueError(f"Unrecognised operator: {op}")
 
@@ -1099,23 +2949,28 @@ def get_query(
         UNKNOWN to all three, which excludes the row under BOTH polarities --
         so the NOT an enclosing negation applies has nothing definite to flip.
 
-        Deliberately not ``is_distinct_from``. Two reasons, and the second is
-        the load-bearing one: the same expression has to render on SQLite,
-        PostgreSQL and MySQL -- and a null-safe equality is SYMMETRIC while this
-        rewrite must not be. When only ONE side declares the convention, the
-        other side's NULL is a MISSING attribute on the check side, so CEL raises
-        an error and denies; only the asymmetric expansion below keeps
-        propagating UNKNOWN for it. A null-safe operator would match the two
-        NULLs and over-grant.
+        When BOTH sides declare the convention, CEL's equality is exactly SQL's
+        null-safe one, so it renders as that single predicate:
+        ``IS NOT DISTINCT FROM`` on PostgreSQL, ``<=>`` on MySQL and ``IS`` on
+        SQLite, each of which the engine can answer from an index.
+
+        When only ONE side declares it, a null-safe operator is wrong: it is
+        SYMMETRIC, while the other side's NULL is a MISSING attribute on the
+        check side, so CEL raises an error and denies. Only the asymmetric
+        expansion below keeps propagating UNKNOWN for it; a null-safe operator
+        would match the two NULLs and over-grant.
         """
+        right = _stored_instant(left_column, right)
+        if left_explicit and right_explicit:
+            if operator == "ne":
+                return left_column.is_distinct_from(right)
+            return left_column.is_not_distinct_from(right)
         present = []
         if left_explicit:
             present.append(left_column.isnot(None))
         if right_explicit:
             present.append(right.isnot(None))
         equality = and_(*present, left_column == right)
-        if left_explicit and right_explicit:
-            equality = or_(and_(left_column.is_(None), right.is_(None)), equality)
         return not_(equality) if operator == "ne" else equality
 
     def with_null_conventions(
@@ -1165,7 +3020,9 @@ def get_query(
                 return and_(left.isnot(None), plain)
         return plain
 
-    def fold_value_list_macro(operator: str, elements: Any, lambda_operand: dict):
+    def fold_value_list_macro(
+        operator: str, elements: Any, lambda_operand: dict, bindings: _Bindings
+    ):
         """Fold a collection macro whose collection operand is a literal value list.
 
         The planner emits this shape when a known-value collection (typically a
@@ -1174,13 +3031,15 @@ def get_query(
         (cerbos/cerbos#2570, cerbos/cerbos#2817; `maxItems = 10` in the
         planner's struct matcher). Apply the same fold here, uncapped, so the
         translated query does not depend on which side of that threshold the
-        collection lands: substitute each element into the lambda body and
-        combine the per-element predicates with OR (`exists`) or AND (`all`).
-
-        Each substituted body goes back through the ordinary traversal, so
-        comparison semantics — operator overrides, three-valued NULL handling,
-        value-first mirroring — are identical to a planner-unrolled chain of
-        the same comparisons.
+        collection lands: translate the lambda body once per element, with the
+        lambda variable bound to that element, and combine the per-element
+        predicates with OR (`exists`) or AND (`all`).
+
+        Each body goes through the ordinary traversal, which reads the binding
+        off the element wherever the body references it rather than copying
+        the element into the body. Comparison semantics — operator overrides,
+        three-valued NULL handling, value-first mirroring — are therefore
+        identical to a planner-unrolled chain of the same comparisons.
         """
         if operator not in _FOLDABLE_COLLECTION_OPERATORS:
             raise ValueError(
@@ -1208,19 +3067,215 @@ def get_query(
         if not variable_name:
             raise ValueError("Lambda variable must have a name")
 
-        predicates = [
-            traverse_and_map_operands(
-                _substitute_lambda_variable(body, variable_name, element)
-            )
-            for element in elements
-        ]
-        if not predicates:
+        if not elements:
             # CEL identity semantics over an empty collection: exists() matches
             # nothing, all() matches everything.
             return false() if operator == "exists" else true()
+
+        for reduction in (
+            value_list_membership,
+            value_list_bound,
+            value_list_rows,
+            value_list_needles,
+        ):
+            reduced = reduction(operator, elements, body, variable_name, bindings)
+            if reduced is not None:
+                return reduced
+
+        predicates = [
+            traverse_and_map_operands(body, _bind(bindings, variable_name, element))
+            for element in elements
+        ]
+        return or_(*predicates) if operator == "exists" else and_(*predicates)
+
+    def template_column(attribute: str, bindings: _Bindings) -> Any:
+        """The plain column an element template compares with, else ``None``.
+
+        A name an enclosing fold has bound is an outer lambda variable, not an
+        attribute, and a mapped expression is not a column a set or bound
+        predicate can stand in for.
+        """
+        if attribute.split(".", 1)[0] in bindings:
+            return None
+        column = resolve_variable(attribute)
+        if not isinstance(column, (ColumnElement, InstrumentedAttribute)):
+            return None
+        return column
+
+    def value_list_membership(
+        operator: str,
+        elements: list,
+        body: dict,
+        variable_name: str,
+        bindings: _Bindings,
+    ) -> Any:
+        """Lower ``exists(list, x, a == x)``/``all(list, x, a != x)`` to one ``IN``.
+
+        The unrolled chain is ``a = e1 OR a = e2 ...`` (or the ``!=`` conjunction),
+        and a set predicate through ``_in`` is the same predicate row for row: a
+        NULL ``a`` is UNKNOWN in both, a null element becomes the same ``IS NULL``
+        disjunct the ``eq(a, null)`` leaf renders, and an attribute declared
+        explicit-null gets the presence guard ``in`` carries, which is definite
+        exactly where ``definite_equality`` is. ``all`` is the negated membership,
+        which is the chain's De Morgan dual under three-valued logic too.
+
+        Returns ``None`` for anything the chain would translate differently: an
+        overridden comparison, an attribute that is not a plain column, or an
+        element that does not bind as the same literal.
+        """
+        template = _element_templated_comparison(body, variable_name)
+        if template is None:
+            return None
+        comparison, attribute, reference, temporal = template
+        if temporal or (operator, comparison) not in (("exists", "eq"), ("all", "ne")):
+            return None
+        if operator_override_fns and operator_override_fns.get(comparison):
+            return None
+        column = template_column(attribute, bindings)
+        if column is None:
+            return None
+        values = [_element_value(e, variable_name, reference) for e in elements]
+        if not all(_is_set_member(value) for value in values):
+            return None
+        membership = with_null_conventions(
+            "in",
+            column,
+            values,
+            is_explicit_null(attribute),
+            False,
+            _in(column, values),
+        )
+        return membership if operator == "exists" else not_(membership)
+
+    def value_list_bound(
+        operator: str,
+        elements: list,
+        body: dict,
+        variable_name: str,
+        bindings: _Bindings,
+    ) -> Any:
+        """Reduce an ordered comparison over a literal list to its tightest bound.
+
+        ``exists(list, v, a > v)`` holds exactly when ``a > min(list)``, and
+        ``all(list, v, a > v)`` exactly when ``a > max(list)``; ``<``/``<=`` swap
+        the two. Under three-valued logic a NULL ``a`` is UNKNOWN in every
+        disjunct (or conjunct) of the chain and in the single comparison alike, so
+        the reduction holds for every row. The empty list never reaches here: the
+        caller keeps its ``false()``/``true()`` identities.
+
+        Returns ``None`` — the full fold — for an overridden comparison, a
+        non-column attribute, or a list with no sound bound (mixed kinds, NaN).
+        """
+        template = _element_templated_comparison(body, variable_name)
+        if template is None:
+            return None
+        comparison, attribute, reference, temporal = template
+        if comparison not in _MIRRORED_OPERATORS:
+            return None
+        if operator_override_fns and (
+            operator_override_fns.get(comparison)
+            or (temporal and operator_override_fns.get("timestamp"))
+        ):
+            return None
+        column = template_column(attribute, bindings)
+        if column is None:
+            return None
+        values = [_element_value(e, variable_name, reference) for e in elements]
+        if temporal:
+            column = get_operator_fn("timestamp", column, None)
+            values = [_timestamp(value, None) for value in values]
+        lower_bounded = comparison in ("gt", "ge")
+        bound = _ordered_bound(values, lowest=lower_bounded == (operator == "exists"))
+        if bound is None:
+            return None
+        return get_operator_fn(comparison, column, bound)
+
+    def value_list_rows(
+        operator: str,
+        elements: list,
+        body: dict,
+        variable_name: str,
+        bindings: _Bindings,
+    ) -> Any:
+        """Lower a per-field equality conjunction over objects to a row-value ``IN``.
+
+        ``exists(grants, g, R.attr.id == g.id && R.attr.scope == g.scope)`` unrolls
+        to ``(id = ? AND scope = ?) OR ...``, which is by definition
+        ``(id, scope) IN ((?, ?), ...)``: SQL compares row values field by field
+        and ANDs the results, so a NULL column answers UNKNOWN or FALSE in exactly
+        the rows the chain does. ``all`` over the ``!=`` disjunction is the negated
+        membership. SQLAlchemy renders the list per dialect -- a ``VALUES`` list on
+        SQLite -- so a composite index on the columns serves it directly. SQL
+        Server, which has no row values, still receives the chain.
+
+        Returns ``None`` whenever a field would not translate as a plain equality:
+        an overridden comparison, a non-column or explicit-null attribute, or a
+        null or non-scalar field value (``eq(a, null)`` is ``IS NULL``, which has
+        no row-value form).
+        """
+        junction, comparison = {"exists": ("and", "eq"), "all": ("or", "ne")}[operator]
+        templates = _element_templated_junction(body, variable_name, junction)
+        if templates is None:
+            return None
+        if operator_override_fns and operator_override_fns.get(comparison):
+            return None
+        columns = []
+        for template_comparison, attribute, _, temporal in templates:
+            if template_comparison != comparison or temporal:
+                return None
+            column = template_column(attribute, bindings)
+            if column is None or is_explicit_null(attribute):
+                return None
+            columns.append(column)
+        rows = []
+        for element in elements:
+            row = tuple(
+                _element_value(element, variable_name, reference)
+                for _, _, reference, _ in templates
+            )
+            if not all(value is not None and _is_set_member(value) for value in row):
+                return None
+            rows.append(row)
+        return _row_membership(columns, rows, negated=operator == "all")
+
+    def value_list_needles(
+        operator: str,
+        elements: list,
+        body: dict,
+        variable_name: str,
+        bindings: _Bindings,
+    ) -> Any:
+        """Fold a string match over literal needles, minus the redundant ones.
+
+        ``exists(paths, p, R.attr.path.startsWith(p))`` over ``/a``, ``/a/b`` and
+        ``/a/b/c`` is ``path`` starting with ``/a`` alone; ``all`` keeps only the
+        longest. The surviving needles lower exactly as the full fold would, one
+        match each, so a NULL receiver is UNKNOWN in the fold either way.
+
+        Returns ``None`` for an overridden match, a non-column receiver, or a
+        needle that is not a string.
+        """
+        template = _element_templated_match(body, variable_name)
+        if template is None:
+            return None
+        match, attribute, reference = template
+        if operator_override_fns and operator_override_fns.get(match):
+            return None
+        column = template_column(attribute, bindings)
+        if column is None:
+            return None
+        needles = [_element_value(e, variable_name, reference) for e in elements]
+        if not all(isinstance(needle, str) for needle in needles):
+            return None
+        predicates = [
+            get_operator_fn(match, column, needle)
+            for needle in _minimal_needles(match, needles, operator == "exists")
+        ]
         return or_(*predicates) if operator == "exists" else and_(*predicates)
 
-    def try_fold_value_list_macro(operator: str, child_operands: list):
+    def try_fold_value_list_macro(
+        operator: str, child_operands: list, bindings: _Bindings
+    ):
         """Return the folded predicate for a value-list macro, else None.
 
         A literal value list can never be a relation marker or a column, so no
@@ -1231,33 +3286,89 @@ def get_query(
         collection, lambda_operand = child_operands
         if "value" not in collection:
             return None
-        return fold_value_list_macro(operator, collection["value"], lambda_operand)
+        return fold_value_list_macro(
+            operator, collection["value"], lambda_operand, bindings
+        )
+
+    def relation_macro(operator: Any, child_operands: list, bindings: _Bindings):
+        """Lower a collection macro over a ``Relation`` attribute, else None.
+
+        The lambda body translates like any other predicate, reading the element's
+        columns through the attribute map, and the relation correlates it over its
+        own rows. An override registered for the macro takes precedence.
+        """
+        if operator not in _RELATION_MACROS or len(child_operands) != 2:
+            return None
+        if operator_override_fns and operator_override_fns.get(operator) is not None:
+            return None
+        collection, lambda_operand = child_operands
+        relation = attr_map.get(collection.get("variable"))
+        if not isinstance(relation, Relation):
+            return None
+        lambda_expression = _unwrap_expression(lambda_operand)
+        lambda_operands = lambda_expression.get("operands", [])
+        if lambda_expression.get("operator") != "lambda" or len(lambda_operands) != 2:
+            raise ValueError(
+                f"Second operand of {operator} must be a lambda expression"
+            )
+        scope = _lambda_scope(lambda_expression, bindings)
+        if operator == "map":
+            body = resolve_operand(lambda_operands[0], scope)
+        else:
+            body = require_boolean(
+                traverse_and_map_operands(lambda_operands[0], scope),
+                f"{operator}() lambda body",
+            )
+        if isinstance(body, bool):
+            body = true() if body else false()
+        return _relation_macro(operator, relation, body, collection_macro_lowering)
+
+    def relation_collection(operand: dict, bindings: _Bindings) -> Any:
+        """The ``Relation`` or derived ``Collection`` ``operand`` reads, else None."""
+        relation = attr_map.get(operand.get("variable"))
+        if isinstance(relation, Relation):
+            return relation
+        expression = operand.get("expression") or {}
+        return relation_macro(
+            expression.get("operator"), expression.get("operands", []), bindings
+        )
 
-    def resolve_operand(operand: dict) -> Any:
+    def resolve_operand(operand: dict, bindings: _Bindings = _NO_BINDINGS) -> Any:
         """Resolve an operand to a SQL value/expression, descending into nested
         `expression` operands so that value-returning operators (arithmetic,
         casts, ternary, etc.) compose inside outer comparisons.
         """
+        operand = _bound_operand(operand, bindings)
         if "value" in operand:
             return operand["value"]
         if "variable" in operand:
             return resolve_variable(operand["variable"])
         if (exp := operand.get("expression")) is not None:
-            return evaluate_expression(exp)
+            return evaluate_expression(exp, bindings)
         raise ValueError(f"Unrecognised operand shape: {operand}")
 
-    def evaluate_expression(expression: dict) -> Any:
+    def ternary_condition(operand: dict, bindings: _Bindings) -> Any:
+        """Translate the condition of an ``if``: a boolean expression, or a bare
+        boolean variable or value."""
+        if "expression" in operand:
+            return traverse_and_map_operands(operand["expression"], bindings)
+        return resolve_operand(operand, bindings)
+
+    def evaluate_expression(
+        expression: dict, bindings: _Bindings = _NO_BINDINGS
+    ) -> Any:
         """Evaluate a value-producing expression node (an `{operator, operands}`
         dict) to a SQL expression. Used for nested non-boolean operators.
         """
         operator = expression["operator"]
-        child_operands = expression["operands"]
+        bindings = _lambda_scope(expression, bindings)
+        child_operands = [_bound_operand(o, bindings) for o in expression["operands"]]
 
         # Boolean combinators can appear nested inside value expressions
         # (e.g. a lambda body of `and(...)`); route them back through the
         # predicate traversal rather than treating them as binary operators.
         if operator in ("and", "or", "not"):
-            return traverse_and_map_operands(expression)
+            return traverse_and_map_operands(expression, bindings)
 
         if operator == "if":
             # Ternary: if(cond, then, else). The condition may be either a
@@ -1269,32 +3380,40 @@ def get_query(
             # WHEN-cond/WHEN-not-cond pair (no ELSE) yields NULL for UNKNOWN
             # conditions, keeping the row excluded under BOTH polarities
             # (`NOT (NULL > 1)` stays UNKNOWN instead of leaking to TRUE).
-            first = child_operands[0]
-            if "expression" in first:
-                cond = traverse_and_map_operands(first["expression"])
-            else:
-                cond = resolve_operand(first)
-            then_value = resolve_operand(child_operands[1])
-            else_value = resolve_operand(child_operands[2])
-            if isinstance(then_value, (_IEEEConstant, _ConditionalValue)) or isinstance(
-                else_value, (_IEEEConstant, _ConditionalValue)
+            cond = ternary_condition(child_operands[0], bindings)
+            then_value = resolve_operand(child_operands[1], bindings)
+            else_value = resolve_operand(child_operands[2], bindings)
+            if isinstance(then_value, _SYMBOLIC_VALUE_TYPES) or isinstance(
+                else_value, _SYMBOLIC_VALUE_TYPES
             ):
                 return _ConditionalValue(cond, then_value, else_value)
             return case((cond, then_value), (not_(cond), else_value))
 
-        folded = try_fold_value_list_macro(operator, child_operands)
+        folded = try_fold_value_list_macro(operator, child_operands, bindings)
         if folded is not None:
             return folded
 
+        lowered = relation_macro(operator, child_operands, bindings)
+        if lowered is not None:
+            return lowered
+
         if operator == "hierarchy":
-            target = resolve_operand(child_operands[0])
+            target = resolve_operand(child_operands[0], bindings)
             delimiter = (
-                resolve_operand(child_operands[1]) if len(child_operands) == 2 else None
+                resolve_operand(child_operands[1], bindings)
+                if len(child_operands) == 2
+                else None
+            )
+            hierarchy = get_operator_fn(operator, target, delimiter)
+            representation = hierarchy_representations.get(
+                child_operands[0].get("variable")
             )
-            return get_operator_fn(operator, target, delimiter)
+            if isinstance(hierarchy, _Hierarchy) and representation is not None:
+                hierarchy = replace(hierarchy, representation=representation)
+            return hierarchy
 
         if operator in _UNARY_VALUE_OPERATORS:
-            target = resolve_operand(child_operands[0])
+            target = resolve_operand(child_operands[0], bindings)
             return get_operator_fn(operator, target, None)
 
         if len(child_operands) < 2:
@@ -1304,10 +3423,10 @@ def get_query(
         # Binary value operators (add/sub/mult/div/mod, plus any user override).
         # Operands are passed in wire (source) order, which is significant for
         # non-commutative operators (sub/div) and receiver-style string ops.
-        left = resolve_operand(child_operands[0])
-        right = resolve_operand(child_operands[1])
-        if isinstance(left, (_ConditionalValue, _IEEEConstant)) or isinstance(
-            right, (_ConditionalValue, _IEEEConstant)
+        left = resolve_operand(child_operands[0], bindings)
+        right = resolve_operand(child_operands[1], bindings)
+        if isinstance(left, _SYMBOLIC_VALUE_TYPES) or isinstance(
+            right, _SYMBOLIC_VALUE_TYPES
         ):
             if operator == "mod":
                 # CEL's % is integer-only while Cerbos attribute values are always
@@ -1319,13 +3438,134 @@ def get_query(
                     "supported: CEL's % is integer-only and attribute values are "
                     "always doubles, so the condition can never be satisfied by the PDP"
                 )
+
             # A retained ternary (a division that may be non-finite) must keep
             # propagating symbolically through the surrounding arithmetic.
-            return _arith_over_conditional(
-                lambda a, b: get_operator_fn(operator, a, b), left, right
-            )
+            def op_fn(a: Any, b: Any) -> Any:
+                return get_operator_fn(operator, a, b)
+
+            if not (operator_override_fns and operator in operator_override_fns):
+                combined = _combine_quotients(operator, op_fn, left, right)
+                if combined is not None:
+                    return combined
+            return _arith_over_conditional(op_fn, left, right)
         return get_operator_fn(operator, left, right)
 
+    def sargable_comparison(
+        operator: str, left_operand: dict, right_operand: dict, bindings: _Bindings
+    ) -> Any:
+        """Rewrite a conversion or arithmetic of an attribute against a literal
+        into a comparison of the bare column, else None.
+
+        Either side may hold the conversion; a value-first comparison mirrors as
+        it does for a bare column. Overridden operators keep their own lowering.
+        """
+        if operator not in _COMPARISON_OPERATORS:
+            return None
+        if "value" in left_operand:
+            operator = _MIRRORED_OPERATORS.get(operator, operator)
+            left_operand, right_operand = right_operand, left_operand
+        if "value" not in right_operand:
+            return None
+        expression = left_operand.get("expression") or {}
+        conversion = expression.get("operator")
+        if conversion in _MONOTONE_ARITHMETIC:
+            if operator_override_fns and any(
+                operator_override_fns.get(op) is not None
+                for op in (operator, *_MONOTONE_ARITHMETIC)
+            ):
+                return None
+            monotone = _monotone_arithmetic(
+                left_operand, lambda o: _bound_operand(o, bindings)
+            )
+            if monotone is None:
+                return None
+            return _monotone_comparison(
+                operator,
+                monotone,
+                resolve_variable(monotone.variable),
+                right_operand["value"],
+            )
+        if conversion not in ("size", "string") or len(expression["operands"]) != 1:
+            return None
+        if operator_override_fns and (
+            operator_override_fns.get(operator) is not None
+            or operator_override_fns.get(conversion) is not None
+        ):
+            return None
+        target = _bound_operand(expression["operands"][0], bindings)
+        if conversion == "size":
+            counted = relation_collection(target, bindings)
+            if counted is not None:
+                return _compared_size(operator, counted, right_operand["value"])
+        if "variable" not in target:
+            return None
+        return _sargable_unary_comparison(
+            operator,
+            conversion,
+            resolve_variable(target["variable"]),
+            right_operand["value"],
+        )
+
+    def distributed_ternary(
+        operator: str, left_operand: dict, right_operand: dict, bindings: _Bindings
+    ) -> Any:
+        """Compare each arm of an ``if`` operand on its own, else None.
+
+        ``if(c, a, b) <op> x`` becomes ``(c AND a <op> x) OR (NOT c AND b <op>
+        x) OR (c AND NOT c)``, so each arm is a predicate an index can serve
+        instead of a comparison against a ``CASE``. The last disjunct is FALSE
+        for a definite condition and UNKNOWN for an UNKNOWN one, which keeps
+        the whole UNKNOWN -- CEL's missing-attribute deny -- under both
+        polarities, as the ``CASE`` with no ``ELSE`` was. An arm that is itself
+        a ternary is distributed in turn; retained division ternaries, ``null``
+        arms and values other than columns, numbers and strings keep the
+        ``CASE`` lowering.
+        """
+        if operator not in _COMPARISON_OPERATORS:
+            return None
+        operands = [_bound_operand(o, bindings) for o in (left_operand, right_operand)]
+        for position, operand in enumerate(operands):
+            ternary = operand.get("expression") or {}
+            if ternary.get("operator") == "if":
+                break
+        else:
+            return None
+        condition_operand, *arm_operands = ternary["operands"]
+        comparisons = []
+        for arm_operand in arm_operands:
+            pair = [arm_operand, operands[1 - position]]
+            if position == 1:
+                pair.reverse()
+            compared = distributed_ternary(operator, *pair, bindings)
+            if compared is None:
+                values = [resolve_operand(o, bindings) for o in pair]
+                columns = [
+                    isinstance(v, (ColumnElement, InstrumentedAttribute))
+                    for v in values
+                ]
+                numbers = [_is_finite_number(v) for v in values]
+                strings = [isinstance(v, str) for v in values]
+                if not all(map(any, zip(columns, numbers, strings))):
+                    return None
+                if not any(columns) and not (all(numbers) or all(strings)):
+                    return None
+                compared = get_operator_fn(operator, *values)
+            comparisons.append(compared)
+        condition = ternary_condition(condition_operand, bindings)
+        if isinstance(condition, bool):
+            return comparisons[0] if condition else comparisons[1]
+        # A constant arm folds: a true one leaves its condition, a false one
+        # drops its disjunct.
+        disjuncts = [
+            arm_condition if compared is True else and_(arm_condition, compared)
+            for arm_condition, compared in zip(
+                (condition, not_(condition)), comparisons
+            )
+            if compared is not False
+        ]
+        return or_(*disjuncts, and_(condition, not_(condition)))
+
     def require_boolean(translated: Any, position: str):
         # Every position that CONSUMES a value as a boolean has to make the same check, not
         # just the root. `filter-as-condition` is refused at the root below; a `filter()`
@@ -1339,30 +3579,35 @@ def get_query(
                 f"the plan's {position} translated to {type(translated).__name__!r}, which "
                 "is not a boolean SQL expression. filter() and map() return a list, so they "
                 "cannot be a condition on their own (only size(filter(...)) has a boolean "
-                "meaning), and an operator override returning an intermediate value must be "
-                "consumed by an enclosing override before the root"
+                "meaning), and map() and filter() over a Relation must be consumed by an "
+                "enclosing size, in or hasIntersection before the root"
             )
         return translated
 
-    def traverse_and_map_operands(operand: dict):
+    def traverse_and_map_operands(operand: dict, bindings: _Bindings = _NO_BINDINGS):
         if exp := operand.get("expression"):
-            return traverse_and_map_operands(exp)
+            return traverse_and_map_operands(exp, bindings)
 
         # Bare leaf operands in a boolean position (e.g. `R.attr.aBool` as a
-        # conjunct of an `and`): resolve directly.
+        # conjunct of an `and`): resolve directly. A bound lambda variable reads
+        # as the element it is bound to.
+        operand = _bound_operand(operand, bindings)
         if "variable" in operand:
             return resolve_variable(operand["variable"])
         if "value" in operand:
             return operand["value"]
 
         operator = operand["operator"]
-        child_operands = operand["operands"]
+        bindings = _lambda_scope(operand, bindings)
+        child_operands = [_bound_operand(o, bindings) for o in operand["operands"]]
 
         # if `operator` in ["and", "or"], `child_operands` is a nested list of `expression` dicts (handled at the
         # beginning of this closure)
         if operator in ("and", "or", "not"):
             branches = [
-                require_boolean(traverse_and_map_operands(o), f"{operator!r} operand")
+                require_boolean(
+                    traverse_and_map_operands(o, bindings), f"{operator!r} operand"
+                )
                 for o in child_operands
             ]
             if operator == "and":
@@ -1372,16 +3617,20 @@ def get_query(
             return not_(*branches)
         if operator == "if":
             # A bare boolean-result ternary used directly as a predicate.
-            return evaluate_expression(operand)
+            return evaluate_expression(operand, bindings)
 
         # A literal value list arrives when the planner could not unroll a
         # macro over a known collection (more than 10 elements). Fold it before
         # override dispatch: overrides exist to translate relation/column
         # collections, which a literal can never be.
-        folded = try_fold_value_list_macro(operator, child_operands)
+        folded = try_fold_value_list_macro(operator, child_operands, bindings)
         if folded is not None:
             return folded
 
+        lowered = relation_macro(operator, child_operands, bindings)
+        if lowered is not None:
+            return lowered
+
         has_nested_expression = any("expression" in o for o in child_operands)
 
         # If the user has supplied an override for this operator and the
@@ -1397,7 +3646,7 @@ def get_query(
                 or not all("variable" in o or "value" in o for o in child_operands)
             )
         ):
-            resolved = [resolve_operand(o) for o in child_operands]
+            resolved = [resolve_operand(o, bindings) for o in child_operands]
             if len(resolved) == 1:
                 return operator_override_fns[operator](resolved[0], None)
             if len(resolved) == 2:
@@ -1407,8 +3656,13 @@ def get_query(
         # Boolean leaf operators take exactly two operands. Either side may be
         # a nested value-producing expression (arithmetic, cast, ternary, ...).
         if len(child_operands) == 2 and has_nested_expression:
-            left = resolve_operand(child_operands[0])
-            right = resolve_operand(child_operands[1])
+            rewritten = sargable_comparison(operator, *child_operands, bindings)
+            if rewritten is None:
+                rewritten = distributed_ternary(operator, *child_operands, bindings)
+            if rewritten is not None:
+                return rewritten
+            left = resolve_operand(child_operands[0], bindings)
+            right = resolve_operand(child_operands[1], bindings)
             return get_operator_fn(operator, left, right)
 
         # otherwise, they are a list[dict] (len==2), each operand a `variable` or a
@@ -1441,6 +3695,13 @@ def get_query(
                     "attribute_null_representation for both attributes, or for "
                     "neither."
                 )
+            if (
+                operator == "in"
+                and left_explicit
+                and isinstance(right_column, Relation)
+                and not (operator_override_fns or {}).get(operator)
+            ):
+                return _relation_membership(left_column, right_column, explicit=True)
             both_explicit = left_explicit and right_explicit
             return with_null_conventions(
                 operator,
@@ -1492,8 +3753,8 @@ def get_query(
 
     condition = traverse_and_map_operands(cond)
     # The root of the plan must translate to a boolean SQL expression. A non-boolean root —
-    # filter()/map() as the whole condition, or an operator override's intermediate value that
-    # no enclosing override consumed — must be refused HERE, by the adapter, rather than left
+    # filter()/map() as the whole condition, or a deferred Collection that no enclosing size, in
+    # or hasIntersection consumed — must be refused HERE, by the adapter, rather than left
     # for SQLAlchemy's where() coercion to trip over: a value that happened to coerce would
     # become a silently-wrong filter.
     #
@@ -1510,7 +3771,7 @@ def get_query(
     # holding one has always been accepted here. The check was discriminating by which of the
     # two flavours the mapper happened to hold, not by whether the root was boolean.
     require_boolean(condition, "condition")
-    q = select(table).where(condition)
+    q = select(table).where(_intern_literals(condition))
 
     if table_mapping:
         q = q.select_from(table)
@@ -1,24 +1,169 @@
-"""Helpers for the parts of a mapping this adapter cannot own.
+"""The relation model: how a collection-valued attribute reaches its rows.
 
-``get_query`` has no relation model. A collection-valued attribute reaches its rows
-entirely through ``operator_override_fns``: the caller writes the correlated
-subquery, so the caller owns the invariant that the subquery sees exactly the rows
-the application serialised into the resource attributes. That is the right split —
-only the caller knows whether its association is a ``relationship()``, a Core join
-or a soft-deleted table — but one part of it is not a judgement call, it is a
-mechanical requirement every join chain has, and every caller has to get it right
-the same way. This module holds that part.
+A ``Relation`` in ``attr_map`` stands for a list the application serialises from
+related rows. ``get_query`` lowers the collection macros over it to correlated
+subqueries, so the invariant every such subquery carries -- it sees exactly the
+rows the application put into the resource attributes -- is held here once rather
+than in every caller's overrides. ``Relation.from_relationship`` derives the join
+from mapped ``relationship()`` metadata, the way ``.any()`` does; a Core
+association is declared by hand with the same fields.
+
+``require_hops`` is the one part of that invariant every join chain needs, and is
+public so a caller who still writes its own override can apply it too.
 
 See "Mapping hazards" in the README, and ``conformance/README.md``.
 """
 
 from __future__ import annotations
 
-from typing import Any, Sequence
+import math
+from dataclasses import dataclass
+from typing import Any, List, Literal, Sequence, Union
+
+from sqlalchemy import (
+    Boolean,
+    and_,
+    case,
+    exists,
+    false,
+    func,
+    literal,
+    literal_column,
+    not_,
+    null,
+    or_,
+    select,
+    true,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import RelationshipProperty
+from sqlalchemy.sql import Select, operators, visitors
+from sqlalchemy.sql.elements import (
+    AsBoolean,
+    BinaryExpression,
+    BindParameter,
+    BooleanClauseList,
+    Case,
+    Grouping,
+    UnaryExpression,
+)
+from sqlalchemy.sql.expression import ColumnClause, False_, FunctionElement, True_
+from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.selectable import Exists
+
+__all__ = ["Collection", "Relation", "require_hops"]
+
+
+# Identity, not field, equality: the fields are SQL expressions, whose `==` builds SQL.
+@dataclass(frozen=True, eq=False)
+class Relation:
+    """A collection-valued attribute, reached through a correlated subquery.
+
+    ``correlation`` joins the element rows back to their owner: the predicates for
+    every hop, element side first. ``tables`` are the tables the subquery reads --
+    the element table and every intermediate hop -- and everything else it
+    references correlates to the enclosing query at any depth, which is what lets a
+    lambda body read the resource, or an enclosing lambda's element. ``hops`` are
+    the predicates for the intermediate to-one hops alone, passed to
+    ``require_hops``. ``member`` is the element column a scalar list reads, for
+    ``in`` and ``hasIntersection`` (``tagNames`` over the tags table).
+    """
+
+    correlation: Sequence[Any]
+    tables: Sequence[Any]
+    hops: Sequence[Any] = ()
+    member: Any = None
+
+    @classmethod
+    def from_relationship(cls, *path: Any, member: Any = None) -> Relation:
+        """The relation a chain of ``relationship()`` attributes reaches.
+
+        ``Resource.tags`` is a direct collection; ``Resource.main_category,
+        Category.sub_categories`` reaches its tail through a to-one hop. Each
+        relationship contributes its ``primaryjoin`` and, through an association
+        table, its ``secondaryjoin``, so a filtered association and a composite key
+        apply exactly as ``.any()`` applies them, and a single-table-inheritance
+        target adds its discriminator. CEL cannot dot through a list, so every
+        relationship but the last must be to-one and the last must be a collection.
+        """
+        if not path:
+            raise ValueError("Relation.from_relationship() needs a relationship")
+        links: List[List[Any]] = []
+        tables: List[Any] = []
+        previous = root = None
+        for position, attribute in enumerate(path):
+            prop = getattr(attribute, "property", None)
+            if not isinstance(prop, RelationshipProperty):
+                raise ValueError(
+                    f"{_named(attribute)} is not a relationship() attribute"
+                )
+            if previous is None:
+                root = prop.parent.local_table
+            elif not previous.mapper.isa(prop.parent):
+                raise ValueError(
+                    f"{_named(attribute)} does not continue the chain: it is "
+                    f"declared on {prop.parent.class_.__name__}, not on "
+                    f"{previous.mapper.class_.__name__}"
+                )
+            last = position == len(path) - 1
+            if prop.uselist != last:
+                raise ValueError(
+                    f"{_named(attribute)} must be a collection: a chain ends in one"
+                    if last
+                    else f"{_named(attribute)} must be to-one: CEL cannot dot through "
+                    "a list"
+                )
+            reached = [prop.target] + (
+                [prop.secondary] if prop.secondary is not None else []
+            )
+            if any(table is root or table in tables for table in reached):
+                raise ValueError(
+                    f"{_named(attribute)} reads a table the chain already reads; "
+                    "build the Relation by hand over an aliased() target"
+                )
+            tables.extend(reached)
+            link = [prop.primaryjoin]
+            if prop.secondaryjoin is not None:
+                link.insert(0, prop.secondaryjoin)
+            mapper = prop.mapper
+            if mapper.single and mapper.polymorphic_on is not None:
+                link.insert(
+                    0,
+                    mapper.polymorphic_on.in_(
+                        [m.polymorphic_identity for m in mapper.self_and_descendants]
+                    ),
+                )
+            links.append(link)
+            previous = prop
+        return cls(
+            correlation=[p for link in reversed(links) for p in link],
+            tables=tables,
+            hops=[p for link in links[:-1] for p in link],
+            member=member,
+        )
+
 
-from sqlalchemy import case, exists, literal, select
+def _named(attribute: Any) -> str:
+    """``Resource.tags`` for a mapped attribute, in the caller's own spelling."""
+    owner = getattr(attribute, "class_", None)
+    key = getattr(attribute, "key", None)
+    if owner is None or key is None:
+        return repr(attribute)
+    return f"{owner.__name__}.{key}"
 
-__all__ = ["require_hops"]
+
+@dataclass(frozen=True, eq=False)
+class Collection:
+    """What ``filter()`` or ``map()`` over a ``Relation`` yields.
+
+    A list, not a boolean: ``size()`` consumes a filtered collection, and ``in``
+    and ``hasIntersection`` a mapped one. An operator override may consume one
+    too; anywhere else it is refused.
+    """
+
+    relation: Relation
+    operator: Literal["filter", "map"]
+    body: Any
 
 
 def require_hops(
@@ -72,3 +217,386 @@ def require_hops(
     for predicate in hop_correlation:
         guard = guard.where(predicate)
     return case((exists(guard.correlate(*correlate)), expression))
+
+
+# The macros below lower CEL's three-valued collection semantics. An erroring
+# element is a row whose lambda body is SQL UNKNOWN: `exists` and `all` absorb one
+# only through a true (or false) witness, while `exists_one`, `filter` and `map`
+# never do. Each picks the cheapest form that keeps that: when the body can never
+# be NULL there is no error to detect, so the guard subquery is dropped, and
+# counts compared with a constant probe for the one row that decides them instead
+# of counting every row. Otherwise `exists` and `all` probe twice, for a witness
+# and then for an error, unless the caller asks for the single aggregate scan.
+
+_COMPARISON_OPERATORS = frozenset(
+    {
+        operators.eq,
+        operators.ne,
+        operators.lt,
+        operators.gt,
+        operators.le,
+        operators.ge,
+        operators.in_op,
+        operators.not_in_op,
+    }
+)
+
+_NULL_SAFE_OPERATORS = frozenset(
+    {
+        operators.is_,
+        operators.is_not,
+        operators.is_distinct_from,
+        operators.is_not_distinct_from,
+    }
+)
+
+# Past 2**53 a double no longer pins one integer, so a count compared with it keeps
+# the plain COUNT rather than probing at an offset it cannot name exactly.
+_MAX_PROBED_COUNT = 2**53
+
+
+def _never_null(expression: Any) -> bool:
+    """Whether ``expression`` is definite on every row, so never SQL NULL.
+
+    Conservative: NOT NULL columns, bound values, and comparisons, connectives
+    and ``CASE`` arms built only from them. Anything else may be NULL.
+    """
+    if hasattr(expression, "__clause_element__"):
+        expression = expression.__clause_element__()
+    if isinstance(expression, (True_, False_, Exists, _OffsetProbe)):
+        return True
+    if isinstance(expression, Grouping):
+        return _never_null(expression.element)
+    if isinstance(expression, Column):
+        return not expression.nullable
+    if isinstance(expression, BindParameter):
+        value = expression.value
+        if expression.expanding:
+            return isinstance(value, (list, tuple)) and None not in value
+        return expression.callable is None and value is not None
+    if isinstance(expression, BinaryExpression):
+        if expression.operator in _NULL_SAFE_OPERATORS:
+            return True
+        return (
+            expression.operator in _COMPARISON_OPERATORS
+            and _never_null(expression.left)
+            and _never_null(expression.right)
+        )
+    if isinstance(expression, BooleanClauseList):
+        return all(_never_null(clause) for clause in expression.clauses)
+    if isinstance(expression, AsBoolean):
+        return _never_null(expression.element)
+    if isinstance(expression, UnaryExpression):
+        return expression.operator is operators.inv and _never_null(expression.element)
+    if isinstance(expression, Case):
+        return (
+            expression.else_ is not None
+            and _never_null(expression.else_)
+            and all(_never_null(result) for _, result in expression.whens)
+        )
+    return False
+
+
+def _rows(relation: Relation, *conditions: Any) -> Select:
+    """The relation's element rows matching ``conditions``, correlated outward."""
+    query = select(literal(1))
+    for predicate in (*relation.correlation, *conditions):
+        query = query.where(predicate)
+    return query.correlate_except(*relation.tables)
+
+
+def _aggregate(relation: Relation, aggregate: Any, *conditions: Any) -> Any:
+    """``aggregate`` over the element rows matching ``conditions``, correlated."""
+    query = select(aggregate)
+    for predicate in (*relation.correlation, *conditions):
+        query = query.where(predicate)
+    return query.correlate_except(*relation.tables).scalar_subquery()
+
+
+def _count(relation: Relation, *conditions: Any) -> Any:
+    return _aggregate(relation, func.count(), *conditions)
+
+
+def _scanned(relation: Relation, witness: Any, body: Any, found: Any) -> Any:
+    """``found`` on a ``witness`` row, NULL on an erroring row, else its negation.
+
+    One pass over the element rows: each is marked 2 for a witness, 1 for a NULL
+    body and 0 otherwise, and the maximum decides, so a witness still absorbs an
+    error. No rows at all leave the maximum NULL, which reads as no witness. The
+    simple ``CASE`` evaluates the scalar subquery once rather than per branch.
+    """
+    marks = case((witness, 2), (body.is_(None), 1), else_=0)
+    return case(
+        {2: found, 1: null()},
+        value=_aggregate(relation, func.max(marks)),
+        else_=not_(found),
+    )
+
+
+class _OffsetProbe(FunctionElement):
+    """``EXISTS`` over a row past an ``OFFSET``, in the spelling the dialect reads.
+
+    SQL Server refuses an ``OFFSET`` without an ``ORDER BY``; any order finds the
+    row, so it gets a constant one. Elsewhere the constant could cost a sort, so
+    the probe stays unordered.
+    """
+
+    type = Boolean()
+    inherit_cache = True
+    _is_implicitly_boolean = True
+
+
+@compiles(_OffsetProbe)
+def _compile_offset_probe(element: _OffsetProbe, compiler: Any, **kw: Any) -> str:
+    unordered, _ = element.clauses
+    return compiler.process(unordered, **kw)
+
+
+@compiles(_OffsetProbe, "mssql")
+def _compile_offset_probe_mssql(element: _OffsetProbe, compiler: Any, **kw: Any) -> str:
+    _, ordered = element.clauses
+    return compiler.process(ordered, **kw)
+
+
+def _at_least(relation: Relation, count: int, *conditions: Any) -> Any:
+    """Whether at least ``count`` element rows match: a probe for the last of them."""
+    if count <= 0:
+        return true()
+    rows = _rows(relation, *conditions)
+    if count == 1:
+        return exists(rows)
+    return _OffsetProbe(
+        exists(rows.limit(1).offset(count - 1)),
+        exists(
+            rows.order_by(literal_column("(SELECT NULL)")).limit(1).offset(count - 1)
+        ),
+    )
+
+
+def _outer_tables(relation: Relation) -> List[Any]:
+    """The tables the hop predicates reach outside the relation's own."""
+    own = set(relation.tables)
+    outer: List[Any] = []
+    for predicate in relation.hops:
+        for element in visitors.iterate(predicate):
+            table = getattr(element, "table", None)
+            if (
+                isinstance(element, ColumnClause)
+                and table is not None
+                and table not in own
+                and table not in outer
+            ):
+                outer.append(table)
+    return outer
+
+
+def _through_hops(relation: Relation, answer: Any) -> Any:
+    return require_hops(answer, relation.hops, _outer_tables(relation))
+
+
+def _unless_erroring(relation: Relation, body: Any, answer: Any) -> Any:
+    """``answer``, or NULL wherever an element's ``body`` is NULL (an error)."""
+    if _never_null(body):
+        return answer
+    return case((exists(_rows(relation, body.is_(None))), null()), else_=answer)
+
+
+def _exists(relation: Relation, body: Any, lowering: str = "probe") -> Any:
+    # True on any true witness, absorbing errors; an error without one; false
+    # otherwise, including over no elements.
+    if _never_null(body):
+        return _through_hops(relation, exists(_rows(relation, body)))
+    if lowering == "aggregate":
+        return _through_hops(relation, _scanned(relation, body, body, true()))
+    return _through_hops(
+        relation,
+        case(
+            (exists(_rows(relation, body)), true()),
+            (exists(_rows(relation, body.is_(None))), null()),
+            else_=false(),
+        ),
+    )
+
+
+def _all(relation: Relation, body: Any, lowering: str = "probe") -> Any:
+    # The dual: false on any false witness, absorbing errors.
+    if _never_null(body):
+        return _through_hops(relation, not_(exists(_rows(relation, not_(body)))))
+    if lowering == "aggregate":
+        return _through_hops(relation, _scanned(relation, not_(body), body, false()))
+    return _through_hops(
+        relation,
+        case(
+            (exists(_rows(relation, not_(body))), false()),
+            (exists(_rows(relation, body.is_(None))), null()),
+            else_=true(),
+        ),
+    )
+
+
+def _exists_one(relation: Relation, body: Any) -> Any:
+    # Exactly one match: a first matching row and no second, never a full count.
+    # An erroring element is never absorbed, even next to a match.
+    exactly_one = and_(_at_least(relation, 1, body), not_(_at_least(relation, 2, body)))
+    return _through_hops(relation, _unless_erroring(relation, body, exactly_one))
+
+
+_RELATION_MACROS = {
+    "exists": _exists,
+    "all": _all,
+    "exists_one": _exists_one,
+    "filter": lambda relation, body: Collection(relation, "filter", body),
+    "map": lambda relation, body: Collection(relation, "map", body),
+}
+
+
+def _relation_macro(
+    operator: str, relation: Relation, body: Any, lowering: str = "probe"
+) -> Any:
+    """Lower ``operator``'s lambda ``body`` over every element of ``relation``."""
+    macro = _RELATION_MACROS.get(operator)
+    if macro is None:
+        raise ValueError(f"{operator}() over a Relation is not supported")
+    if operator in ("exists", "all"):
+        return macro(relation, body, lowering)
+    return macro(relation, body)
+
+
+def _counted(target: Any) -> Union[tuple, None]:
+    """The relation, extra conditions and error-guarded body ``size(target)`` counts."""
+    if isinstance(target, Relation):
+        return target, (), None
+    if isinstance(target, Collection):
+        if target.operator == "filter":
+            return target.relation, (target.body,), target.body
+        return target.relation, (), target.body
+    return None
+
+
+def _relation_size(target: Any, _: Any) -> Any:
+    """``size()`` of a relation or a collection derived from one.
+
+    Counting does not evaluate a plain element, so NULL element columns still
+    count; a filter or map body does evaluate, so one erroring element poisons the
+    count.
+    """
+    relation, conditions, evaluated = _counted(target)
+    count = _count(relation, *conditions)
+    if evaluated is not None:
+        count = _unless_erroring(relation, evaluated, count)
+    return _through_hops(relation, count)
+
+
+def _compared_size(operator: str, target: Any, value: Any) -> Any:
+    """``size(target) <operator> value`` as probes for the deciding row, else None.
+
+    A count is a non-negative integer, so every comparison with a constant is
+    "at least n" rows, its negation, or (for equality) both: ``size > 0`` is one
+    ``EXISTS`` and ``size >= 3`` one ``EXISTS`` over ``OFFSET 2``, each of which
+    stops at the row that decides it.
+    """
+    counted = _counted(target)
+    if (
+        counted is None
+        or isinstance(value, bool)
+        or not isinstance(value, (int, float))
+        or not math.isfinite(value)
+        or abs(value) >= _MAX_PROBED_COUNT
+    ):
+        return None
+    relation, conditions, evaluated = counted
+
+    def at_least(count: int) -> Any:
+        return _at_least(relation, count, *conditions)
+
+    above, from_ = math.floor(value) + 1, math.ceil(value)
+    if operator in ("eq", "ne") and value != from_:
+        predicate = false() if operator == "eq" else true()
+    elif operator == "eq":
+        predicate = and_(at_least(from_), not_(at_least(above)))
+    elif operator == "ne":
+        predicate = or_(not_(at_least(from_)), at_least(above))
+    elif operator == "gt":
+        predicate = at_least(above)
+    elif operator == "ge":
+        predicate = at_least(from_)
+    elif operator == "lt":
+        predicate = not_(at_least(from_))
+    elif operator == "le":
+        predicate = not_(at_least(above))
+    else:
+        return None
+    if evaluated is not None:
+        predicate = _unless_erroring(relation, evaluated, predicate)
+    return _through_hops(relation, predicate)
+
+
+def _in(c: Any, values: Any) -> Any:
+    """CEL membership, including explicit-null list elements."""
+    members = values if isinstance(values, list) else [values]
+    non_nulls = [member for member in members if member is not None]
+    predicates = []
+    if non_nulls:
+        predicates.append(c.in_(non_nulls))
+    if len(non_nulls) != len(members):
+        predicates.append(c.is_(None))
+    if not predicates:
+        return false()
+    return or_(*predicates)
+
+
+def _element_equality(element: Any, value: Any) -> Any:
+    """``element == value`` with CEL's ``null == null``; a list holds null elements."""
+    if value is None:
+        return element.is_(None)
+    if not hasattr(value, "is_") or _never_null(element) or _never_null(value):
+        return element == value
+    return or_(element == value, and_(element.is_(None), value.is_(None)))
+
+
+def _listed(target: Any, operator: str) -> tuple:
+    """The relation and list expression ``target`` reads, and the body to guard."""
+    if isinstance(target, Collection) and target.operator == "map":
+        return target.relation, target.body, target.body
+    if isinstance(target, Relation) and target.member is not None:
+        return target, target.member, None
+    raise ValueError(
+        f"{operator} over a collection needs a Relation with a member column, or "
+        "a map() over a Relation"
+    )
+
+
+def _membership_within(operator: str, target: Any, predicate: Any) -> Any:
+    relation, element, evaluated = _listed(target, operator)
+    answer = exists(_rows(relation, predicate(element)))
+    if evaluated is not None:
+        answer = _unless_erroring(relation, evaluated, answer)
+    return _through_hops(relation, answer)
+
+
+def _relation_membership(column: Any, value: Any, explicit: bool = False) -> Any:
+    """``value in list`` where one side is a relation's list.
+
+    A NULL operand is a missing attribute unless the caller declares it
+    ``explicit``: CEL raises, so the answer is UNKNOWN rather than the two-valued
+    ``EXISTS``, which would read FALSE and admit the row once negated. Declared
+    explicit, it is a null value, found when the list holds a null element.
+    """
+    if isinstance(column, (Relation, Collection)):
+        column, value = value, column
+    answer = _membership_within(
+        "in", value, lambda element: _element_equality(element, column)
+    )
+    if explicit or not hasattr(column, "isnot") or _never_null(column):
+        return answer
+    return case((column.isnot(None), answer))
+
+
+def _relation_intersection(mapped: Any, values: Any) -> Any:
+    if not isinstance(mapped, (Relation, Collection)):
+        mapped, values = values, mapped
+    return _membership_within(
+        "hasIntersection",
+        mapped,
+        lambda element: _in(element, values),
+    )
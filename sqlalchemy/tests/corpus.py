@@ -5,12 +5,11 @@ query against seeded SQLite rows; ``test_translator.py`` reads the same actions
 golden wire fixtures and asserts nothing but the emitted SQL. They must agree on two
 things or they prove less than they appear to:
 
-- **the mapping.** The unit test pins the SQL this adapter emits for one attribute map and
-  one set of operator overrides; the harness proves that same SQL returns the rows the PDP
-  allows. Two copies that drifted would leave the pinned statements describing columns and
-  correlated subqueries no harness ever executes, which is why the schema, ``ATTR_MAP``,
-  ``OPERATOR_OVERRIDES`` and ``ATTRIBUTE_NULL_REPRESENTATION`` live here rather than in
-  either suite.
+- **the mapping.** The unit test pins the SQL this adapter emits for one attribute map; the
+  harness proves that same SQL returns the rows the PDP allows. Two copies that drifted
+  would leave the pinned statements describing columns and correlated subqueries no harness
+  ever executes, which is why the schema, ``ATTR_MAP``, ``OPERATOR_OVERRIDES`` and
+  ``ATTRIBUTE_NULL_REPRESENTATION`` live here rather than in either suite.
 - **the classification.** Which actions this adapter must refuse, and with which message, is
   a corpus decision (``conformance/actions.json``), not a per-suite one.
 
@@ -38,7 +37,7 @@ from cerbos.sdk.model import PlanResourcesResponse
 from cerbos_image import CONFORMANCE_DIR
 from google.protobuf.json_format import ParseDict
 
-from cerbos_sqlalchemy import require_hops
+from cerbos_sqlalchemy import Relation, require_hops
 from sqlalchemy import (
     Boolean,
     Column,
@@ -47,19 +46,16 @@ from sqlalchemy import (
     ForeignKey,
     Integer,
     String,
-    and_,
     case,
     exists,
     false,
-    func,
     literal,
     not_,
     null,
-    or_,
     select,
     true,
 )
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, relationship
 
 ADAPTER = "sqlalchemy"
 
@@ -438,6 +434,12 @@ class AdvResource(AdvBase):
     scope = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), nullable=True)
 
+    tags = relationship("AdvTag")
+    categories = relationship("AdvCategory")
+    # The corpus's `mainCategory` is the resource's category reached as a to-ONE
+    # parent: the same foreign key as `categories`, read without a list.
+    main_category = relationship("AdvCategory", uselist=False, viewonly=True)
+
 
 class AdvTag(AdvBase):
     __tablename__ = "adversarial_tag"
@@ -455,6 +457,8 @@ class AdvCategory(AdvBase):
     name = Column(String, nullable=False)
     resource_id = Column(String, ForeignKey("adversarial_resource.id"), nullable=False)
 
+    sub_categories = relationship("AdvSubCategory")
+
 
 class AdvSubCategory(AdvBase):
     __tablename__ = "adversarial_sub_category"
@@ -463,6 +467,8 @@ class AdvSubCategory(AdvBase):
     name = Column(String, nullable=False)
     category_id = Column(String, ForeignKey("adversarial_category.id"), nullable=False)
 
+    labels = relationship("AdvLabel")
+
 
 class AdvLabel(AdvBase):
     __tablename__ = "adversarial_label"
@@ -507,300 +513,32 @@ class AdvInner(AdvBase):
 
 
 # ---------------------------------------------------------------------------
-# Relation markers + operator overrides: the adapter's attribute map points
-# relation-valued attributes at marker objects; the overrides translate the
-# collection macros over them into correlated subqueries. Three-valued logic:
-# CEL's exists/all absorb an erroring element only through a true/false
-# witness; exists_one/map/filter never do. An erroring element is a row whose
-# lambda body evaluates to SQL UNKNOWN (NULL), detected with `body IS NULL`.
+# Relations: the adapter's attribute map points collection-valued attributes at
+# `Relation`s derived from the relationships above, and the adapter lowers the
+# collection macros over them into correlated subqueries. No operator override is
+# involved, so every collection action is an oracle comparison of the library's
+# own lowering.
 # ---------------------------------------------------------------------------
 
-
-class _Relation:
-    """Marker standing in for a relation path in the attribute map."""
-
-    def __init__(
-        self,
-        description: str,
-        correlation: List[Any],
-        correlate_targets: List[Any],
-        member_field=None,
-        hop_correlation: Union[List[Any], None] = None,
-    ):
-        self.description = description
-        self.correlation = correlation
-        # Entities the subquery must correlate against explicitly: SQLAlchemy's
-        # auto-correlation only reaches the immediate enclosing SELECT, so an
-        # outer-resource reference inside a depth-2 lambda subquery would
-        # otherwise pull the resource table into the inner FROM as a cartesian
-        # product (silently comparing against EVERY resource row).
-        self.correlate_targets = correlate_targets
-        # For plain `in` membership over a chained string list (w1-in-chain).
-        self.member_field = member_field
-        # Correlation for the INTERMEDIATE hops alone, when the collection is
-        # reached through an optional to-one parent. CEL cannot dot through a
-        # list, so `mainCategory.subCategories` reaches its tail through a to-one
-        # parent: absent, the application sends no `mainCategory` attribute and
-        # CEL raises a missing-path error, which denies. A subquery rooted at the
-        # resource row cannot see that — an absent parent and a childless parent
-        # both return nothing — so `all` reads TRUE, `!exists` reads TRUE and the
-        # count reads 0, each admitting rows the PDP denies
-        # (cerbos/query-plan-adapters#309). Requiring the hop separately restores
-        # the distinction. The requirement itself is `cerbos_sqlalchemy.
-        # require_hops`; what stays in the MAPPING is only which predicates the
-        # hops are, because the SQLAlchemy adapter has no relation model of its
-        # own: collection semantics are entirely caller-supplied through operator
-        # overrides, so the caller owns the invariant that its subquery sees
-        # exactly the rows the application serialised into the resource
-        # attributes.
-        self.hop_correlation = hop_correlation or []
-
-    def __repr__(self) -> str:  # pragma: no cover - diagnostics only
-        return f"_Relation({self.description})"
-
-
-TAGS = _Relation(
-    "tags",
-    [AdvTag.resource_id == AdvResource.id],
-    # The root resource may be any number of lambda scopes up (w2-outer-relation
-    # plans a tags exists INSIDE the categories lambda).
-    correlate_targets=[AdvResource],
-)
-TAG_NAMES = _Relation(
-    "tagNames",
-    [AdvTag.resource_id == AdvResource.id],
-    correlate_targets=[AdvResource],
-    member_field=AdvTag.name,
-)
-CATEGORIES = _Relation(
-    "categories",
-    [AdvCategory.resource_id == AdvResource.id],
-    correlate_targets=[AdvResource],
-)
-# c.subCategories: correlates to the *category* the enclosing lambda is scoped
-# to, never to the root resource — but its lambda body may still reference
-# outer resource columns (outer-attr-depth2), so both entities correlate.
-SUB_OF_CATEGORY = _Relation(
-    "c.subCategories",
-    [AdvSubCategory.category_id == AdvCategory.id],
-    correlate_targets=[AdvCategory, AdvResource],
-)
-LABELS_OF_SUB = _Relation(
-    "s.labels",
-    [AdvLabel.sub_category_id == AdvSubCategory.id],
-    correlate_targets=[AdvSubCategory, AdvCategory, AdvResource],
-)
-# mainCategory.subCategories: the same two-hop chain flattened from the root —
-# the subquery must join THROUGH the intermediate category hop (which stays in
-# the subquery FROM; only the root resource correlates).
-MAIN_SUB = _Relation(
-    "mainCategory.subCategories",
-    [
-        AdvSubCategory.category_id == AdvCategory.id,
-        AdvCategory.resource_id == AdvResource.id,
-    ],
-    correlate_targets=[AdvResource],
-    hop_correlation=[AdvCategory.resource_id == AdvResource.id],
+TAGS = Relation.from_relationship(AdvResource.tags)
+TAG_NAMES = Relation.from_relationship(AdvResource.tags, member=AdvTag.name)
+CATEGORIES = Relation.from_relationship(AdvResource.categories)
+# c.subCategories: correlates to the *category* the enclosing lambda is scoped to,
+# never to the root resource -- while its lambda body may still read outer resource
+# columns (outer-attr-depth2), which correlate at whatever depth they sit.
+SUB_OF_CATEGORY = Relation.from_relationship(AdvCategory.sub_categories)
+LABELS_OF_SUB = Relation.from_relationship(AdvSubCategory.labels)
+# mainCategory.subCategories: the same two-hop chain flattened from the root. The
+# subquery joins THROUGH the intermediate category, and because that hop is an
+# optional to-one parent, every answer off the chain is also guarded by
+# `require_hops` (cerbos/query-plan-adapters#309).
+MAIN_SUB = Relation.from_relationship(
+    AdvResource.main_category, AdvCategory.sub_categories
 )
-MAIN_SUBNAMES = _Relation(
-    "mainCategory.subNames",
-    [
-        AdvSubCategory.category_id == AdvCategory.id,
-        AdvCategory.resource_id == AdvResource.id,
-    ],
-    correlate_targets=[AdvResource],
-    member_field=AdvSubCategory.name,
-    hop_correlation=[AdvCategory.resource_id == AdvResource.id],
+MAIN_SUBNAMES = Relation.from_relationship(
+    AdvResource.main_category, AdvCategory.sub_categories, member=AdvSubCategory.name
 )
 
-
-def _exists_where(rel: _Relation, *conds: Any):
-    q = select(literal(1))
-    for pred in rel.correlation:
-        q = q.where(pred)
-    for cond in conds:
-        q = q.where(cond)
-    return exists(q.correlate(*rel.correlate_targets))
-
-
-def _count_subquery(rel: _Relation, *conds: Any):
-    q = select(func.count())
-    for pred in rel.correlation:
-        q = q.where(pred)
-    for cond in conds:
-        q = q.where(cond)
-    return q.correlate(*rel.correlate_targets).scalar_subquery()
-
-
-def _require_hops(rel: _Relation, expr: Any):
-    """Make ``expr`` UNKNOWN unless every intermediate to-one hop exists.
-
-    The invariant lives in the library as ``cerbos_sqlalchemy.require_hops``; this
-    is only the unpacking of the harness's ``_Relation`` marker into its arguments.
-    The harness using the shipped helper rather than a private copy is what proves
-    the helper: every chained corpus action — ``w1-all-chain``,
-    ``w1-not-exists-chain``, ``w1-size-zero-chain``, ``w1-not-in-chain``,
-    ``w1-not-hasint-chain`` and the rest — is an oracle comparison against a real
-    PDP that runs through this call.
-    """
-    return require_hops(expr, rel.hop_correlation, rel.correlate_targets)
-
-
-def _require_relation(op: str, coll: Any) -> _Relation:
-    if not isinstance(coll, _Relation):
-        raise ValueError(f"{op} over unsupported collection operand: {coll!r}")
-    return coll
-
-
-def _exists_fn(coll: Any, body: Any):
-    # CEL exists: true on any true witness (absorbing errors), error if any
-    # element errors without one, false otherwise (incl. empty).
-    rel = _require_relation("exists", coll)
-    return _require_hops(
-        rel,
-        case(
-            (_exists_where(rel, body), true()),
-            (_exists_where(rel, body.is_(None)), null()),
-            else_=false(),
-        ),
-    )
-
-
-def _all_fn(coll: Any, body: Any):
-    # CEL all: false on any false witness (absorbing errors), error if any
-    # element errors without one, true otherwise (incl. empty).
-    rel = _require_relation("all", coll)
-    return _require_hops(
-        rel,
-        case(
-            (_exists_where(rel, not_(body)), false()),
-            (_exists_where(rel, body.is_(None)), null()),
-            else_=true(),
-        ),
-    )
-
-
-def _exists_one_fn(coll: Any, body: Any):
-    # CEL exists_one never absorbs an erroring element, even next to a true
-    # witness; otherwise it's an exact count-of-matches == 1.
-    rel = _require_relation("exists_one", coll)
-    return _require_hops(
-        rel,
-        case(
-            (_exists_where(rel, body.is_(None)), null()),
-            else_=(_count_subquery(rel, body) == 1),
-        ),
-    )
-
-
-def _filter_fn(coll: Any, body: Any):
-    # Deferred: consumed by the `size` override (size(filter(...)) shape).
-    return ("filter", _require_relation("filter", coll), body)
-
-
-def _map_fn(coll: Any, projected: Any):
-    # Deferred: consumed by the `hasIntersection` override.
-    return ("map", _require_relation("map", coll), projected)
-
-
-def _size_fn(target: Any, _: Any):
-    if isinstance(target, _Relation):
-        # size() counts elements without evaluating them, so NULL element
-        # columns still count — no error guard needed. An absent to-one parent
-        # still has to count as UNKNOWN rather than 0 (#309).
-        return _require_hops(target, _count_subquery(target))
-    if isinstance(target, tuple) and target[0] == "filter":
-        # CEL filter never absorbs an erroring element: any UNKNOWN body row
-        # poisons the whole count.
-        _, rel, body = target
-        return _require_hops(
-            rel,
-            case(
-                (_exists_where(rel, body.is_(None)), null()),
-                else_=_count_subquery(rel, body),
-            ),
-        )
-    return func.length(target)
-
-
-def _has_intersection_fn(mapped: Any, values: Any):
-    if isinstance(mapped, _Relation):
-        if mapped.member_field is None:
-            raise ValueError(
-                f"hasIntersection over relation without member field: {mapped!r}"
-            )
-        return _require_hops(
-            mapped,
-            _exists_where(mapped, _scalar_membership(mapped.member_field, values)),
-        )
-
-    # hasIntersection(map(coll, x), list): map errors on any erroring element
-    # (no absorption), so the error guard comes FIRST.
-    if not (isinstance(mapped, tuple) and mapped[0] == "map"):
-        raise ValueError(f"hasIntersection over unsupported operand: {mapped!r}")
-    _, rel, projected = mapped
-    return _require_hops(
-        rel,
-        case(
-            (_exists_where(rel, projected.is_(None)), null()),
-            (_exists_where(rel, _scalar_membership(projected, values)), true()),
-            else_=false(),
-        ),
-    )
-
-
-def _scalar_membership(column: Any, values: Any):
-    members = values if isinstance(values, list) else [values]
-    non_nulls = [member for member in members if member is not None]
-    predicates = []
-    if non_nulls:
-        predicates.append(column.in_(non_nulls))
-    if len(non_nulls) != len(members):
-        predicates.append(column.is_(None))
-    return or_(*predicates) if predicates else false()
-
-
-def _relation_membership(relation: _Relation, value: Any):
-    if relation.member_field is None:
-        raise ValueError(f"in over relation without member field: {relation!r}")
-    member = relation.member_field
-    if value is None:
-        predicate = member.is_(None)
-    elif hasattr(value, "is_"):
-        predicate = or_(
-            member == value,
-            and_(member.is_(None), value.is_(None)),
-        )
-    else:
-        predicate = member == value
-    return _require_hops(relation, _exists_where(relation, predicate))
-
-
-def _in_fn(column: Any, value: Any):
-    if isinstance(column, _Relation):
-        # `value in R.attr.<chain>`: membership against the relation's member
-        # column; rows with an empty chain are simply excluded (CEL
-        # missing-attribute error → deny).
-        return _relation_membership(column, value)
-    if isinstance(value, _Relation):
-        return _relation_membership(value, column)
-    return _scalar_membership(column, value)
-
-
-OPERATOR_OVERRIDES = {
-    # The lambda's first (resolved) operand is its body predicate; the iterator
-    # variable resolves through the attribute map and is discarded.
-    "lambda": lambda body, _var: body,
-    "exists": _exists_fn,
-    "all": _all_fn,
-    "exists_one": _exists_one_fn,
-    "filter": _filter_fn,
-    "map": _map_fn,
-    "size": _size_fn,
-    "hasIntersection": _has_intersection_fn,
-    "in": _in_fn,
-}
-
 # `owner` and `coOwner` alias columns that `aOptionalString` and `scope` also map,
 # under the OTHER null convention: the oracle sends a real null attribute for them
 # rather than omitting it. Declaring that here is what makes the equality family
@@ -870,9 +608,9 @@ ATTR_MAP = {
     # obj.inner is not a real nested column — mirrors aString, the same trick
     # the spring-data and prisma reference harnesses use for the p-struct probe.
     "request.resource.attr.obj.inner": AdvResource.a_string,
-    # The corpus's one REAL to-one chain (the `rel-*` actions). This adapter has no
-    # relation model, so the caller supplies the hop as a correlated scalar
-    # subquery — and that spelling needs no separate hop guard: an absent parent
+    # The corpus's one REAL to-one chain (the `rel-*` actions). A scalar read through
+    # a to-one hop is a correlated scalar subquery rather than a `Relation` — and
+    # that spelling needs no separate hop guard: an absent parent
     # makes the subquery SQL NULL, which is CEL's missing-path error, and NOT NULL
     # is still NULL, so the row stays excluded under BOTH polarities.
     "request.resource.attr.parent.aBool": _parent_scalar(AdvParent.a_bool),
@@ -889,26 +627,99 @@ ATTR_MAP = {
     ),
     "request.resource.attr.tags": TAGS,
     "request.resource.attr.tagNames": TAG_NAMES,
-    "t": TAGS,
     "t.id": AdvTag.tag_id,
     "t.name": AdvTag.name,
     "request.resource.attr.categories": CATEGORIES,
-    "c": CATEGORIES,
     # The category's own name, read inside the categories lambda. Only
     # rel-hop2-or-exists reaches it — every other categories probe dots straight
     # through to subCategories — so it is mapped here rather than alongside them.
     "c.name": AdvCategory.name,
     "c.subCategories": SUB_OF_CATEGORY,
-    "s": SUB_OF_CATEGORY,
     "s.name": AdvSubCategory.name,
     "s.labels": LABELS_OF_SUB,
-    "l": LABELS_OF_SUB,
     "l.name": AdvLabel.name,
     "request.resource.attr.mainCategory.subCategories": MAIN_SUB,
     "request.resource.attr.mainCategory.subNames": MAIN_SUBNAMES,
 }
 
 
+# ---------------------------------------------------------------------------
+# Operator overrides: the route an application takes for a schema `Relation` does not
+# fit. The Relations above lower every collection action without one, so this keeps
+# the public `operator_override_fns` path -- and the `require_hops` guard an override
+# that reaches a collection through a to-one hop must apply itself -- an oracle
+# comparison too. It is the README's `require_hops` example, widened to CEL's
+# three-valued `exists` and `all`, over `mainCategory.subCategories` alone.
+# ---------------------------------------------------------------------------
+
+MAIN_SUB_HOPS = [AdvCategory.resource_id == AdvResource.id]
+
+
+def _main_sub_exists(*conditions: Any):
+    return exists(
+        select(literal(1))
+        .where(AdvSubCategory.category_id == AdvCategory.id)
+        .where(AdvCategory.resource_id == AdvResource.id)
+        .where(*conditions)
+        .correlate(AdvResource)
+    )
+
+
+def _require_main_sub(operator: str, collection: Any) -> None:
+    if collection is not MAIN_SUB:
+        raise ValueError(
+            f"{operator} override over an unexpected operand: {collection!r}"
+        )
+
+
+def _exists_override(collection: Any, body: Any):
+    # CEL exists: TRUE on any true witness (absorbing errors), an error if an element
+    # errors without one, FALSE otherwise.
+    _require_main_sub("exists", collection)
+    return require_hops(
+        case(
+            (_main_sub_exists(body), true()),
+            (_main_sub_exists(body.is_(None)), null()),
+            else_=false(),
+        ),
+        MAIN_SUB_HOPS,
+        [AdvResource],
+    )
+
+
+def _all_override(collection: Any, body: Any):
+    # CEL all: FALSE on any false witness (absorbing errors), an error if an element
+    # errors without one, TRUE otherwise -- including over no elements at all.
+    _require_main_sub("all", collection)
+    return require_hops(
+        case(
+            (_main_sub_exists(not_(body)), false()),
+            (_main_sub_exists(body.is_(None)), null()),
+            else_=true(),
+        ),
+        MAIN_SUB_HOPS,
+        [AdvResource],
+    )
+
+
+OPERATOR_OVERRIDES = {
+    # The lambda's resolved body is its predicate; the iterator variable resolves
+    # through the attribute map and is discarded.
+    "lambda": lambda body, _variable: body,
+    "exists": _exists_override,
+    "all": _all_override,
+}
+
+#: The attribute map the overrides run under. With an `exists` or `all` override
+#: registered the lambda is an ordinary operator, so its iterator variable has to
+#: resolve like any other reference.
+OVERRIDE_ATTR_MAP = {**ATTR_MAP, "s": MAIN_SUB}
+
+#: The chained actions run through :data:`OPERATOR_OVERRIDES` as well as through the
+#: built-in lowering. `w1-all-chain` and `w1-not-exists-chain` are the anti-vacuity
+#: pair: each admits a parentless row unless the override calls `require_hops`.
+OVERRIDE_ACTIONS = ("w1-exists-chain", "w1-all-chain", "w1-not-exists-chain")
+
 # -- rendering an emitted Select --------------------------------------------
 
 #: The dialects the golden expectations pin, most-executed first.
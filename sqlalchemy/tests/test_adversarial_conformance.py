@@ -39,6 +39,8 @@ from corpus import (
     ATTR_MAP,
     ATTRIBUTE_NULL_REPRESENTATION,
     OPERATOR_OVERRIDES,
+    OVERRIDE_ACTIONS,
+    OVERRIDE_ATTR_MAP,
     AdvBase,
     AdvCategory,
     AdvInner,
@@ -54,7 +56,7 @@ from corpus import (
     require_message,
 )
 
-from cerbos_sqlalchemy import get_query
+from cerbos_sqlalchemy import get_query, register_cel_functions
 from sqlalchemy import create_engine, event, insert, select
 from sqlalchemy.dialects import postgresql
 
@@ -178,8 +180,8 @@ for _id, _entry in DERIVED.items():
 _CLASSIFICATION = classify_actions_for_adapter(MANIFEST, ADAPTER)
 ORACLE_ACTIONS = _CLASSIFICATION.oracle_actions
 
-# Globally expected-unsupported shapes promoted by this adapter. Regex is not
-# promoted because SQL dialect regex engines do not guarantee CEL/RE2 semantics.
+# Globally expected-unsupported shapes promoted by this adapter: regex, over the
+# RE2 subset every engine it targets reads alike.
 SQLALCHEMY_SUPPORTED_EXPECTED = _CLASSIFICATION.supported_expected
 
 # Globally-unsupported planner shapes plus this adapter's own unsupported list:
@@ -315,7 +317,7 @@ DEGENERACY_LIVENESS_PROBES = (
     # #387, one probe per group this adapter cannot compare: modulo (reached
     # through the int() cast that gives `%` an integer operand), the positional
     # read of a scalar list, and list equality over a map() projection, whose
-    # deferred intermediate no enclosing override consumes.
+    # deferred Collection no enclosing size, in or hasIntersection consumes.
     "arith-mod",
     "index-scalar-list",
     "map-eq-list",
@@ -414,6 +416,9 @@ def adv_engine():
         # case-insensitive by default.
         dbapi_conn.execute("PRAGMA case_sensitive_like = ON")
 
+    # For the function-pack run below; without cel_functions=True no query calls them.
+    register_cel_functions(engine)
+
     AdvBase.metadata.create_all(engine)
 
     resource_rows = []
@@ -647,15 +652,19 @@ def _adapter_filtered_ids(
     action: str,
     null_attribute_representation: str = "explicit",
     attribute_null_representation=ATTRIBUTE_NULL_REPRESENTATION,
+    attr_map=ATTR_MAP,
+    operator_override_fns=None,
+    **options: Any,
 ) -> Set[str]:
     plan = client.plan_resources(action, _principal(), ResourceDesc(RESOURCE_KIND))
     query = get_query(
         plan,
         AdvResource,
-        ATTR_MAP,
-        operator_override_fns=OPERATOR_OVERRIDES,
+        attr_map,
+        operator_override_fns=operator_override_fns,
         null_attribute_representation=null_attribute_representation,
         attribute_null_representation=attribute_null_representation,
+        **options,
     )
     return {row.id for row in conn.execute(query).fetchall()}
 
@@ -695,8 +704,9 @@ class TestAdversarialConformance:
         assert len(SEEDS) == 21
         # Each of these carries a pinned message, so a shape gained or lost has
         # to be re-triaged here rather than joining the throw suite unnoticed.
-        assert len(THROWING_ACTIONS) == 19
+        assert len(THROWING_ACTIONS) == 18
         assert misclassified == []
+        assert set(OVERRIDE_ACTIONS) <= oracle
         assert SQLALCHEMY_SUPPORTED_EXPECTED <= {
             entry["action"] for entry in MANIFEST.expected_unsupported
         }
@@ -707,6 +717,20 @@ class TestAdversarialConformance:
         filtered = _adapter_filtered_ids(adv_cerbos_client, adv_conn, action)
         assert sorted(filtered) == sorted(oracle)
 
+    @pytest.mark.parametrize("action", OVERRIDE_ACTIONS)
+    def test_operator_overrides_match_check_oracle(
+        self, action, adv_cerbos_client, adv_conn
+    ):
+        oracle = _oracle_allowed_ids(adv_cerbos_client, action)
+        filtered = _adapter_filtered_ids(
+            adv_cerbos_client,
+            adv_conn,
+            action,
+            attr_map=OVERRIDE_ATTR_MAP,
+            operator_override_fns=OPERATOR_OVERRIDES,
+        )
+        assert sorted(filtered) == sorted(oracle)
+
     @pytest.mark.parametrize("action,message", THROWING_ACTIONS)
     def test_fails_loudly(self, action, message, adv_cerbos_client):
         # The plan is fetched OUTSIDE the assertion so a PDP failure fails the
@@ -731,7 +755,7 @@ class TestAdversarialConformance:
                 plan,
                 AdvResource,
                 ATTR_MAP,
-                operator_override_fns=OPERATOR_OVERRIDES,
+                operator_override_fns=None,
                 null_attribute_representation="explicit",
                 # The per-attribute declarations belong here too: a shape whose
                 # refusal depends on them (null-value-f2f-mixed) would otherwise
@@ -739,6 +763,46 @@ class TestAdversarialConformance:
                 attribute_null_representation=ATTRIBUTE_NULL_REPRESENTATION,
             )
 
+    # The casts the default refuses, proved against the PDP once the CEL function pack
+    # is declared installed. Both string casts have EMPTY oracles, so what they pin is
+    # that no prefix parse survives: "100%_done" and "50%_off" must be errors, not 100
+    # and 50. cast-int-double's a1 is the truncation witness, cast-string-bool the
+    # rendering one, and arith-mod reaches `%` only through int().
+    @pytest.mark.parametrize(
+        "action",
+        (
+            "cast-int-string",
+            "cast-double-string",
+            "cast-int-double",
+            "cast-string-bool",
+            "arith-mod",
+        ),
+    )
+    def test_cel_function_pack_matches_check_oracle(
+        self, action, adv_cerbos_client, adv_conn
+    ):
+        oracle = _oracle_allowed_ids(adv_cerbos_client, action)
+        filtered = _adapter_filtered_ids(
+            adv_cerbos_client, adv_conn, action, cel_functions=True
+        )
+        assert sorted(filtered) == sorted(oracle)
+
+    # The single-scan lowering of exists()/all() over a nullable body, against the
+    # same oracle. Every oracle action runs rather than the ones that reach the
+    # aggregate today, so a shape newly lowered through it is covered unlisted.
+    @pytest.mark.parametrize("action", ORACLE_ACTIONS)
+    def test_aggregate_collection_macros_match_check_oracle(
+        self, action, adv_cerbos_client, adv_conn
+    ):
+        oracle = _oracle_allowed_ids(adv_cerbos_client, action)
+        filtered = _adapter_filtered_ids(
+            adv_cerbos_client,
+            adv_conn,
+            action,
+            collection_macro_lowering="aggregate",
+        )
+        assert sorted(filtered) == sorted(oracle)
+
     # #387. `filter-as-conjunct` puts a filter() one level below the root, where
     # the guard that refuses `filter-as-condition` did not look — and this
     # adapter is one of the two where that mattered: the held tuple reached
@@ -887,7 +951,7 @@ class TestAdversarialConformance:
             plan,
             AdvResource,
             ATTR_MAP,
-            operator_override_fns=OPERATOR_OVERRIDES,
+            operator_override_fns=None,
         )
         compiled = query.compile(dialect=postgresql.dialect())
 
@@ -0,0 +1,263 @@
+"""Unit tests for ``expression_index_ddl``.
+
+What matters is that the DDL indexes the expression the translated query
+compares, so the SQLite tests ask SQLite's own planner whether it searches the
+index, rather than matching strings against what the translator happens to emit.
+"""
+
+import pytest
+from cerbos.sdk.model import (
+    PlanResourcesFilter,
+    PlanResourcesFilterKind,
+    PlanResourcesResponse,
+)
+from corpus import (
+    ADAPTER,
+    ATTR_MAP,
+    ATTRIBUTE_NULL_REPRESENTATION,
+    AdvBase,
+    AdvResource,
+    classify_actions_for_adapter,
+    parse_actions_file,
+    plan_from_wire_fixture,
+    read_corpus_json,
+    wire_fixture_actions,
+)
+
+from cerbos_sqlalchemy import expression_index_ddl, get_query
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine
+from sqlalchemy.dialects import mysql, postgresql
+
+_metadata = MetaData()
+document = Table(
+    "index_document",
+    _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("title", String),
+    Column("score", Float),
+    Column("weight", Float),
+)
+_ATTR_MAP = {
+    "request.resource.attr.title": document.c.title,
+    "request.resource.attr.score": document.c.score,
+    "request.resource.attr.weight": document.c.weight,
+}
+
+
+def _plan(expression, kind=PlanResourcesFilterKind.CONDITIONAL):
+    condition = {"condition": {"expression": expression}} if expression else {}
+    return PlanResourcesResponse(
+        filter=PlanResourcesFilter.from_dict({"kind": kind, **condition}),
+        request_id="1",
+        action="action",
+        resource_kind="document",
+        policy_version="default",
+    )
+
+
+def _converted(conversion, attribute, operator, value):
+    return _plan(
+        {
+            "operator": operator,
+            "operands": [
+                {
+                    "expression": {
+                        "operator": conversion,
+                        "operands": [
+                            {"variable": f"request.resource.attr.{attribute}"}
+                        ],
+                    }
+                },
+                {"value": value},
+            ],
+        }
+    )
+
+
+def _search_plan(connection, query) -> str:
+    compiled = query.compile(
+        connection.engine, compile_kwargs={"render_postcompile": True}
+    )
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params)
+    return " ".join(row[-1] for row in rows)
+
+
+@pytest.fixture
+def connection():
+    engine = create_engine("sqlite://")
+    _metadata.create_all(engine)
+    with engine.begin() as connection:
+        yield connection
+
+
+@pytest.mark.parametrize(
+    "plan",
+    [
+        _converted("size", "title", "gt", 4),
+        _converted("size", "title", "le", 9),
+        _converted("string", "score", "eq", "1.50"),
+        _plan(
+            {
+                "operator": "gt",
+                "operands": [
+                    {
+                        "expression": {
+                            "operator": "mult",
+                            "operands": [
+                                {"variable": "request.resource.attr.score"},
+                                {"variable": "request.resource.attr.weight"},
+                            ],
+                        }
+                    },
+                    {"value": 2},
+                ],
+            }
+        ),
+    ],
+)
+def test_the_query_searches_the_index(connection, plan):
+    for statement in expression_index_ddl(
+        [plan], document, _ATTR_MAP, connection.dialect
+    ):
+        connection.exec_driver_sql(statement)
+    query = get_query(plan, document, _ATTR_MAP)
+    assert "USING INDEX ix_index_document_cerbos_" in _search_plan(connection, query)
+
+
+_THROWING = {
+    action
+    for action, _ in classify_actions_for_adapter(
+        parse_actions_file(read_corpus_json("actions.json")), ADAPTER
+    ).throwing_actions
+}
+
+
+@pytest.mark.filterwarnings("ignore:cannot index")
+@pytest.mark.parametrize(
+    "action", [action for action in wire_fixture_actions() if action not in _THROWING]
+)
+def test_every_index_emitted_for_the_corpus_is_searched(action):
+    # The DDL is only worth running if the planner then reads the index, so every
+    # statement emitted for a corpus action is checked against SQLite's own plan.
+    engine = create_engine("sqlite://")
+    AdvBase.metadata.create_all(engine)
+    options = {"attribute_null_representation": ATTRIBUTE_NULL_REPRESENTATION}
+    plan = plan_from_wire_fixture(action)
+    with engine.begin() as connection:
+        statements = expression_index_ddl(
+            [plan], AdvResource, ATTR_MAP, connection.dialect, **options
+        )
+        for statement in statements:
+            connection.exec_driver_sql(statement)
+        search = _search_plan(
+            connection, get_query(plan, AdvResource, ATTR_MAP, **options)
+        )
+    for statement in statements:
+        assert f"USING INDEX {statement.split()[2]}" in search
+
+
+def test_shared_expressions_are_indexed_once():
+    statements = expression_index_ddl(
+        [_converted("size", "title", "gt", 4), _converted("size", "title", "lt", 2)],
+        document,
+        _ATTR_MAP,
+        postgresql.dialect(),
+    )
+    assert len(statements) == 1
+    assert statements[0].endswith("ON index_document ((length(title)))")
+
+
+def test_bare_columns_and_unconditional_plans_need_no_index():
+    plans = [
+        _converted("size", "title", "gt", 0),
+        _plan(None, PlanResourcesFilterKind.ALWAYS_ALLOWED),
+    ]
+    assert expression_index_ddl(plans, document, _ATTR_MAP, postgresql.dialect()) == []
+
+
+def _variable(attribute):
+    return {"variable": f"request.resource.attr.{attribute}"}
+
+
+def _expression(operator, *operands):
+    return {"expression": {"operator": operator, "operands": list(operands)}}
+
+
+@pytest.mark.parametrize(
+    "plan,expression",
+    [
+        # The quotient is only read inside the CASE that guards its denominator.
+        (
+            _plan(
+                _expression(
+                    "gt",
+                    _expression("div", _variable("score"), _variable("weight")),
+                    {"value": 1},
+                )["expression"]
+            ),
+            "CAST(weight AS FLOAT)",
+        ),
+        # Each length is compared with another column, not with a value.
+        (
+            _plan(
+                _expression("endsWith", _variable("title"), _variable("title"))[
+                    "expression"
+                ]
+            ),
+            "length(title)",
+        ),
+        # The query binds the 1 the index would hold inline.
+        (
+            _plan(
+                _expression(
+                    "gt",
+                    _expression(
+                        "add",
+                        _expression("mult", _variable("score"), _variable("weight")),
+                        {"value": 1},
+                    ),
+                    {"value": 3},
+                )["expression"]
+            ),
+            "score * weight + ?",
+        ),
+    ],
+)
+def test_an_expression_no_index_can_serve_is_reported_instead(
+    connection, plan, expression
+):
+    with pytest.warns(UserWarning, match="cannot index") as record:
+        statements = expression_index_ddl(
+            [plan], document, _ATTR_MAP, connection.dialect
+        )
+    assert statements == []
+    assert any(expression in str(warning.message) for warning in record)
+    assert "USING INDEX" not in _search_plan(
+        connection, get_query(plan, document, _ATTR_MAP)
+    )
+
+
+def test_generated_columns_are_indexed_by_name(connection):
+    plan = _converted("size", "title", "gt", 4)
+    statements = expression_index_ddl(
+        [plan], document, _ATTR_MAP, connection.dialect, generated_columns=True
+    )
+    assert statements[0].startswith("ALTER TABLE index_document ADD COLUMN cerbos_")
+    assert "INTEGER GENERATED ALWAYS AS (length(title)) VIRTUAL" in statements[0]
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+    assert expression_index_ddl(
+        [plan], document, _ATTR_MAP, postgresql.dialect(), generated_columns=True
+    )[0].endswith(" STORED")
+
+
+def test_a_generated_column_the_dialect_cannot_declare_is_refused():
+    with pytest.raises(ValueError, match="cannot add a generated column"):
+        expression_index_ddl(
+            [_converted("string", "score", "eq", "1.50")],
+            document,
+            _ATTR_MAP,
+            mysql.dialect(),
+            generated_columns=True,
+        )
@@ -20,7 +20,10 @@ whatever its plan looks like — see
 Nothing in this file starts a PDP or a container.
 """
 
+import itertools
 import math
+import re
+from datetime import datetime, timezone
 
 import pytest
 from cerbos.sdk.model import (
@@ -29,9 +32,32 @@ from cerbos.sdk.model import (
     PlanResourcesResponse,
 )
 
-from cerbos_sqlalchemy import get_query
-from sqlalchemy import Boolean, DateTime, String, column, func, literal, table
-from sqlalchemy.dialects import postgresql
+from cerbos_sqlalchemy import (
+    ClosureTable,
+    cel_function_ddl,
+    get_query,
+    register_cel_functions,
+)
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    bindparam,
+    column,
+    create_engine,
+    func,
+    literal,
+    table,
+)
+from sqlalchemy.dialects import mssql, mysql, oracle, postgresql, sqlite
+from sqlalchemy.engine.default import DefaultDialect
+from sqlalchemy.exc import CompileError
+from sqlalchemy.types import UserDefinedType
 
 
 def _default_resp_params():
@@ -284,19 +310,79 @@ class TestAttributeNullRepresentation:
         )
         assert "IS NOT NULL" in compiled
 
-    def test_two_explicit_nulls_match_field_to_field(self, resource_table):
-        compiled = self._compiled(
+    @pytest.mark.parametrize(
+        "operator,dialect,rendered",
+        [
+            (
+                "eq",
+                postgresql.dialect(),
+                'name IS NOT DISTINCT FROM resource."aString"',
+            ),
+            ("ne", postgresql.dialect(), 'name IS DISTINCT FROM resource."aString"'),
+            ("eq", mysql.dialect(), "name <=> resource.`aString`"),
+            ("ne", mysql.dialect(), "NOT (resource.name <=> resource.`aString`)"),
+            ("eq", sqlite.dialect(), 'name IS resource."aString"'),
+            ("ne", sqlite.dialect(), 'name IS NOT resource."aString"'),
+        ],
+    )
+    def test_two_explicit_sides_compare_null_safely(
+        self, resource_table, operator, dialect, rendered
+    ):
+        query = get_query(
+            _conditional_plan(
+                {
+                    "operator": operator,
+                    "operands": [
+                        {"variable": "request.resource.attr.owner"},
+                        {"variable": "request.resource.attr.coOwner"},
+                    ],
+                }
+            ),
             resource_table,
-            {
-                "operator": "eq",
-                "operands": [
-                    {"variable": "request.resource.attr.owner"},
-                    {"variable": "request.resource.attr.coOwner"},
-                ],
-            },
+            self._attr_map(resource_table),
+            attribute_null_representation=self._declared(),
         )
-        assert compiled.count("IS NULL") == 2
-        assert compiled.count("IS NOT NULL") == 2
+        where = str(query.compile(dialect=dialect)).split("WHERE ")[1]
+        assert rendered in where
+        assert " OR " not in where
+
+    # Two null VALUES are equal in CEL, and a null is unequal to anything else.
+    @pytest.mark.parametrize("operator,expected", [("eq", [0, 2]), ("ne", [1, 3])])
+    def test_two_explicit_nulls_match_field_to_field(self, operator, expected):
+        metadata = MetaData()
+        pairs = Table(
+            "pairs",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("owner", String),
+            Column("co_owner", String),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        rows = [(None, None), (None, "a"), ("a", "a"), ("a", "b")]
+        with engine.begin() as connection:
+            connection.execute(
+                pairs.insert(),
+                [dict(id=i, owner=o, co_owner=c) for i, (o, c) in enumerate(rows)],
+            )
+            query = get_query(
+                _conditional_plan(
+                    {
+                        "operator": operator,
+                        "operands": [
+                            {"variable": "request.resource.attr.owner"},
+                            {"variable": "request.resource.attr.coOwner"},
+                        ],
+                    }
+                ),
+                pairs,
+                {
+                    "request.resource.attr.owner": pairs.c.owner,
+                    "request.resource.attr.coOwner": pairs.c.co_owner,
+                },
+                attribute_null_representation=self._declared(),
+            )
+            assert sorted(row.id for row in connection.execute(query)) == expected
 
     # An attribute the declaration does not name keeps the historical
     # rendering, so declaring the convention for one cannot change the SQL
@@ -572,6 +658,70 @@ class TestSemanticEdgeTranslations:
                 {"request.resource.attr.createdAt": string_table.c.created_at},
             )
 
+    # A naive DateTime column stores UTC instants without an offset. Binding the
+    # aware instant would make PostgreSQL cast every row to timestamptz in the
+    # session time zone, so it binds naive, in the column's own representation.
+    def test_timestamp_binds_naive_utc_against_a_naive_column(self):
+        metadata = MetaData()
+        events = Table(
+            "events",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("created_at", DateTime, index=True),
+        )
+        plan = _conditional_plan(
+            {
+                "operator": "lt",
+                "operands": [
+                    {
+                        "expression": {
+                            "operator": "timestamp",
+                            "operands": [
+                                {"variable": "request.resource.attr.createdAt"}
+                            ],
+                        }
+                    },
+                    {
+                        "expression": {
+                            "operator": "timestamp",
+                            "operands": [{"value": "2024-06-01T02:00:00+02:00"}],
+                        }
+                    },
+                ],
+            }
+        )
+        query = get_query(
+            plan, events, {"request.resource.attr.createdAt": events.c.created_at}
+        )
+        compiled = query.compile(dialect=postgresql.dialect())
+        assert list(compiled.params.values()) == [datetime(2024, 6, 1)]
+
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                events.insert(),
+                [
+                    dict(id=1, created_at=datetime(2024, 5, 31, 23, 59)),
+                    dict(id=2, created_at=datetime(2024, 6, 1)),
+                    dict(id=3, created_at=datetime(2024, 6, 1, 1)),
+                ],
+            )
+            assert [row.id for row in connection.execute(query)] == [1]
+            sqlite_compiled = query.compile(engine)
+            plan_rows = connection.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {sqlite_compiled}",
+                tuple(
+                    events.c.created_at.type.dialect_impl(
+                        engine.dialect
+                    ).bind_processor(engine.dialect)(sqlite_compiled.params[name])
+                    for name in sqlite_compiled.positiontup
+                ),
+            )
+            assert "INDEX ix_events_created_at (created_at<?)" in " ".join(
+                row[-1] for row in plan_rows
+            )
+
     def test_timestamp_rejects_inexact_nanosecond_precision(self):
         temporal_table = table("events", column("created_at", DateTime(timezone=True)))
         plan = _conditional_plan(
@@ -678,170 +828,1704 @@ class TestSemanticEdgeTranslations:
             )
 
 
-class TestGetQueryOverrides:
-    def test_unrelated_override_does_not_bypass_table_mapping_validation(
-        self, resource_table, user_table
-    ):
+class TestBindParameters:
+    """One bind parameter per distinct literal, however often the translation repeats it."""
+
+    @staticmethod
+    def _eq(variable, value):
+        return {
+            "expression": {
+                "operator": "eq",
+                "operands": [{"variable": variable}, {"value": value}],
+            }
+        }
+
+    def test_a_repeated_literal_binds_once(self, resource_table, conn):
         plan = _conditional_plan(
             {
-                "operator": "eq",
+                "operator": "or",
                 "operands": [
-                    {"variable": "request.resource.attr.externalOwner"},
-                    {"value": 1},
+                    self._eq("request.resource.attr.aString", "string"),
+                    {
+                        "expression": {
+                            "operator": "gt",
+                            "operands": [
+                                {"variable": "request.resource.attr.aString"},
+                                {"value": "string"},
+                            ],
+                        }
+                    },
                 ],
             }
         )
+        query = get_query(
+            plan,
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+        )
+        compiled = query.compile(dialect=postgresql.dialect())
+        assert compiled.params == {"aString_1": "string"}
+        assert str(compiled).count("%(aString_1)s") == 2
+        assert [row.name for row in conn.execute(query)] == ["resource1"]
 
-        with pytest.raises(TypeError, match="table_mapping"):
-            get_query(
-                plan,
-                resource_table,
-                {"request.resource.attr.externalOwner": user_table.id},
-                operator_override_fns={"size": lambda *_: literal(0)},
-            )
-
-    def test_used_override_owns_foreign_operand_without_flat_mapping(
-        self, resource_table, user_table, conn
-    ):
+    def test_zeroes_of_opposite_sign_stay_apart(self, resource_table):
+        # `0.0 == -0.0` in Python, and the two are opposite infinities as divisors.
         plan = _conditional_plan(
             {
-                "operator": "eq",
+                "operator": "or",
                 "operands": [
-                    {"variable": "request.resource.attr.externalOwner"},
-                    {"value": 1},
+                    self._eq("request.resource.attr.aNumber", 0.0),
+                    self._eq("request.resource.attr.aNumber", -0.0),
                 ],
             }
         )
         query = get_query(
             plan,
             resource_table,
-            {"request.resource.attr.externalOwner": user_table.id},
-            operator_override_fns={
-                # The override deliberately consumes the foreign marker and
-                # rewrites it to a predicate on the root table.
-                "eq": lambda _column, value: resource_table.ownedBy
-                == str(value)
-            },
+            {"request.resource.attr.aNumber": resource_table.aNumber},
         )
+        values = list(query.compile().params.values())
+        assert [math.copysign(1.0, value) for value in values] == [1.0, -1.0]
 
-        assert {row.name for row in conn.execute(query)} == {
-            "resource1",
-            "resource2",
-        }
-
-    def test_in_single_query(self, resource_table, conn):
-        plan_resources_filter = PlanResourcesFilter.from_dict(
+    def test_named_placeholders_are_never_shared(self, resource_table):
+        # Two caller placeholders with no value yet look identical to a key built
+        # from value and type; sharing them would read one's value for the other.
+        plan = _conditional_plan(
             {
-                "kind": PlanResourcesFilterKind.CONDITIONAL,
-                "condition": {
-                    "expression": {
-                        "operator": "in",
-                        "operands": [
-                            {"variable": "request.resource.attr.name"},
-                            {"value": "resource1"},
-                        ],
-                    },
-                },
+                "operator": "and",
+                "operands": [
+                    self._eq("request.resource.attr.tenant", "a"),
+                    self._eq("request.resource.attr.org", "a"),
+                ],
             }
         )
-        plan_resource_resp = PlanResourcesResponse(
-            filter=plan_resources_filter,
-            **_default_resp_params(),
+        query = get_query(
+            plan,
+            resource_table,
+            {
+                "request.resource.attr.tenant": func.concat(
+                    resource_table.aString, bindparam("tenant")
+                ),
+                "request.resource.attr.org": func.concat(
+                    resource_table.aString, bindparam("org")
+                ),
+            },
         )
-        attr = {
-            "request.resource.attr.name": resource_table.name,
-        }
-        query = get_query(plan_resource_resp, resource_table, attr)
-        res = conn.execute(query).fetchall()
-        assert len(res) == 1
-        assert res[0].name == "resource1"
+        compiled = query.compile(dialect=postgresql.dialect())
+        assert {"tenant", "org"} <= set(compiled.params)
+        assert "%(tenant)s" in str(compiled) and "%(org)s" in str(compiled)
 
-    def test_in_multiple_query(self, resource_table, conn):
-        plan_resources_filter = PlanResourcesFilter.from_dict(
+    def test_integers_beyond_double_precision_stay_apart(self, resource_table):
+        # 2**53 and 2**53 + 1 are one double; as Integer binds they are two values.
+        plan = _conditional_plan(
             {
-                "kind": PlanResourcesFilterKind.CONDITIONAL,
-                "condition": {
-                    "expression": {
-                        "operator": "in",
-                        "operands": [
-                            {"variable": "request.resource.attr.name"},
-                            {"value": ["resource1", "resource2"]},
-                        ],
-                    },
-                },
+                "operator": "or",
+                "operands": [
+                    self._eq("request.resource.attr.aNumber", 2**53),
+                    self._eq("request.resource.attr.aNumber", 2**53 + 1),
+                ],
             }
         )
-        plan_resource_resp = PlanResourcesResponse(
-            filter=plan_resources_filter,
-            **_default_resp_params(),
-        )
-        attr = {
-            "request.resource.attr.name": resource_table.name,
-        }
-        query = get_query(plan_resource_resp, resource_table, attr)
-        res = conn.execute(query).fetchall()
-        assert len(res) == 2
-        assert all(map(lambda x: x.name in {"resource1", "resource2"}, res))
+        query = get_query(
+            plan,
+            resource_table,
+            {"request.resource.attr.aNumber": resource_table.aNumber},
+        )
+        assert sorted(query.compile().params.values()) == [2**53, 2**53 + 1]
+
+
+class TestColumnHierarchies:
+    """Hierarchy operators with a column on both sides, matched per row in SQL."""
+
+    _ROWS = [
+        ("a.b", "a"),
+        ("a", "a"),
+        ("ab", "a"),
+        ("a", "a.b"),
+        (None, "a"),
+        ("x.y", "x.y.z"),
+    ]
+
+    @pytest.fixture
+    def scopes(self):
+        metadata = MetaData()
+        scopes = Table(
+            "scopes",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("scope", String),
+            Column("owner_scope", String),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                scopes.insert(),
+                [
+                    {"id": i, "scope": scope, "owner_scope": owner}
+                    for i, (scope, owner) in enumerate(self._ROWS)
+                ],
+            )
+        with engine.connect() as connection:
+            yield scopes, connection
 
-    def test_unrecognised_response_attribute(self, resource_table):
-        unknown_attribute = "request.resource.attr.foo"
-        plan_resources_filter = PlanResourcesFilter.from_dict(
-            {
-                "kind": PlanResourcesFilterKind.CONDITIONAL,
-                "condition": {
-                    "expression": {
-                        "operator": "eq",
-                        "operands": [
-                            {"variable": unknown_attribute},
-                            {"value": 1},
-                        ],
-                    },
-                },
+    @staticmethod
+    def _plan(operator, negate=False):
+        def hierarchy(name):
+            return {
+                "expression": {
+                    "operator": "hierarchy",
+                    "operands": [{"variable": f"request.resource.attr.{name}"}],
+                }
             }
-        )
-        plan_resource_resp = PlanResourcesResponse(
-            filter=plan_resources_filter,
-            **_default_resp_params(),
-        )
-        attr = {
-            "request.resource.attr.ownedBy": resource_table.ownedBy,
+
+        expression = {
+            "operator": operator,
+            "operands": [hierarchy("scope"), hierarchy("ownerScope")],
         }
-        with pytest.raises(KeyError) as exc_info:
-            get_query(plan_resource_resp, resource_table, attr)
-        assert (
-            exc_info.value.args[0]
-            == f"Attribute does not exist in the attribute column map: {unknown_attribute}"
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        return _conditional_plan(expression)
+
+    @pytest.mark.parametrize(
+        "operator,negate,expected",
+        [
+            ("descendentOf", False, [0]),
+            ("ancestorOf", False, [3, 5]),
+            ("overlaps", False, [0, 1, 3, 5]),
+            # The NULL path is UNKNOWN under both polarities.
+            ("overlaps", True, [2]),
+        ],
+    )
+    def test_two_column_paths_compare_segment_wise(
+        self, scopes, operator, negate, expected
+    ):
+        table_, connection = scopes
+        query = get_query(
+            self._plan(operator, negate),
+            table_,
+            {
+                "request.resource.attr.scope": table_.c.scope,
+                "request.resource.attr.ownerScope": table_.c.owner_scope,
+            },
         )
+        assert sorted(row.id for row in connection.execute(query)) == expected
 
-    def test_unrecognised_filter(self, resource_table):
-        unknown_op = "unknown"
-        plan_resources_filter = PlanResourcesFilter.from_dict(
+    @pytest.mark.parametrize(
+        "operator,guarded",
+        [
+            ("ancestorOf", ["scope"]),
+            ("descendentOf", ["owner_scope"]),
+            ("overlaps", ["scope", "owner_scope"]),
+        ],
+    )
+    def test_a_null_path_stays_null_through_oracle_concatenation(
+        self, scopes, operator, guarded
+    ):
+        # Oracle reads `NULL || '.'` as `'.'`; unguarded, the negation would
+        # admit every row whose ancestor path is missing.
+        table_, _ = scopes
+        query = get_query(
+            self._plan(operator, negate=True),
+            table_,
             {
-                "kind": PlanResourcesFilterKind.CONDITIONAL,
-                "condition": {
-                    "expression": {
-                        "operator": unknown_op,
-                        "operands": [
-                            {"variable": "request.resource.attr.ownedBy"},
-                            {"value": "1"},
-                        ],
-                    },
-                },
-            }
+                "request.resource.attr.scope": table_.c.scope,
+                "request.resource.attr.ownerScope": table_.c.owner_scope,
+            },
         )
-        plan_resource_resp = PlanResourcesResponse(
-            filter=plan_resources_filter,
-            **_default_resp_params(),
+        compiled = str(
+            query.compile(
+                dialect=oracle.dialect(), compile_kwargs={"literal_binds": True}
+            )
         )
-        attr = {
-            "request.resource.attr.ownedBy": resource_table.ownedBy,
-        }
-        with pytest.raises(ValueError) as exc_info:
-            get_query(plan_resource_resp, resource_table, attr)
-        assert exc_info.value.args[0] == f"Unrecognised operator: {unknown_op}"
+        for name in guarded:
+            assert (
+                f"CASE WHEN (scopes.{name} IS NOT NULL) THEN scopes.{name} || '.' END"
+                in compiled
+            )
+        assert compiled.count(" || ") == compiled.count(" IS NOT NULL) THEN ")
+
+
+class TestClosureTableHierarchies:
+    """A declared closure table answers hierarchy operators by lookup."""
+
+    _SCOPES = ["a", "a.b", "a.b.c", "x", None]
+
+    @pytest.fixture
+    def tables(self):
+        metadata = MetaData()
+        nodes = Table(
+            "nodes",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("scope", String),
+        )
+        closure = Table(
+            "node_closure",
+            metadata,
+            Column("ancestor", String),
+            Column("descendant", String),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        paths = [scope for scope in self._SCOPES if scope is not None]
+        with engine.begin() as connection:
+            connection.execute(
+                nodes.insert(),
+                [{"id": i, "scope": scope} for i, scope in enumerate(self._SCOPES)],
+            )
+            connection.execute(
+                closure.insert(),
+                [
+                    {"ancestor": ancestor, "descendant": descendant}
+                    for ancestor in paths
+                    for descendant in paths
+                    if descendant == ancestor or descendant.startswith(ancestor + ".")
+                ],
+            )
+        with engine.connect() as connection:
+            yield nodes, closure, connection
 
-    def test_in_equals_override(self, resource_table, conn):
-        plan_resources_filter = PlanResourcesFilter.from_dict(
+    @pytest.mark.parametrize(
+        "operator,scope_first,negate,expected",
+        [
+            ("descendentOf", True, False, [1, 2]),
+            ("ancestorOf", False, False, [2]),
+            # The NULL scope is UNKNOWN under both polarities.
+            ("ancestorOf", False, True, [0, 1, 3]),
+            ("overlaps", True, False, [0, 1, 2]),
+        ],
+    )
+    def test_hierarchy_operators_look_up_the_closure_table(
+        self, tables, operator, scope_first, negate, expected
+    ):
+        nodes, closure, connection = tables
+        scope = {
+            "expression": {
+                "operator": "hierarchy",
+                "operands": [{"variable": "request.resource.attr.scope"}],
+            }
+        }
+        path = {
+            "expression": {
+                "operator": "hierarchy",
+                "operands": [{"value": "a" if operator == "descendentOf" else "a.b"}],
+            }
+        }
+        expression = {
+            "operator": operator,
+            "operands": [scope, path] if scope_first else [path, scope],
+        }
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        query = get_query(
+            _conditional_plan(expression),
+            nodes,
+            {"request.resource.attr.scope": nodes.c.scope},
+            attribute_hierarchy_representation={
+                "request.resource.attr.scope": ClosureTable(
+                    ancestor=closure.c.ancestor, descendant=closure.c.descendant
+                )
+            },
+        )
+        assert " LIKE " not in str(query.compile())
+        assert sorted(row.id for row in connection.execute(query)) == expected
+
+
+class _LTREE(UserDefinedType):
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "LTREE"
+
+
+class TestLtreeHierarchies:
+    """PostgreSQL ``ltree`` columns answer hierarchy operators with ``@>``/``<@``."""
+
+    paths = table(
+        "paths",
+        column("scope", String),
+        column("tree", _LTREE()),
+        column("owner_tree", _LTREE()),
+    )
+
+    @staticmethod
+    def _plan(operator, left, right):
+        def hierarchy(operand):
+            return {"expression": {"operator": "hierarchy", "operands": [operand]}}
+
+        return _conditional_plan(
+            {"operator": operator, "operands": [hierarchy(left), hierarchy(right)]}
+        )
+
+    def _where(self, plan, **kwargs):
+        query = get_query(
+            plan,
+            self.paths,
+            {
+                "request.resource.attr.scope": self.paths.c.scope,
+                "request.resource.attr.tree": self.paths.c.tree,
+                "request.resource.attr.ownerTree": self.paths.c.owner_tree,
+            },
+            **kwargs,
+        )
+        return str(query.compile(dialect=postgresql.dialect())).split("WHERE ")[1]
+
+    def test_a_declared_text_column_is_cast_with_the_literal_path(self):
+        where = self._where(
+            self._plan(
+                "ancestorOf",
+                {"value": "dept.eng"},
+                {"variable": "request.resource.attr.scope"},
+            ),
+            attribute_hierarchy_representation={"request.resource.attr.scope": "ltree"},
+        )
+        assert where == (
+            "CAST(%(param_1)s AS ltree) @> CAST(paths.scope AS ltree) "
+            "AND CAST(%(param_1)s AS ltree) != CAST(paths.scope AS ltree)"
+        )
+
+    def test_a_declared_text_column_is_cast_beside_an_ltree_column(self):
+        where = self._where(
+            self._plan(
+                "ancestorOf",
+                {"variable": "request.resource.attr.tree"},
+                {"variable": "request.resource.attr.scope"},
+            ),
+            attribute_hierarchy_representation={"request.resource.attr.scope": "ltree"},
+        )
+        assert where == (
+            "paths.tree @> CAST(paths.scope AS ltree) "
+            "AND paths.tree != CAST(paths.scope AS ltree)"
+        )
+
+    def test_an_ltree_typed_column_is_detected(self):
+        where = self._where(
+            self._plan(
+                "overlaps",
+                {"variable": "request.resource.attr.tree"},
+                {"variable": "request.resource.attr.ownerTree"},
+            )
+        )
+        assert (
+            where == "paths.tree @> paths.owner_tree OR paths.tree <@ paths.owner_tree"
+        )
+
+    def test_a_label_ltree_cannot_hold_reads_the_column_as_text(self):
+        where = self._where(
+            self._plan(
+                "ancestorOf",
+                {"value": "50%.a"},
+                {"variable": "request.resource.attr.tree"},
+            )
+        )
+        assert where.startswith("CAST(paths.tree AS VARCHAR) LIKE ")
+
+    def test_an_unknown_representation_is_rejected(self):
+        with pytest.raises(ValueError, match="attribute_hierarchy_representation"):
+            self._where(
+                self._plan(
+                    "ancestorOf",
+                    {"value": "a"},
+                    {"variable": "request.resource.attr.scope"},
+                ),
+                attribute_hierarchy_representation={
+                    "request.resource.attr.scope": "closure"
+                },
+            )
+
+
+class TestStringMatchLowering:
+    """``string_match_lowering``: index-friendly forms of CEL's string matching."""
+
+    @staticmethod
+    def _starts_with(needle):
+        return _conditional_plan(
+            {
+                "operator": "startsWith",
+                "operands": [{"variable": "request.resource.attr.aString"}, needle],
+            }
+        )
+
+    @pytest.mark.parametrize(
+        "prefix,expected",
+        [("a", ["resource2", "resource3"]), ("str", ["resource1"]), ("", None)],
+    )
+    def test_a_literal_prefix_lowers_to_a_half_open_range(
+        self, resource_table, conn, prefix, expected
+    ):
+        query = get_query(
+            self._starts_with({"value": prefix}),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            string_match_lowering="range",
+        )
+        compiled = str(query.compile())
+        assert " LIKE " not in compiled and " >= " in compiled
+        expected = expected or ["resource1", "resource2", "resource3"]
+        assert sorted(row.name for row in conn.execute(query)) == expected
+
+    @pytest.mark.parametrize(
+        "prefix,upper",
+        [("ab", "ac"), ("a\U0010ffff", "b"), ("\ud7ff", "\ue000")],
+    )
+    def test_the_upper_bound_is_the_prefix_successor(
+        self, resource_table, prefix, upper
+    ):
+        query = get_query(
+            self._starts_with({"value": prefix}),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            string_match_lowering="range",
+        )
+        assert list(query.compile().params.values()) == [prefix, upper]
+
+    def test_a_prefix_with_no_successor_keeps_only_the_lower_bound(
+        self, resource_table
+    ):
+        query = get_query(
+            self._starts_with({"value": "\U0010ffff"}),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            string_match_lowering="range",
+        )
+        assert str(query.compile()).endswith('WHERE resource."aString" >= :aString_1')
+
+    def test_a_column_needle_is_not_a_range(self, resource_table):
+        query = get_query(
+            self._starts_with({"variable": "request.resource.attr.name"}),
+            resource_table,
+            {
+                "request.resource.attr.aString": resource_table.aString,
+                "request.resource.attr.name": resource_table.name,
+            },
+            string_match_lowering="range",
+        )
+        assert " >= " not in str(query.compile())
+
+    @staticmethod
+    def _match(operator, needle):
+        return _conditional_plan(
+            {
+                "operator": operator,
+                "operands": [{"variable": "request.resource.attr.aString"}, needle],
+            }
+        )
+
+    @pytest.mark.parametrize(
+        "operator,needle,expected",
+        [
+            ("contains", "String", ["resource2", "resource3"]),
+            # Case-sensitive with no pragma: LIKE would match both `a...` rows.
+            ("startsWith", "A", []),
+            ("endsWith", "?", ["resource2"]),
+            ("contains", "[a-z]*", []),
+        ],
+    )
+    def test_glob_matches_literal_needles_case_sensitively(
+        self, resource_table, conn, operator, needle, expected
+    ):
+        query = get_query(
+            self._match(operator, {"value": needle}),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            string_match_lowering="glob",
+        )
+        assert " GLOB " in str(query.compile())
+        assert sorted(row.name for row in conn.execute(query)) == expected
+
+    @pytest.mark.parametrize(
+        "operator,receiver,expected",
+        [
+            ("contains", "a string of them", "resource1"),
+            ("startsWith", "amIAString?%_", "resource2"),
+            ("endsWith", "%_anotherString", "resource3"),
+        ],
+    )
+    @pytest.mark.parametrize("lowering", ["like", "glob"])
+    def test_a_column_needle_is_matched_by_position(
+        self, resource_table, conn, operator, receiver, expected, lowering
+    ):
+        query = get_query(
+            _conditional_plan(
+                {
+                    "operator": operator,
+                    "operands": [
+                        {"value": receiver},
+                        {"variable": "request.resource.attr.aString"},
+                    ],
+                }
+            ),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            string_match_lowering=lowering,
+        )
+        compiled = str(query.compile(dialect=sqlite.dialect()))
+        assert " LIKE " not in compiled and "replace(" not in compiled
+        assert [row.name for row in conn.execute(query)] == [expected]
+
+    @pytest.mark.parametrize(
+        "dialect,position,length",
+        [
+            (postgresql.dialect(), "strpos(", "char_length("),
+            (mysql.dialect(), "LOCATE(", "char_length("),
+            (sqlite.dialect(), "instr(", "length("),
+            (mssql.dialect(), "CHARINDEX(", "LEN("),
+            (oracle.dialect(), "INSTR(", "length("),
+        ],
+    )
+    def test_position_lowering_is_spelled_per_dialect(
+        self, resource_table, dialect, position, length
+    ):
+        plan = _conditional_plan(
+            {
+                "operator": "or",
+                "operands": [
+                    {"expression": {"operator": operator, "operands": operands}}
+                    for operator in ("contains", "endsWith")
+                    for operands in [
+                        [
+                            {"variable": "request.resource.attr.aString"},
+                            {"variable": "request.resource.attr.name"},
+                        ]
+                    ]
+                ],
+            }
+        )
+        query = get_query(
+            plan,
+            resource_table,
+            {
+                "request.resource.attr.aString": resource_table.aString,
+                "request.resource.attr.name": resource_table.name,
+            },
+        )
+        compiled = str(query.compile(dialect=dialect))
+        assert position in compiled and length in compiled
+
+    @pytest.mark.parametrize(
+        "operator,pattern",
+        [
+            ("contains", "('%' || {} || '%')"),
+            ("startsWith", "({} || '%')"),
+            ("endsWith", "('%' || {})"),
+        ],
+    )
+    def test_a_dialect_with_no_known_position_keeps_the_escaped_like(
+        self, resource_table, operator, pattern
+    ):
+        # The position spellings are not read everywhere, so any other dialect
+        # keeps the LIKE every SQL database reads, over the needle escaped per row.
+        class CockroachDialect(DefaultDialect):
+            name = "cockroachdb"
+
+        query = get_query(
+            self._match(operator, {"variable": "request.resource.attr.name"}),
+            resource_table,
+            {
+                "request.resource.attr.aString": resource_table.aString,
+                "request.resource.attr.name": resource_table.name,
+            },
+        )
+        escaped = (
+            "replace(replace(replace(replace(resource.name, '\\', '\\\\'), "
+            "'%', '\\%'), '_', '\\_'), '[', '\\[')"
+        )
+        compiled = str(
+            query.compile(
+                dialect=CockroachDialect(), compile_kwargs={"literal_binds": True}
+            )
+        )
+        assert compiled.endswith(
+            f"WHERE (resource.\"aString\" LIKE {pattern.format(escaped)} ESCAPE '\\')"
+        )
+
+    @pytest.mark.parametrize("operator", ["ancestorOf", "overlaps"])
+    def test_a_literal_hierarchy_ancestor_is_a_range_too(
+        self, resource_table, operator
+    ):
+        def hierarchy(operand):
+            return {"expression": {"operator": "hierarchy", "operands": [operand]}}
+
+        query = get_query(
+            _conditional_plan(
+                {
+                    "operator": operator,
+                    "operands": [
+                        hierarchy({"value": "dept.eng"}),
+                        hierarchy({"variable": "request.resource.attr.aString"}),
+                    ],
+                }
+            ),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            string_match_lowering="range",
+        )
+        compiled = query.compile()
+        assert " LIKE " not in str(compiled)
+        params = list(compiled.params.values())
+        assert "dept.eng." in params and "dept.eng/" in params
+
+    def test_an_unknown_lowering_is_rejected(self, resource_table):
+        with pytest.raises(ValueError, match="string_match_lowering"):
+            get_query(
+                self._starts_with({"value": "a"}),
+                resource_table,
+                {"request.resource.attr.aString": resource_table.aString},
+                string_match_lowering="index",
+            )
+
+
+class TestSargableConversions:
+    """``size()``/``string()`` comparisons that leave the column bare."""
+
+    @staticmethod
+    def _convert(conversion, attribute, operator, value, value_first=False):
+        operands = [
+            {
+                "expression": {
+                    "operator": conversion,
+                    "operands": [{"variable": f"request.resource.attr.{attribute}"}],
+                }
+            },
+            {"value": value},
+        ]
+        if value_first:
+            operands.reverse()
+        return _conditional_plan({"operator": operator, "operands": operands})
+
+    @staticmethod
+    def _attr_map(resource_table):
+        return {
+            "request.resource.attr.aString": resource_table.aString,
+            "request.resource.attr.aNumber": resource_table.aNumber,
+            "request.resource.attr.aBool": resource_table.aBool,
+        }
+
+    @pytest.mark.parametrize(
+        "operator,value,value_first,where",
+        [
+            ("gt", 0, False, "!= ''"),
+            ("ge", 1, False, "!= ''"),
+            ("ge", 0.5, False, "!= ''"),
+            ("ne", 0, False, "!= ''"),
+            ("eq", 0, False, "= ''"),
+            ("lt", 1, False, "= ''"),
+            ("le", 0, False, "= ''"),
+            ("lt", 0, True, "!= ''"),
+            ("ge", 0, True, "= ''"),
+        ],
+    )
+    def test_a_size_against_zero_or_one_is_an_emptiness_test(
+        self, resource_table, operator, value, value_first, where
+    ):
+        query = get_query(
+            self._convert("size", "aString", operator, value, value_first),
+            resource_table,
+            self._attr_map(resource_table),
+        )
+        compiled = str(query.compile(dialect=postgresql.dialect()))
+        assert compiled.endswith(f'WHERE resource."aString" {where}')
+
+    @pytest.mark.parametrize("operator,value", [("gt", 1), ("eq", 1), ("ge", 0)])
+    def test_other_sizes_keep_the_length(self, resource_table, operator, value):
+        query = get_query(
+            self._convert("size", "aString", operator, value),
+            resource_table,
+            self._attr_map(resource_table),
+        )
+        assert "length(" in str(query.compile())
+
+    def test_mysql_compares_the_empty_string_byte_wise(self, resource_table):
+        query = get_query(
+            self._convert("size", "aString", "gt", 0),
+            resource_table,
+            self._attr_map(resource_table),
+        )
+        compiled = str(query.compile(dialect=mysql.dialect()))
+        assert compiled.endswith("WHERE resource.`aString` != CAST('' AS BINARY)")
+
+    @pytest.mark.parametrize(
+        "dialect,where",
+        [
+            # SQL Server pads like MySQL, and its LEN drops trailing spaces too.
+            (mssql.dialect(), "WHERE DATALENGTH(resource.[aString]) != 0"),
+            # Oracle stores '' as NULL, so `!= ''` would never be TRUE.
+            (oracle.dialect(), 'WHERE LENGTH("resource"."aString") != 0'),
+        ],
+    )
+    def test_a_padding_or_empty_as_null_dialect_reads_the_length(
+        self, resource_table, dialect, where
+    ):
+        query = get_query(
+            self._convert("size", "aString", "gt", 0),
+            resource_table,
+            self._attr_map(resource_table),
+        )
+        assert str(query.compile(dialect=dialect)).endswith(where)
+
+    def test_a_canonical_number_compares_the_column(self, resource_table, conn):
+        query = get_query(
+            self._convert("string", "aNumber", "eq", "2", value_first=True),
+            resource_table,
+            self._attr_map(resource_table),
+        )
+        compiled = query.compile()
+        assert str(compiled).endswith('WHERE resource."aNumber" = :aNumber_1')
+        assert compiled.params == {"aNumber_1": 2}
+        assert [row.name for row in conn.execute(query)] == ["resource2"]
+
+    @pytest.mark.parametrize(
+        "value", ["2.0", "02", "+2", "0", "-0", "1e+16", "0.00001", "2.5", 2]
+    )
+    def test_a_non_canonical_literal_keeps_the_cast(self, resource_table, value):
+        query = get_query(
+            self._convert("string", "aNumber", "eq", value),
+            resource_table,
+            self._attr_map(resource_table),
+        )
+        assert "CAST(" in str(query.compile())
+
+    def test_an_overridden_conversion_is_left_alone(self, resource_table):
+        query = get_query(
+            self._convert("size", "aString", "gt", 0),
+            resource_table,
+            self._attr_map(resource_table),
+            operator_override_fns={"size": lambda c, _: func.octet_length(c)},
+        )
+        assert "octet_length(" in str(query.compile())
+
+
+class TestQuotientSums:
+    """Arithmetic over several divisions, tested once per division."""
+
+    # Every sign and zero for two quotients, plus a missing operand.
+    _ROWS = [
+        *itertools.product([-2.0, 0.0, 3.0], repeat=4),
+        (None, 1.0, 1.0, 1.0),
+        (1.0, 0.0, 1.0, None),
+    ]
+
+    @pytest.fixture
+    def quotients(self):
+        metadata = MetaData()
+        quotients = Table(
+            "quotients",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            *(Column(name, Float) for name in "abcd"),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                quotients.insert(),
+                [
+                    dict(id=i, **dict(zip("abcd", row)))
+                    for i, row in enumerate(self._ROWS)
+                ],
+            )
+        with engine.connect() as connection:
+            yield quotients, connection
+
+    @staticmethod
+    def _ieee_div(numerator, denominator):
+        if denominator != 0:
+            return numerator / denominator
+        return math.nan if numerator == 0 else math.copysign(math.inf, numerator)
+
+    @staticmethod
+    def _arithmetic(operator, *operands):
+        return {"expression": {"operator": operator, "operands": list(operands)}}
+
+    def _quotient(self, numerator, denominator):
+        return self._arithmetic(
+            "div",
+            {"variable": f"request.resource.attr.{numerator}"},
+            {"variable": f"request.resource.attr.{denominator}"},
+        )
+
+    @pytest.mark.parametrize(
+        "shape,reference",
+        [
+            ("sum", lambda p, q: p + q),
+            ("difference", lambda p, q: p - q),
+            ("scaled", lambda p, q: p * -2.0 + q / 4.0),
+            ("zeroed", lambda p, q: p * 0.0 + q),
+        ],
+    )
+    @pytest.mark.parametrize("operator", ["gt", "eq", "ne", "le"])
+    @pytest.mark.parametrize("negate", [False, True])
+    def test_rows_match_ieee_arithmetic(
+        self, quotients, shape, reference, operator, negate
+    ):
+        table, connection = quotients
+        p, q = self._quotient("a", "b"), self._quotient("c", "d")
+        value = {
+            "sum": lambda: self._arithmetic("add", p, q),
+            "difference": lambda: self._arithmetic("sub", p, q),
+            "scaled": lambda: self._arithmetic(
+                "add",
+                self._arithmetic("mult", p, {"value": -2.0}),
+                self._arithmetic("div", q, {"value": 4.0}),
+            ),
+            "zeroed": lambda: self._arithmetic(
+                "add", self._arithmetic("mult", p, {"value": 0.0}), q
+            ),
+        }[shape]()
+        expression = {"operator": operator, "operands": [value, {"value": 1.5}]}
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        query = get_query(
+            _conditional_plan(expression),
+            table,
+            {f"request.resource.attr.{name}": table.c[name] for name in "abcd"},
+        )
+
+        comparisons = {
+            "gt": lambda v: v > 1.5,
+            "eq": lambda v: v == 1.5,
+            "ne": lambda v: v != 1.5,
+            "le": lambda v: v <= 1.5,
+        }
+        expected = []
+        for i, (a, b, c, d) in enumerate(self._ROWS):
+            if None in (a, b, c, d):
+                continue  # a missing attribute is denied under both polarities
+            v = reference(self._ieee_div(a, b), self._ieee_div(c, d))
+            if comparisons[operator](v) != negate:
+                expected.append(i)
+        assert sorted(row.id for row in connection.execute(query)) == expected
+
+    def test_a_constant_denominator_is_a_plain_comparison(self, quotients):
+        table, _ = quotients
+        plan = _conditional_plan(
+            {
+                "operator": "gt",
+                "operands": [
+                    self._arithmetic(
+                        "div", {"variable": "request.resource.attr.a"}, {"value": 2.0}
+                    ),
+                    {"value": 1},
+                ],
+            }
+        )
+        query = get_query(plan, table, {"request.resource.attr.a": table.c.a})
+        compiled = str(query.compile(dialect=postgresql.dialect()))
+        assert "CASE" not in compiled and "nullif" not in compiled
+
+    @pytest.mark.parametrize("negate", [False, True])
+    def test_a_shared_denominator_is_tested_once(self, quotients, negate):
+        table, connection = quotients
+        product = self._arithmetic(
+            "mult", self._quotient("a", "b"), self._quotient("c", "b")
+        )
+        expression = {"operator": "lt", "operands": [product, {"value": 1.5}]}
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        query = get_query(
+            _conditional_plan(expression),
+            table,
+            {f"request.resource.attr.{name}": table.c[name] for name in "abcd"},
+        )
+        # One test of `b = 0` and one of each numerator's sign under it, rather
+        # than a second `b = 0` test nested in every arm of the first.
+        assert str(query.compile()).count("CAST(quotients.b AS FLOAT) = ") == 1
+
+        expected = []
+        for i, (a, b, c, d) in enumerate(self._ROWS):
+            if None in (a, b, c):
+                continue
+            v = self._ieee_div(a, b) * self._ieee_div(c, b)
+            if (v < 1.5) != negate:
+                expected.append(i)
+        assert sorted(row.id for row in connection.execute(query)) == expected
+
+    def test_the_sql_grows_linearly_with_the_divisions(self, quotients):
+        table, _ = quotients
+
+        def rendered(count):
+            total = self._quotient("a", "b")
+            for _ in range(count - 1):
+                total = self._arithmetic("add", total, self._quotient("c", "d"))
+            plan = _conditional_plan(
+                {"operator": "gt", "operands": [total, {"value": 1}]}
+            )
+            attr_map = {
+                f"request.resource.attr.{name}": table.c[name] for name in "abcd"
+            }
+            return len(str(get_query(plan, table, attr_map).compile()))
+
+        assert rendered(8) - rendered(4) == 2 * (rendered(4) - rendered(2))
+
+
+class TestMonotoneArithmetic:
+    """Arithmetic by constants moved off the column, proven row by row."""
+
+    # Integers around the bounds the plans below produce, and for the double
+    # column the neighbours of those bounds that rounding can pull across them.
+    _NUMBERS = [*range(-4, 14), 10**6]
+    _DOUBLES = [
+        *map(float, _NUMBERS),
+        -1.5,
+        0.1,
+        0.19999999999999998,
+        0.2,
+        math.nextafter(4.0, math.inf),
+        math.nextafter(12.0, -math.inf),
+        1e20,
+    ]
+
+    @pytest.fixture
+    def numbers(self):
+        metadata = MetaData()
+        numbers = Table(
+            "numbers",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("n", Integer),
+            Column("d", Float),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        rows = [dict(n=n, d=None) for n in self._NUMBERS]
+        rows += [dict(n=None, d=d) for d in self._DOUBLES]
+        with engine.begin() as connection:
+            connection.execute(
+                numbers.insert(), [dict(id=i, **row) for i, row in enumerate(rows)]
+            )
+        with engine.connect() as connection:
+            yield numbers, connection, rows
+
+    @staticmethod
+    def _arithmetic(operator, *operands):
+        return {"expression": {"operator": operator, "operands": list(operands)}}
+
+    def _plan(self, attribute, operator, shape, value):
+        x = {"variable": f"request.resource.attr.{attribute}"}
+        arithmetic = {
+            "plus one": lambda: self._arithmetic("add", x, {"value": 1}),
+            "doubled": lambda: self._arithmetic("mult", x, {"value": 2}),
+            "quartered": lambda: self._arithmetic("div", x, {"value": 4}),
+            "negated": lambda: self._arithmetic("mult", x, {"value": -2}),
+            "ten minus": lambda: self._arithmetic("sub", {"value": 10}, x),
+            "plus a tenth": lambda: self._arithmetic("add", x, {"value": 0.1}),
+            "absorbed": lambda: self._arithmetic("add", x, {"value": 1e20}),
+            "chained": lambda: self._arithmetic(
+                "div",
+                self._arithmetic(
+                    "add", self._arithmetic("mult", x, {"value": 3}), {"value": 1}
+                ),
+                {"value": -4},
+            ),
+        }[shape]()
+        return _conditional_plan(
+            {"operator": operator, "operands": [arithmetic, {"value": value}]}
+        )
+
+    _REFERENCES = {
+        "plus one": lambda x: x + 1,
+        "doubled": lambda x: x * 2,
+        "quartered": lambda x: x / 4,
+        "negated": lambda x: x * -2,
+        "ten minus": lambda x: 10 - x,
+        "plus a tenth": lambda x: x + 0.1,
+        "absorbed": lambda x: x + 1e20,
+        "chained": lambda x: (x * 3 + 1) / -4,
+    }
+    _COMPARISONS = {
+        "eq": lambda v, k: v == k,
+        "ne": lambda v, k: v != k,
+        "lt": lambda v, k: v < k,
+        "gt": lambda v, k: v > k,
+        "le": lambda v, k: v <= k,
+        "ge": lambda v, k: v >= k,
+    }
+
+    @pytest.mark.parametrize("shape", sorted(_REFERENCES))
+    @pytest.mark.parametrize("operator", ["eq", "ne", "lt", "gt", "le", "ge"])
+    @pytest.mark.parametrize("value", [5, -1.5, 0.3, 1e20])
+    @pytest.mark.parametrize("attribute", ["n", "d"])
+    def test_rows_match_ieee_arithmetic(
+        self, numbers, shape, operator, value, attribute
+    ):
+        table, connection, rows = numbers
+        query = get_query(
+            self._plan(attribute, operator, shape, value),
+            table,
+            {f"request.resource.attr.{name}": table.c[name] for name in "nd"},
+        )
+        expected = [
+            i
+            for i, row in enumerate(rows)
+            if row[attribute] is not None
+            and self._COMPARISONS[operator](
+                self._REFERENCES[shape](float(row[attribute])), value
+            )
+        ]
+        assert sorted(row.id for row in connection.execute(query)) == expected
+
+    @pytest.mark.parametrize(
+        "operator,shape,value,where,params",
+        [
+            ("gt", "plus one", 5, "numbers.n > %(n_1)s", {"n_1": 4}),
+            ("le", "doubled", 10, "numbers.n <= %(n_1)s", {"n_1": 5}),
+            ("ge", "quartered", 3, "numbers.n >= %(n_1)s", {"n_1": 12}),
+            ("lt", "negated", 3, "numbers.n > %(n_1)s", {"n_1": -2}),
+            ("eq", "ten minus", 3, "numbers.n = %(n_1)s", {"n_1": 7}),
+        ],
+    )
+    def test_the_column_is_compared_bare(
+        self, numbers, operator, shape, value, where, params
+    ):
+        table, _, _ = numbers
+        query = get_query(
+            self._plan("n", operator, shape, value),
+            table,
+            {"request.resource.attr.n": table.c.n},
+        )
+        compiled = query.compile(dialect=postgresql.dialect())
+        assert str(compiled).endswith(f"WHERE {where}")
+        assert compiled.params == params
+
+    def test_an_unsatisfiable_integer_comparison_keeps_the_arithmetic(self, numbers):
+        table, _, _ = numbers
+        query = get_query(
+            self._plan("n", "eq", "plus a tenth", 0.3),
+            table,
+            {"request.resource.attr.n": table.c.n},
+        )
+        assert "numbers.n + " in str(query.compile())
+
+    def test_an_overridden_operator_keeps_the_arithmetic(self, numbers):
+        table, _, _ = numbers
+        query = get_query(
+            self._plan("n", "gt", "plus one", 5),
+            table,
+            {"request.resource.attr.n": table.c.n},
+            operator_override_fns={"add": lambda c, v: c + v + 0},
+        )
+        assert "numbers.n + " in str(query.compile())
+
+
+class TestDistributedTernaries:
+    """Comparisons over ``if`` arms, proven row by row under three-valued logic."""
+
+    _ROWS = list(itertools.product([True, False, None], [None, 5, 20], [None, 3, 10]))
+
+    @pytest.fixture
+    def quotas(self):
+        metadata = MetaData()
+        quotas = Table(
+            "quotas",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("gold", Boolean),
+            Column("quota", Integer),
+            Column("used", Integer),
+        )
+        engine = create_engine("sqlite://")
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                quotas.insert(),
+                [
+                    dict(id=i, gold=gold, quota=quota, used=used)
+                    for i, (gold, quota, used) in enumerate(self._ROWS)
+                ],
+            )
+        with engine.connect() as connection:
+            yield quotas, connection
+
+    @staticmethod
+    def _if(condition, then_operand, else_operand):
+        return {
+            "expression": {
+                "operator": "if",
+                "operands": [condition, then_operand, else_operand],
+            }
+        }
+
+    _GOLD = {"variable": "request.resource.attr.gold"}
+    _QUOTA = {"variable": "request.resource.attr.quota"}
+    _USED = {"variable": "request.resource.attr.used"}
+
+    def _shapes(self):
+        # Each shape with CEL's answer, None standing for a missing-attribute error.
+        def pick(condition, then_value, else_value):
+            if condition is None:
+                return None
+            return then_value() if condition else else_value()
+
+        def greater(left, right):
+            return None if None in (left, right) else left > right
+
+        low_usage = {
+            "expression": {"operator": "lt", "operands": [self._USED, {"value": 5}]}
+        }
+        return {
+            "column arm": (
+                {
+                    "operator": "gt",
+                    "operands": [
+                        self._if(self._GOLD, self._QUOTA, {"value": 10}),
+                        self._USED,
+                    ],
+                },
+                lambda gold, quota, used: greater(
+                    pick(gold, lambda: quota, lambda: 10), used
+                ),
+            ),
+            "value first": (
+                {
+                    "operator": "lt",
+                    "operands": [
+                        {"value": 7},
+                        self._if(self._GOLD, self._QUOTA, {"value": 1}),
+                    ],
+                },
+                lambda gold, quota, used: pick(
+                    gold, lambda: greater(quota, 7), lambda: False
+                ),
+            ),
+            "nested": (
+                {
+                    "operator": "gt",
+                    "operands": [
+                        self._if(
+                            self._GOLD,
+                            self._QUOTA,
+                            self._if(low_usage, {"value": 30}, {"value": 1}),
+                        ),
+                        {"value": 4},
+                    ],
+                },
+                lambda gold, quota, used: pick(
+                    gold,
+                    lambda: greater(quota, 4),
+                    lambda: None if used is None else used < 5,
+                ),
+            ),
+        }
+
+    @pytest.mark.parametrize("shape", ["column arm", "value first", "nested"])
+    @pytest.mark.parametrize("negate", [False, True])
+    def test_rows_match_cel(self, quotas, shape, negate):
+        table, connection = quotas
+        expression, reference = self._shapes()[shape]
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        query = get_query(
+            _conditional_plan(expression),
+            table,
+            {f"request.resource.attr.{name}": table.c[name] for name in table.c.keys()},
+        )
+        assert "CASE" not in str(query.compile())
+        expected = [
+            i
+            for i, row in enumerate(self._ROWS)
+            if (outcome := reference(*row)) is not None and outcome != negate
+        ]
+        assert sorted(row.id for row in connection.execute(query)) == expected
+
+
+class TestCelFunctionPack:
+    """``cel_functions=True`` over the pack registered on SQLite, row by row."""
+
+    _ROWS = [
+        # text, amount, flag
+        ("100", -0.6, True),
+        ("100%_done", 0.4, False),
+        ("+100", -1.0, None),
+        (" 100", 1e19, True),
+        ("9223372036854775808", None, False),
+        ("1.5", 2.5, True),
+        ("1e400", -2.5, False),
+        ("1e-400", 0.0, True),
+        (".5", 9.2e18, False),
+        ("5.", -9.3e18, True),
+        ("1.5 ", 1.0, False),
+        ("0x10", 7.9, True),
+        (None, -7.9, None),
+    ]
+
+    @pytest.fixture
+    def conversions(self):
+        metadata = MetaData()
+        conversions = Table(
+            "conversions",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("text", String),
+            Column("amount", Float),
+            Column("flag", Boolean),
+        )
+        engine = create_engine("sqlite://")
+        register_cel_functions(engine)
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                conversions.insert(),
+                [
+                    dict(id=i, text=text, amount=amount, flag=flag)
+                    for i, (text, amount, flag) in enumerate(self._ROWS)
+                ],
+            )
+        with engine.connect() as connection:
+            yield conversions, connection
+
+    @staticmethod
+    def _converted(conversion, attribute, operator, value):
+        return {
+            "operator": operator,
+            "operands": [
+                {
+                    "expression": {
+                        "operator": conversion,
+                        "operands": [
+                            {"variable": f"request.resource.attr.{attribute}"}
+                        ],
+                    }
+                },
+                {"value": value},
+            ],
+        }
+
+    @staticmethod
+    def _int_of_string(text):
+        # Go's strconv.ParseInt: the whole string, base 10, within int64.
+        if text is None or not re.fullmatch(r"[+-]?[0-9]+", text):
+            return None
+        return int(text) if -(2**63) <= int(text) < 2**63 else None
+
+    @staticmethod
+    def _int_of_double(amount):
+        if amount is None or not -(2.0**63) < amount < 2.0**63:
+            return None
+        return math.trunc(amount)
+
+    @staticmethod
+    def _double_of_string(text):
+        pattern = r"[+-]?(?:[0-9]+[.]?[0-9]*|[.][0-9]+)(?:[eE][+-]?[0-9]+)?"
+        if text is None or not re.fullmatch(pattern, text):
+            return None
+        return float(text) if math.isfinite(float(text)) else None
+
+    def _shapes(self):
+        # Each shape with CEL's answer, None standing for an error.
+        def compared(converted, test):
+            return None if converted is None else test(converted)
+
+        return {
+            "int of string": (
+                self._converted("int", "text", "eq", 100),
+                lambda text, amount, flag: compared(
+                    self._int_of_string(text), lambda v: v == 100
+                ),
+            ),
+            "int of double": (
+                self._converted("int", "amount", "eq", 0),
+                lambda text, amount, flag: compared(
+                    self._int_of_double(amount), lambda v: v == 0
+                ),
+            ),
+            "int of double, far": (
+                self._converted("int", "amount", "gt", 9 * 10**18),
+                lambda text, amount, flag: compared(
+                    self._int_of_double(amount), lambda v: v > 9 * 10**18
+                ),
+            ),
+            "double of string": (
+                self._converted("double", "text", "lt", 1.0),
+                lambda text, amount, flag: compared(
+                    self._double_of_string(text), lambda v: v < 1.0
+                ),
+            ),
+            "string of bool": (
+                self._converted("string", "flag", "eq", "true"),
+                lambda text, amount, flag: compared(flag, lambda v: v),
+            ),
+        }
+
+    @pytest.mark.parametrize(
+        "shape",
+        [
+            "int of string",
+            "int of double",
+            "int of double, far",
+            "double of string",
+            "string of bool",
+        ],
+    )
+    @pytest.mark.parametrize("negate", [False, True])
+    def test_rows_match_cel(self, conversions, shape, negate):
+        table, connection = conversions
+        expression, reference = self._shapes()[shape]
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        query = get_query(
+            _conditional_plan(expression),
+            table,
+            {f"request.resource.attr.{name}": table.c[name] for name in table.c.keys()},
+            cel_functions=True,
+        )
+        expected = [
+            i
+            for i, row in enumerate(self._ROWS)
+            if (outcome := reference(*row)) is not None and outcome != negate
+        ]
+        assert sorted(row.id for row in connection.execute(query)) == expected
+
+    def test_the_conversions_are_refused_without_the_pack(self, conversions):
+        table, _ = conversions
+        attr_map = {"request.resource.attr.text": table.c.text}
+        with pytest.raises(ValueError, match="cannot be lowered to SQL CAST"):
+            get_query(
+                _conditional_plan(self._converted("int", "text", "eq", 100)),
+                table,
+                attr_map,
+            )
+
+    @pytest.mark.parametrize("conversion", ["int", "double"])
+    def test_a_boolean_operand_is_refused(self, conversions, conversion):
+        table, _ = conversions
+        with pytest.raises(ValueError, match="over a boolean is a CEL error"):
+            get_query(
+                _conditional_plan(self._converted(conversion, "flag", "eq", 1)),
+                table,
+                {"request.resource.attr.flag": table.c.flag},
+                cel_functions=True,
+            )
+
+    def test_integer_columns_need_no_function(self):
+        query = get_query(
+            _conditional_plan(self._converted("int", "a_number", "gt", 1)),
+            table("t", column("a_number", Integer)),
+            {"request.resource.attr.a_number": column("a_number", Integer)},
+            cel_functions=True,
+        )
+        assert "cerbos_cel" not in str(query.compile(dialect=postgresql.dialect()))
+
+    def test_postgresql_and_mysql_take_ddl(self):
+        postgresql_ddl = cel_function_ddl(postgresql.dialect())
+        assert [statement.split("(")[0] for statement in postgresql_ddl] == [
+            "CREATE OR REPLACE FUNCTION cerbos_cel_int_of_string",
+            "CREATE OR REPLACE FUNCTION cerbos_cel_int_of_double",
+            "CREATE OR REPLACE FUNCTION cerbos_cel_double_of_string",
+            "CREATE OR REPLACE FUNCTION cerbos_cel_string_of_bool",
+        ]
+        mysql_ddl = cel_function_ddl(mysql.dialect())
+        assert mysql_ddl[0] == "DROP FUNCTION IF EXISTS cerbos_cel_int_of_string"
+        assert len(mysql_ddl) == 8
+        with pytest.raises(ValueError, match="register_cel_functions"):
+            cel_function_ddl(sqlite.dialect())
+
+
+class TestRegexMatches:
+    """``matches`` over the RE2 subset, with RE2's answers spelled out per row."""
+
+    _ROWS = [
+        "hello",
+        "Hello",
+        "a\n",
+        "a",
+        "x\ny",
+        "xzy",
+        "42",
+        "\u0664\u0662",
+        "a$b",
+        None,
+    ]
+
+    @pytest.fixture(params=[False, True], ids=["sqlalchemy regexp", "cached regexp"])
+    def texts(self, request):
+        metadata = MetaData()
+        texts = Table(
+            "texts",
+            metadata,
+            Column("id", Integer, primary_key=True),
+            Column("body", String),
+        )
+        engine = create_engine("sqlite://")
+        if request.param:
+            register_cel_functions(engine)
+        metadata.create_all(engine)
+        with engine.begin() as connection:
+            connection.execute(
+                texts.insert(),
+                [dict(id=i, body=body) for i, body in enumerate(self._ROWS)],
+            )
+        with engine.connect() as connection:
+            yield texts, connection
+
+    @staticmethod
+    def _matches(pattern, negate=False):
+        expression = {
+            "operator": "matches",
+            "operands": [
+                {"variable": "request.resource.attr.body"},
+                {"value": pattern},
+            ],
+        }
+        if negate:
+            expression = {"operator": "not", "operands": [{"expression": expression}]}
+        return _conditional_plan(expression)
+
+    @pytest.mark.parametrize(
+        "pattern,matching",
+        [
+            ("^h", ["hello"]),
+            ("ll", ["hello", "Hello"]),
+            # RE2's `$` is the end of the text, not a final newline.
+            ("^a$", ["a"]),
+            # RE2's `.` stops at a newline.
+            ("x.y", ["xzy"]),
+            # RE2's `\d` is ASCII.
+            (r"^\d+$", ["42"]),
+            (r"a\$b", ["a$b"]),
+            ("^[^a-z]", ["Hello", "42", "\u0664\u0662"]),
+            ("(?:hel|xz)(?:lo|y)$", ["hello", "xzy"]),
+        ],
+    )
+    @pytest.mark.parametrize("negate", [False, True])
+    def test_rows_match_re2(self, texts, pattern, matching, negate):
+        table, connection = texts
+        plan = self._matches(pattern, negate)
+        query = get_query(plan, table, {"request.resource.attr.body": table.c.body})
+        expected = [
+            body
+            for body in self._ROWS
+            if body is not None and (body in matching) != negate
+        ]
+        rows = connection.execute(query.order_by(table.c.id))
+        assert [row.body for row in rows] == expected
+
+    def test_each_dialect_reads_its_own_spelling(self):
+        table_ = table("t", column("body", String))
+        query = get_query(
+            self._matches("a.$"), table_, {"request.resource.attr.body": table_.c.body}
+        )
+        rendered = {
+            dialect.name: (str(compiled), list(compiled.params.values()))
+            for dialect in (postgresql.dialect(), mysql.dialect(), sqlite.dialect())
+            for compiled in [query.compile(dialect=dialect)]
+        }
+        assert rendered["postgresql"][1] == ["a[^\n]$"]
+        assert "(t.body ~ %(param_1)s)" in rendered["postgresql"][0]
+        assert rendered["mysql"][1] == ["a[^\n]\\z"]
+        assert "REGEXP_LIKE(t.body, %s, 'c')" in rendered["mysql"][0]
+        assert rendered["sqlite"][1] == ["a[^\n]\\Z"]
+        assert "(t.body REGEXP ?)" in rendered["sqlite"][0]
+
+    @pytest.mark.parametrize(
+        "pattern",
+        [
+            "(?i)hello",
+            r"\bword",
+            r"\p{L}",
+            r"(a)\1",
+            "[[:alpha:]]",
+            "a{300}",
+            "a|",
+            "a**",
+        ],
+    )
+    def test_patterns_outside_the_portable_subset_are_refused(self, pattern):
+        table_ = table("t", column("body", String))
+        with pytest.raises(ValueError, match="outside the RE2 subset"):
+            get_query(
+                self._matches(pattern),
+                table_,
+                {"request.resource.attr.body": table_.c.body},
+            )
+
+    def test_a_column_pattern_is_refused(self):
+        table_ = table("t", column("body", String), column("pattern", String))
+        plan = _conditional_plan(
+            {
+                "operator": "matches",
+                "operands": [
+                    {"value": "hello"},
+                    {"variable": "request.resource.attr.pattern"},
+                ],
+            }
+        )
+        with pytest.raises(ValueError, match="requires a literal pattern"):
+            get_query(plan, table_, {"request.resource.attr.pattern": table_.c.pattern})
+
+    def test_other_dialects_are_refused_at_compile_time(self):
+        table_ = table("t", column("body", String))
+        query = get_query(
+            self._matches("^h"), table_, {"request.resource.attr.body": table_.c.body}
+        )
+        with pytest.raises(CompileError, match="no lowering for the mssql dialect"):
+            query.compile(dialect=mssql.dialect())
+
+
+class TestGetQueryOverrides:
+    def test_unrelated_override_does_not_bypass_table_mapping_validation(
+        self, resource_table, user_table
+    ):
+        plan = _conditional_plan(
+            {
+                "operator": "eq",
+                "operands": [
+                    {"variable": "request.resource.attr.externalOwner"},
+                    {"value": 1},
+                ],
+            }
+        )
+
+        with pytest.raises(TypeError, match="table_mapping"):
+            get_query(
+                plan,
+                resource_table,
+                {"request.resource.attr.externalOwner": user_table.id},
+                operator_override_fns={"size": lambda *_: literal(0)},
+            )
+
+    def test_used_override_owns_foreign_operand_without_flat_mapping(
+        self, resource_table, user_table, conn
+    ):
+        plan = _conditional_plan(
+            {
+                "operator": "eq",
+                "operands": [
+                    {"variable": "request.resource.attr.externalOwner"},
+                    {"value": 1},
+                ],
+            }
+        )
+        query = get_query(
+            plan,
+            resource_table,
+            {"request.resource.attr.externalOwner": user_table.id},
+            operator_override_fns={
+                # The override deliberately consumes the foreign marker and
+                # rewrites it to a predicate on the root table.
+                "eq": lambda _column, value: resource_table.ownedBy
+                == str(value)
+            },
+        )
+
+        assert {row.name for row in conn.execute(query)} == {
+            "resource1",
+            "resource2",
+        }
+
+    def test_in_single_query(self, resource_table, conn):
+        plan_resources_filter = PlanResourcesFilter.from_dict(
+            {
+                "kind": PlanResourcesFilterKind.CONDITIONAL,
+                "condition": {
+                    "expression": {
+                        "operator": "in",
+                        "operands": [
+                            {"variable": "request.resource.attr.name"},
+                            {"value": "resource1"},
+                        ],
+                    },
+                },
+            }
+        )
+        plan_resource_resp = PlanResourcesResponse(
+            filter=plan_resources_filter,
+            **_default_resp_params(),
+        )
+        attr = {
+            "request.resource.attr.name": resource_table.name,
+        }
+        query = get_query(plan_resource_resp, resource_table, attr)
+        res = conn.execute(query).fetchall()
+        assert len(res) == 1
+        assert res[0].name == "resource1"
+
+    def test_in_multiple_query(self, resource_table, conn):
+        plan_resources_filter = PlanResourcesFilter.from_dict(
+            {
+                "kind": PlanResourcesFilterKind.CONDITIONAL,
+                "condition": {
+                    "expression": {
+                        "operator": "in",
+                        "operands": [
+                            {"variable": "request.resource.attr.name"},
+                            {"value": ["resource1", "resource2"]},
+                        ],
+                    },
+                },
+            }
+        )
+        plan_resource_resp = PlanResourcesResponse(
+            filter=plan_resources_filter,
+            **_default_resp_params(),
+        )
+        attr = {
+            "request.resource.attr.name": resource_table.name,
+        }
+        query = get_query(plan_resource_resp, resource_table, attr)
+        res = conn.execute(query).fetchall()
+        assert len(res) == 2
+        assert all(map(lambda x: x.name in {"resource1", "resource2"}, res))
+
+    def test_unrecognised_response_attribute(self, resource_table):
+        unknown_attribute = "request.resource.attr.foo"
+        plan_resources_filter = PlanResourcesFilter.from_dict(
+            {
+                "kind": PlanResourcesFilterKind.CONDITIONAL,
+                "condition": {
+                    "expression": {
+                        "operator": "eq",
+                        "operands": [
+                            {"variable": unknown_attribute},
+                            {"value": 1},
+                        ],
+                    },
+                },
+            }
+        )
+        plan_resource_resp = PlanResourcesResponse(
+            filter=plan_resources_filter,
+            **_default_resp_params(),
+        )
+        attr = {
+            "request.resource.attr.ownedBy": resource_table.ownedBy,
+        }
+        with pytest.raises(KeyError) as exc_info:
+            get_query(plan_resource_resp, resource_table, attr)
+        assert (
+            exc_info.value.args[0]
+            == f"Attribute does not exist in the attribute column map: {unknown_attribute}"
+        )
+
+    def test_unrecognised_filter(self, resource_table):
+        unknown_op = "unknown"
+        plan_resources_filter = PlanResourcesFilter.from_dict(
+            {
+                "kind": PlanResourcesFilterKind.CONDITIONAL,
+                "condition": {
+                    "expression": {
+                        "operator": unknown_op,
+                        "operands": [
+                            {"variable": "request.resource.attr.ownedBy"},
+                            {"value": "1"},
+                        ],
+                    },
+                },
+            }
+        )
+        plan_resource_resp = PlanResourcesResponse(
+            filter=plan_resources_filter,
+            **_default_resp_params(),
+        )
+        attr = {
+            "request.resource.attr.ownedBy": resource_table.ownedBy,
+        }
+        with pytest.raises(ValueError) as exc_info:
+            get_query(plan_resource_resp, resource_table, attr)
+        assert exc_info.value.args[0] == f"Unrecognised operator: {unknown_op}"
+
+    def test_in_equals_override(self, resource_table, conn):
+        plan_resources_filter = PlanResourcesFilter.from_dict(
             {
                 "kind": PlanResourcesFilterKind.CONDITIONAL,
                 "condition": {
@@ -960,6 +2644,266 @@ class TestKnownValueCollections:
         )
         assert sorted(row.name for row in conn.execute(query)) == ["resource2"]
 
+    def test_element_templated_equality_lowers_to_one_set_predicate(
+        self, resource_table, conn
+    ):
+        attr = {"request.resource.attr.aString": resource_table.aString}
+        exists_query = get_query(
+            self._value_list_plan(
+                "exists", ["string", "anotherString"], self._eq_body()
+            ),
+            resource_table,
+            attr,
+        )
+        compiled = str(exists_query.compile())
+        assert " IN " in compiled and " OR " not in compiled
+
+        all_query = get_query(
+            self._value_list_plan(
+                "all",
+                ["string", "anotherString"],
+                {
+                    "expression": {
+                        "operator": "ne",
+                        # Value-first: the element on the left still reads as membership.
+                        "operands": [
+                            {"variable": "t"},
+                            {"variable": "request.resource.attr.aString"},
+                        ],
+                    }
+                },
+            ),
+            resource_table,
+            attr,
+        )
+        compiled = str(all_query.compile())
+        assert " NOT IN " in compiled and " AND " not in compiled
+        assert [row.name for row in conn.execute(all_query)] == ["resource2"]
+
+    def test_a_null_element_keeps_the_is_null_disjunct_of_the_unrolled_chain(
+        self, resource_table
+    ):
+        query = get_query(
+            self._value_list_plan("exists", ["string", None], self._eq_body()),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+        )
+        compiled = str(query.compile())
+        assert " IN (" in compiled and " IS NULL" in compiled
+
+    def test_an_overridden_comparison_keeps_the_unrolled_chain(self, resource_table):
+        # The chain would dispatch every element to the override, so a set predicate
+        # built from the default `in` would silently discard it.
+        query = get_query(
+            self._value_list_plan(
+                "exists", ["string", "anotherString"], self._eq_body()
+            ),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+            operator_override_fns={"eq": lambda c, v: c.like(v)},
+        )
+        compiled = str(query.compile())
+        assert " IN " not in compiled and compiled.count(" LIKE ") == 2
+
+    @staticmethod
+    def _ordered_body(operator, *, value_first=False):
+        operands = [{"variable": "request.resource.attr.aNumber"}, {"variable": "t"}]
+        return {
+            "expression": {
+                "operator": operator,
+                "operands": operands[::-1] if value_first else operands,
+            }
+        }
+
+    @pytest.mark.parametrize(
+        "operator,comparison,value_first,bound,expected",
+        [
+            ("exists", "gt", False, 2, ["resource3"]),
+            # `t > aNumber`: some element exceeds it, so it is below the greatest.
+            ("exists", "gt", True, 5, ["resource1", "resource2", "resource3"]),
+            ("all", "gt", False, 5, []),
+            ("all", "le", False, 2, ["resource1", "resource2"]),
+            ("exists", "ge", False, 2, ["resource2", "resource3"]),
+        ],
+    )
+    def test_ordered_comparison_reduces_to_the_tightest_bound(
+        self, resource_table, conn, operator, comparison, value_first, bound, expected
+    ):
+        query = get_query(
+            self._value_list_plan(
+                operator,
+                [5, 2, 3.5],
+                self._ordered_body(comparison, value_first=value_first),
+            ),
+            resource_table,
+            {"request.resource.attr.aNumber": resource_table.aNumber},
+        )
+        compiled = query.compile()
+        assert list(compiled.params.values()) == [bound]
+        assert " OR " not in str(compiled) and " AND " not in str(compiled)
+        assert sorted(row.name for row in conn.execute(query)) == expected
+
+    @pytest.mark.parametrize("elements", [[1, math.nan], [1, "2"]])
+    def test_a_list_with_no_sound_bound_keeps_the_full_fold(
+        self, resource_table, elements
+    ):
+        query = get_query(
+            self._value_list_plan("exists", elements, self._ordered_body("gt")),
+            resource_table,
+            {"request.resource.attr.aNumber": resource_table.aNumber},
+        )
+        assert str(query.compile()).count(" OR ") == 1
+
+    def test_timestamp_elements_reduce_to_the_tightest_instant(self):
+        temporal_table = table("events", column("created_at", DateTime(timezone=True)))
+
+        def timestamp(operand):
+            return {"expression": {"operator": "timestamp", "operands": [operand]}}
+
+        plan = self._value_list_plan(
+            "all",
+            ["2024-06-01T00:00:00Z", "2024-01-01T00:00:00+02:00"],
+            {
+                "expression": {
+                    "operator": "lt",
+                    "operands": [
+                        timestamp({"variable": "request.resource.attr.createdAt"}),
+                        timestamp({"variable": "t"}),
+                    ],
+                }
+            },
+        )
+        query = get_query(
+            plan,
+            temporal_table,
+            {"request.resource.attr.createdAt": temporal_table.c.created_at},
+        )
+        compiled = query.compile()
+        assert str(compiled).endswith("WHERE events.created_at < :created_at_1")
+        assert list(compiled.params.values()) == [
+            datetime(2023, 12, 31, 22, 0, tzinfo=timezone.utc)
+        ]
+
+    @staticmethod
+    def _field_junction_body(junction, comparison):
+        return {
+            "expression": {
+                "operator": junction,
+                "operands": [
+                    {
+                        "expression": {
+                            "operator": comparison,
+                            "operands": [
+                                {"variable": f"request.resource.attr.{attribute}"},
+                                {"variable": f"t.{field}"},
+                            ],
+                        }
+                    }
+                    for attribute, field in (("aString", "name"), ("aNumber", "rank"))
+                ],
+            }
+        }
+
+    @pytest.mark.parametrize(
+        "operator,junction,comparison,expected",
+        [
+            ("exists", "and", "eq", ["resource1", "resource3"]),
+            ("all", "or", "ne", ["resource2"]),
+        ],
+    )
+    def test_field_equality_conjunction_lowers_to_a_row_value_set(
+        self, resource_table, conn, operator, junction, comparison, expected
+    ):
+        grants = [
+            {"name": "string", "rank": 1},
+            {"name": "anotherString", "rank": 3},
+            # Each field matches some row, but never the same one.
+            {"name": "amIAString?", "rank": 1},
+        ]
+        query = get_query(
+            self._value_list_plan(
+                operator, grants, self._field_junction_body(junction, comparison)
+            ),
+            resource_table,
+            {
+                "request.resource.attr.aString": resource_table.aString,
+                "request.resource.attr.aNumber": resource_table.aNumber,
+            },
+        )
+        compiled = str(query.compile())
+        assert '(resource."aString", resource."aNumber") ' in compiled
+        assert " OR " not in compiled
+        assert sorted(row.name for row in conn.execute(query)) == expected
+        # SQL Server has no row values, so it still receives the unrolled chain.
+        on_mssql = str(query.compile(dialect=mssql.dialect()))
+        assert " OR " in on_mssql and " IN (" not in on_mssql
+
+    def test_a_null_field_keeps_the_unrolled_conjunctions(self, resource_table, conn):
+        query = get_query(
+            self._value_list_plan(
+                "exists",
+                [{"name": "string", "rank": 1}, {"name": "nope", "rank": None}],
+                self._field_junction_body("and", "eq"),
+            ),
+            resource_table,
+            {
+                "request.resource.attr.aString": resource_table.aString,
+                "request.resource.attr.aNumber": resource_table.aNumber,
+            },
+        )
+        compiled = str(query.compile())
+        assert " OR " in compiled and " IS NULL" in compiled
+        assert [row.name for row in conn.execute(query)] == ["resource1"]
+
+    @pytest.mark.parametrize(
+        "operator,match,needles,matches,expected",
+        [
+            (
+                "exists",
+                "startsWith",
+                ["another", "a", "an", "s", "a"],
+                2,
+                ["resource1", "resource2", "resource3"],
+            ),
+            (
+                "all",
+                "contains",
+                ["Str", "otherStr", "ther"],
+                1,
+                ["resource3"],
+            ),
+            (
+                "exists",
+                "endsWith",
+                ["ring", "String", "?"],
+                2,
+                ["resource1", "resource2", "resource3"],
+            ),
+        ],
+    )
+    def test_redundant_needles_are_dropped_before_the_fold(
+        self, resource_table, conn, operator, match, needles, matches, expected
+    ):
+        query = get_query(
+            self._value_list_plan(
+                operator,
+                needles,
+                {
+                    "expression": {
+                        "operator": match,
+                        "operands": [
+                            {"variable": "request.resource.attr.aString"},
+                            {"variable": "t"},
+                        ],
+                    }
+                },
+            ),
+            resource_table,
+            {"request.resource.attr.aString": resource_table.aString},
+        )
+        assert str(query.compile()).count(" LIKE ") == matches
+        assert sorted(row.name for row in conn.execute(query)) == expected
+
     def test_variable_path_drills_into_element_fields(self, resource_table, conn):
         plan = self._value_list_plan(
             "exists",
@@ -1000,8 +2944,8 @@ class TestKnownValueCollections:
     def test_nested_lambda_rebinding_the_variable_shadows_substitution(
         self, resource_table
     ):
-        # The inner lambda rebinds `t`, so its body must keep referencing the
-        # inner binding; only the inner collection operand is substituted.
+        # The inner lambda rebinds `t`, so its body must see the inner binding;
+        # only the inner collection operand reads the outer one.
         plan = self._value_list_plan(
             "exists",
             [["a"], ["b"]],
@@ -1043,6 +2987,60 @@ class TestKnownValueCollections:
         compiled = str(query.compile(compile_kwargs={"literal_binds": True}))
         assert "'a'" in compiled and "'b'" in compiled
 
+    def test_an_inner_body_reads_the_outer_binding(self, resource_table, conn):
+        def eq(attribute, variable):
+            return {
+                "expression": {
+                    "operator": "eq",
+                    "operands": [
+                        {"variable": f"request.resource.attr.{attribute}"},
+                        {"variable": variable},
+                    ],
+                }
+            }
+
+        plan = self._value_list_plan(
+            "exists",
+            [
+                {"names": ["string", "nope"], "rank": 1},
+                {"names": ["anotherString"], "rank": 2},
+            ],
+            {
+                "expression": {
+                    "operator": "exists",
+                    "operands": [
+                        {"variable": "t.names"},
+                        {
+                            "expression": {
+                                "operator": "lambda",
+                                "operands": [
+                                    {
+                                        "expression": {
+                                            "operator": "and",
+                                            "operands": [
+                                                eq("aString", "u"),
+                                                eq("aNumber", "t.rank"),
+                                            ],
+                                        }
+                                    },
+                                    {"variable": "u"},
+                                ],
+                            }
+                        },
+                    ],
+                }
+            },
+        )
+        query = get_query(
+            plan,
+            resource_table,
+            {
+                "request.resource.attr.aString": resource_table.aString,
+                "request.resource.attr.aNumber": resource_table.aNumber,
+            },
+        )
+        assert [row.name for row in conn.execute(query)] == ["resource1"]
+
     def test_missing_element_field_fails_closed(self, resource_table):
         plan = self._value_list_plan(
             "exists",
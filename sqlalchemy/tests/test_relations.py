@@ -1,14 +1,36 @@
-"""Unit tests for the mapping helpers a caller wires into ``operator_override_fns``.
+"""Unit tests for the relation model and the mapping helpers around it.
 
-The adversarial harness is the semantic proof of ``require_hops`` — every chained
-corpus action is an oracle comparison against a real PDP that routes through it.
-These pin the two structural properties that proof depends on and that a refactor
-could quietly break: the guard is a ``CASE`` with no ``ELSE``, and a direct relation
-gets no guard at all.
+The adversarial harness is the semantic proof of both -- every collection action in
+the corpus is an oracle comparison against a real PDP, over ``Relation``s derived
+with ``from_relationship``. These run the same macros over a small schema whose
+element rows include NULLs and whose owners include one with no to-one hop row,
+against a reference written from CEL's own rules, and pin the structural properties
+the proof depends on and that a refactor could quietly break: the ``require_hops``
+guard is a ``CASE`` with no ``ELSE``, and a direct relation gets no guard at all.
 """
 
-from cerbos_sqlalchemy import require_hops
-from sqlalchemy import Column, Integer, MetaData, String, Table, literal, select
+import pytest
+from cerbos.sdk.model import (
+    PlanResourcesFilter,
+    PlanResourcesFilterKind,
+    PlanResourcesResponse,
+)
+
+from cerbos_sqlalchemy import Relation, get_query, require_hops
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy.dialects import mssql, sqlite
+from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql.elements import Case
 
 _metadata = MetaData()
@@ -88,3 +110,392 @@ def test_correlate_targets_keep_the_outer_entity_out_of_the_inner_from():
     assert "FROM hazard_category \n" in correlated or correlated.endswith(
         "FROM hazard_category"
     )
+
+
+# -- the relation model, over mapped relationships --
+
+Base = declarative_base()
+
+owner_label = Table(
+    "relation_owner_label",
+    Base.metadata,
+    Column("owner_id", ForeignKey("relation_owner.id"), primary_key=True),
+    Column("label_id", ForeignKey("relation_label.id"), primary_key=True),
+)
+
+
+class Owner(Base):
+    __tablename__ = "relation_owner"
+    id = Column(Integer, primary_key=True)
+    favourite = Column(String)
+    items = relationship("Item")
+    profile = relationship("Profile", uselist=False)
+    labels = relationship("Label", secondary=owner_label)
+
+
+class Item(Base):
+    __tablename__ = "relation_item"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(ForeignKey("relation_owner.id"), nullable=False)
+    name = Column(String)
+    rank = Column(Integer, nullable=False)
+
+
+class Profile(Base):
+    __tablename__ = "relation_profile"
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(ForeignKey("relation_owner.id"), nullable=False)
+    badges = relationship("Badge")
+    owner = relationship("Owner", viewonly=True)
+
+
+class Badge(Base):
+    __tablename__ = "relation_badge"
+    id = Column(Integer, primary_key=True)
+    profile_id = Column(ForeignKey("relation_profile.id"), nullable=False)
+    name = Column(String)
+
+
+class Label(Base):
+    __tablename__ = "relation_label"
+    id = Column(Integer, primary_key=True)
+    name = Column(String)
+    owners = relationship("Owner", secondary=owner_label, viewonly=True)
+
+
+# Each owner's items as (name, rank); None is a NULL name, which the caller sends to
+# check() as a missing element attribute, so any body reading it raises.
+ITEMS = {
+    1: [],
+    2: [("a", 1)],
+    3: [("a", 2), ("b", 3)],
+    4: [(None, 1), ("a", 2)],
+    5: [(None, 2), ("b", 1)],
+    6: [("a", 1), ("a", 2), ("a", 3)],
+}
+# Owner 1 has no profile row: its badges are unreachable, not empty.
+BADGES = {2: [], 3: ["gold"], 4: ["gold", None], 5: [None], 6: ["silver"]}
+# None is a NULL column: a missing attribute unless declared explicit.
+FAVOURITES = {1: None, 2: "a", 3: "z", 4: None, 5: "b", 6: None}
+LABELS = {1: [], 2: ["x"], 3: ["x", "y"], 4: [None], 5: ["y", None], 6: []}
+
+ATTR_MAP = {
+    "request.resource.attr.items": Relation.from_relationship(Owner.items),
+    "request.resource.attr.badges": Relation.from_relationship(
+        Owner.profile, Profile.badges
+    ),
+    "request.resource.attr.favourite": Owner.favourite,
+    "request.resource.attr.itemNames": Relation.from_relationship(
+        Owner.items, member=Item.name
+    ),
+    "request.resource.attr.labelNames": Relation.from_relationship(
+        Owner.labels, member=Label.name
+    ),
+    "i.name": Item.name,
+    "i.rank": Item.rank,
+    "b.name": Badge.name,
+}
+
+
+@pytest.fixture(scope="module")
+def owners():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    labels = sorted({n for names in LABELS.values() for n in names}, key=str)
+    label_ids = {name: i for i, name in enumerate(labels)}
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Owner), [{"id": o, "favourite": FAVOURITES[o]} for o in ITEMS]
+        )
+        connection.execute(
+            insert(Item),
+            [
+                {"owner_id": o, "name": name, "rank": rank}
+                for o, items in ITEMS.items()
+                for name, rank in items
+            ],
+        )
+        connection.execute(insert(Profile), [{"id": o, "owner_id": o} for o in BADGES])
+        connection.execute(
+            insert(Badge),
+            [
+                {"profile_id": o, "name": n}
+                for o, names in BADGES.items()
+                for n in names
+            ],
+        )
+        connection.execute(
+            insert(Label), [{"id": i, "name": n} for n, i in label_ids.items()]
+        )
+        connection.execute(
+            insert(owner_label),
+            [
+                {"owner_id": o, "label_id": label_ids[n]}
+                for o, names in LABELS.items()
+                for n in names
+            ],
+        )
+    with engine.connect() as connection:
+        yield connection
+
+
+def _plan(expression):
+    return PlanResourcesResponse(
+        filter=PlanResourcesFilter.from_dict(
+            {
+                "kind": PlanResourcesFilterKind.CONDITIONAL,
+                "condition": {"expression": expression},
+            }
+        ),
+        request_id="1",
+        action="action",
+        resource_kind="owner",
+        policy_version="default",
+    )
+
+
+def _call(operator, *operands):
+    return {"expression": {"operator": operator, "operands": list(operands)}}
+
+
+def _attr(name):
+    return {"variable": f"request.resource.attr.{name}"}
+
+
+def _macro(operator, collection, variable, body):
+    return _call(
+        operator, _attr(collection), _call("lambda", body, {"variable": variable})
+    )
+
+
+def _allowed(connection, expression, **options):
+    query = get_query(_plan(expression["expression"]), Owner, ATTR_MAP, **options)
+    return {row.id for row in connection.execute(query)}
+
+
+# CEL over a list: a body is True, False, or an error (None here). exists() and
+# all() are decided by a witness even past an error; exists_one() is not.
+def _exists(results):
+    return True if True in results else None if None in results else False
+
+
+def _all(results):
+    return False if False in results else None if None in results else True
+
+
+def _exists_one(results):
+    return None if None in results else results.count(True) == 1
+
+
+_REFERENCE = {"exists": _exists, "all": _all, "exists_one": _exists_one}
+
+
+def _granted(results, negated):
+    """The owners a condition allows: an error denies under either polarity."""
+    return {
+        owner
+        for owner, result in results.items()
+        if result is not None and result != negated
+    }
+
+
+@pytest.mark.parametrize("lowering", ["probe", "aggregate"])
+@pytest.mark.parametrize("negated", [False, True])
+@pytest.mark.parametrize("macro", sorted(_REFERENCE))
+@pytest.mark.parametrize(
+    "body, reference",
+    [
+        (
+            _call("eq", {"variable": "i.name"}, {"value": "a"}),
+            lambda name, _: None if name is None else name == "a",
+        ),
+        (
+            _call("gt", {"variable": "i.rank"}, {"value": 1}),
+            lambda _, rank: rank > 1,
+        ),
+    ],
+    ids=["nullable-body", "never-null-body"],
+)
+def test_macros_match_cel_over_nullable_elements(
+    owners, macro, negated, body, reference, lowering
+):
+    expression = _macro(macro, "items", "i", body)
+    if negated:
+        expression = _call("not", expression)
+    results = {
+        owner: _REFERENCE[macro]([reference(*item) for item in items])
+        for owner, items in ITEMS.items()
+    }
+    allowed = _allowed(owners, expression, collection_macro_lowering=lowering)
+    assert allowed == _granted(results, negated)
+
+
+def test_a_body_that_cannot_be_null_needs_no_error_guard():
+    # rank is NOT NULL, so the body is never UNKNOWN and exists() is one EXISTS:
+    # no CASE looking for an erroring element, and nothing for the planner to scan.
+    never_null = _macro(
+        "exists", "items", "i", _call("gt", {"variable": "i.rank"}, {"value": 1})
+    )
+    nullable = _macro(
+        "exists", "items", "i", _call("eq", {"variable": "i.name"}, {"value": "a"})
+    )
+    assert "CASE" not in _sql(
+        get_query(_plan(never_null["expression"]), Owner, ATTR_MAP)
+    )
+    assert "CASE" in _sql(get_query(_plan(nullable["expression"]), Owner, ATTR_MAP))
+
+
+@pytest.mark.parametrize("macro", ["exists", "all"])
+def test_the_aggregate_lowering_reads_the_elements_once(macro):
+    # The probes read the element table twice, once for a witness and once for an
+    # erroring element; the aggregate grades every row in a single scan.
+    expression = _macro(
+        macro, "items", "i", _call("eq", {"variable": "i.name"}, {"value": "a"})
+    )
+    plan = _plan(expression["expression"])
+    probed = _sql(get_query(plan, Owner, ATTR_MAP))
+    scanned = _sql(
+        get_query(plan, Owner, ATTR_MAP, collection_macro_lowering="aggregate")
+    )
+    assert probed.count("FROM relation_item") == 2
+    assert scanned.count("FROM relation_item") == 1
+    assert "EXISTS" not in scanned
+    assert "max(CASE WHEN" in scanned
+
+
+def test_an_unknown_collection_macro_lowering_is_refused():
+    expression = _macro("exists", "items", "i", {"variable": "i.name"})
+    with pytest.raises(ValueError, match="collection_macro_lowering must be"):
+        get_query(
+            _plan(expression["expression"]),
+            Owner,
+            ATTR_MAP,
+            collection_macro_lowering="scan",
+        )
+
+
+@pytest.mark.parametrize("operator", ["eq", "ne", "gt", "ge", "lt", "le"])
+@pytest.mark.parametrize("value", [-1, 0, 1, 1.5, 2, 3])
+def test_size_comparisons_probe_for_the_deciding_row(owners, operator, value):
+    compare = {
+        "eq": lambda n: n == value,
+        "ne": lambda n: n != value,
+        "gt": lambda n: n > value,
+        "ge": lambda n: n >= value,
+        "lt": lambda n: n < value,
+        "le": lambda n: n <= value,
+    }[operator]
+    expression = _call(operator, _call("size", _attr("items")), {"value": value})
+    query = get_query(_plan(expression["expression"]), Owner, ATTR_MAP)
+    assert "count(" not in _sql(query)
+    assert _allowed(owners, expression) == {
+        owner for owner, items in ITEMS.items() if compare(len(items))
+    }
+
+
+@pytest.mark.parametrize("operator", ["eq", "ne", "gt", "ge", "lt", "le"])
+def test_a_probe_past_the_first_row_compiles_on_sql_server(operator):
+    # SQL Server refuses an OFFSET with no ORDER BY; elsewhere none is added.
+    expression = _call(operator, _call("size", _attr("items")), {"value": 2})
+    query = get_query(_plan(expression["expression"]), Owner, ATTR_MAP)
+    assert "ORDER BY (SELECT NULL)" in str(query.compile(dialect=mssql.dialect()))
+    assert "ORDER BY" not in str(query.compile(dialect=sqlite.dialect()))
+
+
+def test_size_of_a_filtered_relation(owners):
+    filtered = _call(
+        "filter",
+        _attr("items"),
+        _call(
+            "lambda",
+            _call("gt", {"variable": "i.rank"}, {"value": 1}),
+            {"variable": "i"},
+        ),
+    )
+    expression = _call("ge", _call("size", filtered), {"value": 2})
+    assert _allowed(owners, expression) == {3, 6}
+
+
+@pytest.mark.parametrize("lowering", ["probe", "aggregate"])
+@pytest.mark.parametrize("negated", [False, True])
+def test_an_absent_hop_denies_under_both_polarities(owners, negated, lowering):
+    # Owner 1 has no profile: CEL cannot read profile.badges at all, so neither the
+    # condition nor its negation may allow it. Owner 2's profile has no badges,
+    # which is an ordinary empty list.
+    expression = _macro(
+        "exists", "badges", "b", _call("eq", {"variable": "b.name"}, {"value": "gold"})
+    )
+    if negated:
+        expression = _call("not", expression)
+    results = {
+        owner: _exists([None if n is None else n == "gold" for n in names])
+        for owner, names in BADGES.items()
+    }
+    allowed = _allowed(owners, expression, collection_macro_lowering=lowering)
+    assert allowed == _granted(results, negated)
+
+
+def test_membership_reads_the_member_column_through_an_association(owners):
+    # CEL compares a string with a null element as unequal rather than raising.
+    inside = _call("in", {"value": "x"}, _attr("labelNames"))
+    assert _allowed(owners, inside) == {2, 3}
+    crossing = _call("hasIntersection", _attr("labelNames"), {"value": ["y", "z"]})
+    assert _allowed(owners, crossing) == {3, 5}
+
+
+@pytest.mark.parametrize(
+    "representation, allowed, denied",
+    [
+        # A NULL favourite is a missing attribute, so CEL raises under both
+        # polarities; a NULL item name is a null element, which "b" is not.
+        (None, {2, 5}, {3}),
+        # Declared explicit, a NULL favourite is a null value, found only in a
+        # list holding a null element.
+        ("explicit", {2, 4, 5}, {1, 3, 6}),
+    ],
+)
+def test_a_column_in_a_relation_follows_the_null_convention(
+    owners, representation, allowed, denied
+):
+    inside = _call("in", _attr("favourite"), _attr("itemNames"))
+    options = {}
+    if representation is not None:
+        options["attribute_null_representation"] = {
+            "request.resource.attr.favourite": representation
+        }
+    assert _allowed(owners, inside, **options) == allowed
+    assert _allowed(owners, _call("not", inside), **options) == denied
+
+
+def test_a_relation_without_a_member_column_is_not_a_list_of_scalars(owners):
+    with pytest.raises(ValueError, match="needs a Relation with a member column"):
+        _allowed(owners, _call("in", {"value": "a"}, _attr("items")))
+
+
+@pytest.mark.parametrize(
+    "path, message",
+    [
+        ((), "needs a relationship"),
+        ((Item.name,), "is not a relationship"),
+        ((Owner.items, Profile.badges), "Owner.items must be to-one"),
+        ((Owner.profile,), "must be a collection"),
+        ((Owner.profile, Label.owners), "does not continue the chain"),
+        (
+            (Owner.profile, Profile.owner, Owner.items),
+            "Profile.owner reads a table the chain already reads",
+        ),
+    ],
+)
+def test_from_relationship_refuses_a_path_cel_cannot_read(path, message):
+    with pytest.raises(ValueError, match=message):
+        Relation.from_relationship(*path)
+
+
+def test_from_relationship_guards_only_the_to_one_hops():
+    direct = Relation.from_relationship(Owner.items)
+    chained = Relation.from_relationship(Owner.profile, Profile.badges)
+    assert list(direct.hops) == []
+    assert list(chained.tables) == [Profile.__table__, Badge.__table__]
+    assert [str(p) for p in chained.hops] == [
+        "relation_owner.id = relation_profile.owner_id"
+    ]
@@ -66,10 +66,13 @@ from corpus import (
     GOLDEN_SQLALCHEMY_MAJOR,
     INSTALLED_SQLALCHEMY_MAJOR,
     OPERATOR_OVERRIDES,
+    OVERRIDE_ACTIONS,
+    OVERRIDE_ATTR_MAP,
     AdvResource,
     AdvTag,
     classify_actions_for_adapter,
     declared_columns,
+    dialect,
     grpc_plan_from_wire_fixture,
     json_parameter,
     null_representation_throws,
@@ -115,7 +118,7 @@ def translate(
     *,
     planned_at=None,
     attr_map=None,
-    operator_override_fns=OPERATOR_OVERRIDES,
+    operator_override_fns=None,
     null_attribute_representation="explicit",
     attribute_null_representation=ATTRIBUTE_NULL_REPRESENTATION,
     plan=None,
@@ -331,7 +334,7 @@ class TestCorpusShapes:
             "conditional": len(CONDITIONAL_ACTIONS),
             "unconditional": len(UNCONDITIONAL_ACTIONS),
             "throwing": len(THROWING_ACTIONS),
-        } == {"conditional": 179, "unconditional": 1, "throwing": 19}
+        } == {"conditional": 180, "unconditional": 1, "throwing": 18}
 
     def test_the_asset_declares_the_compiler_that_wrote_it(self):
         # The asset is one compiler's rendering of the adapter's expression trees, and the two
@@ -546,11 +549,14 @@ def _from_clauses_naming_the_resource(statement):
 
     A FROM list is one or more bare table names, comma-separated — which is exactly how an
     uncorrelated subquery pulls the outer table in. Matching the list rather than the string
-    ``FROM adversarial_resource`` is what makes the difference visible.
+    ``FROM adversarial_resource`` is what makes the difference visible. PostgreSQL's
+    ``IS [NOT] DISTINCT FROM`` is an operator, not a FROM list.
     """
     return sum(
         "adversarial_resource" in clause.split(", ")
-        for clause in re.findall(r"FROM ([a-z_]+(?:, [a-z_]+)*)", statement)
+        for clause in re.findall(
+            r"(?<!DISTINCT )FROM ([a-z_]+(?:, [a-z_]+)*)", statement
+        )
     )
 
 
@@ -649,6 +655,28 @@ class TestOperatorOverrides:
         assert " IN " in emitted(None)
         assert "= ANY (" in emitted({"in": lambda c, v: c == any_(v)})
 
+    def test_the_corpus_overrides_replace_the_relation_lowering(self):
+        # The harness proves OVERRIDE_ACTIONS against the PDP through OPERATOR_OVERRIDES;
+        # this is the half that needs no PDP: the overrides, not the `Relation`, write the
+        # filter, and each answer sits inside the hop guard `require_hops` adds.
+        guard = (
+            "CASE WHEN (EXISTS (SELECT ? AS anon_1 FROM adversarial_category WHERE "
+            "adversarial_category.resource_id = adversarial_resource.id)) THEN CASE WHEN "
+        )
+        for action in OVERRIDE_ACTIONS:
+            statement = where_clause(
+                render(
+                    translate(
+                        action,
+                        attr_map=OVERRIDE_ATTR_MAP,
+                        operator_override_fns=OPERATOR_OVERRIDES,
+                    ),
+                    "sqlite",
+                )[0]
+            )
+            assert statement != where_clause(render(translate(action), "sqlite")[0])
+            assert guard in statement
+
     def test_an_unmapped_attribute_is_refused_rather_than_dropped(self):
         # Dropping it would emit a filter that answers a different question from the policy.
         with pytest.raises(KeyError, match="Attribute does not exist"):
@@ -657,25 +685,26 @@ class TestOperatorOverrides:
     # The two tests below are the coverage the retired suite had that the corpus genuinely
     # cannot carry, and the distinction is worth stating once. `actions.json` classifies a
     # shape against ONE mapping — the corpus's — so "unsupported" there means "this adapter
-    # refuses it with these overrides", not "no caller can translate it". Both shapes are
-    # documented in the README as caller-supplied, so an assertion that the documented
-    # override actually works is not a corpus question. Each asserts BOTH halves: the refusal
-    # the corpus pins, and the translation the declaration buys.
-
-    def test_a_matches_override_admits_the_regex_the_corpus_refuses(self):
-        # `p-matches` is `expectedUnsupported` because SQL dialect regex engines do not
-        # guarantee CEL/RE2 semantics, so the adapter has no default lowering. An application
-        # whose database translation is known to be equivalent may supply one — the README
-        # says so — and this is what says that path still works.
+    # refuses it with these overrides", not "no caller can translate it", and "supported"
+    # says nothing of a caller's own lowering. Both shapes are documented in the README as
+    # caller-overridable, so an assertion that the documented override actually works is not
+    # a corpus question. Each asserts BOTH halves: what the corpus pins, and what the
+    # declaration changes.
+
+    def test_a_matches_override_replaces_the_default_lowering(self):
+        # `p-matches` has a default lowering over the RE2 subset every engine reads alike,
+        # pinned by its golden expectation. An application whose database reads more of RE2
+        # may supply its own — the README says so — and this is what says it still wins.
         action = "p-matches"
-        with pytest.raises(ValueError, match="Unrecognised operator: matches"):
-            translate(action)
+        assert (
+            "adversarial_resource.a_string ~ %(param_1)s"
+            in render(translate(action), "postgresql")[0]
+        )
 
         statement, params = render(
             translate(
                 action,
                 operator_override_fns={
-                    **OPERATOR_OVERRIDES,
                     "matches": lambda column, pattern: column.regexp_match(pattern),
                 },
             ),
@@ -792,11 +821,21 @@ class TestTransportDecoding:
 
     @pytest.mark.parametrize("action", AGREEING)
     def test_the_protobuf_decoding_emits_the_same_sql(self, action):
+        # Compared by position rather than by parameter name: JSON decodes a whole
+        # number as an int, which binds as an Integer, and a protobuf double as a
+        # Float, and binds of different types are never shared. A literal that both
+        # spell `0` can therefore take one parameter in one decoding and two in the
+        # other while every placeholder still receives the same value.
         def build(plan):
             try:
-                return render(translate(action, plan=plan), "sqlite")
+                compiled = translate(action, plan=plan).compile(
+                    dialect=dialect("sqlite"),
+                    compile_kwargs={"render_postcompile": True},
+                )
             except (ValueError, KeyError, TypeError) as exc:
                 return f"{type(exc).__name__}: {exc}"
+            values = [compiled.params[name] for name in compiled.positiontup]
+            return " ".join(str(compiled).split()), values
 
         assert build(grpc_plan_from_wire_fixture(action)) == build(
             plan_from_wire_fixture(action)